@@ -0,0 +1,40 @@
+"""add weighted full-text and trigram search indexes to assets
+
+Revision ID: 0004_asset_search
+Revises: 0003_oauth_accounts
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0004_asset_search"
+down_revision = "0003_oauth_accounts"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "assets",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True),
+    )
+    op.create_index("ix_assets_search_vector", "assets", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_assets_title_trgm", "assets", ["title"], postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assets_title_trgm", table_name="assets")
+    op.drop_index("ix_assets_search_vector", table_name="assets")
+    op.drop_column("assets", "search_vector")
@@ -0,0 +1,39 @@
+"""add composite indexes backing keyset (cursor) pagination
+
+Revision ID: 0005_keyset_indexes
+Revises: 0004_asset_search
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_keyset_indexes"
+down_revision = "0004_asset_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_assets_visibility_published_at_id",
+        "assets",
+        ["visibility", sa.text("published_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_posts_created_at_id", "posts", [sa.text("created_at DESC"), sa.text("id DESC")])
+    op.create_index(
+        "ix_notifications_user_created_at_id",
+        "notifications",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_ai_jobs_user_created_at_id", "ai_jobs", ["user_id", sa.text("created_at DESC"), sa.text("id DESC")])
+    op.create_index("ix_scan_jobs_user_created_at_id", "scan_jobs", ["user_id", sa.text("created_at DESC"), sa.text("id DESC")])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scan_jobs_user_created_at_id", table_name="scan_jobs")
+    op.drop_index("ix_ai_jobs_user_created_at_id", table_name="ai_jobs")
+    op.drop_index("ix_notifications_user_created_at_id", table_name="notifications")
+    op.drop_index("ix_posts_created_at_id", table_name="posts")
+    op.drop_index("ix_assets_visibility_published_at_id", table_name="assets")
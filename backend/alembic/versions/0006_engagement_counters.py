@@ -0,0 +1,53 @@
+"""add denormalized engagement counters to assets and posts
+
+Revision ID: 0006_engagement_counters
+Revises: 0005_keyset_indexes
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006_engagement_counters"
+down_revision = "0005_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+ASSET_COUNTERS = ("like_count", "save_count", "download_count", "view_count")
+POST_COUNTERS = ("like_count", "save_count")
+
+
+def upgrade() -> None:
+    for name in ASSET_COUNTERS:
+        op.add_column("assets", sa.Column(name, sa.Integer(), server_default="0", nullable=False))
+    for name in POST_COUNTERS:
+        op.add_column("posts", sa.Column(name, sa.Integer(), server_default="0", nullable=False))
+
+    op.execute(
+        """
+        UPDATE assets a SET
+            like_count = (SELECT count(*) FROM likes l WHERE l.asset_id = a.id),
+            save_count = (SELECT count(*) FROM saves s WHERE s.asset_id = a.id),
+            download_count = (SELECT count(*) FROM downloads d WHERE d.asset_id = a.id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE posts p SET
+            like_count = (SELECT count(*) FROM likes l WHERE l.post_id = p.id),
+            save_count = (SELECT count(*) FROM saves s WHERE s.post_id = p.id)
+        """
+    )
+    # The like count used to live in the metadata blob; the column is now authoritative.
+    op.execute("UPDATE assets SET metadata = metadata - 'likes' WHERE metadata ? 'likes'")
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE assets SET metadata = metadata || jsonb_build_object('likes', like_count) WHERE like_count > 0"
+    )
+    for name in reversed(POST_COUNTERS):
+        op.drop_column("posts", name)
+    for name in reversed(ASSET_COUNTERS):
+        op.drop_column("assets", name)
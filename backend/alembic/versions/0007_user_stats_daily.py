@@ -0,0 +1,45 @@
+"""add per-user daily stats rollup for the dashboard
+
+Revision ID: 0007_user_stats_daily
+Revises: 0006_engagement_counters
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0007_user_stats_daily"
+down_revision = "0006_engagement_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_stats_daily",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("assets", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("downloads", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("ai_jobs", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("scan_jobs", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO user_stats_daily (user_id, day, assets, downloads, ai_jobs, scan_jobs)
+        SELECT user_id, day, sum(assets), sum(downloads), sum(ai_jobs), sum(scan_jobs)
+        FROM (
+            SELECT creator_id AS user_id, (created_at AT TIME ZONE 'UTC')::date AS day, 1 AS assets, 0 AS downloads, 0 AS ai_jobs, 0 AS scan_jobs FROM assets
+            UNION ALL SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 1, 0, 0 FROM downloads
+            UNION ALL SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 1, 0 FROM ai_jobs
+            UNION ALL SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 0, 1 FROM scan_jobs
+        ) events
+        GROUP BY user_id, day
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_stats_daily")
@@ -0,0 +1,80 @@
+"""move base64 AI job input images out of ai_jobs.settings_json into S3
+
+Revision ID: 0008_ai_inputs_to_s3
+Revises: 0007_user_stats_daily
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+import base64
+import mimetypes
+import os
+import uuid
+from pathlib import PurePath
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = "0008_ai_inputs_to_s3"
+down_revision = "0007_user_stats_daily"
+branch_labels = None
+depends_on = None
+
+BATCH = 100
+
+
+# Migrations must not import live app modules, which keep changing after this revision. S3 is
+# configured from the same environment variables (and defaults) as app.core.config, the way
+# env.py reads DATABASE_URL.
+def _s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=os.getenv("S3_ENDPOINT_URL", "http://minio:9000"),
+        aws_access_key_id=os.getenv("S3_ACCESS_KEY", "minioadmin"),
+        aws_secret_access_key=os.getenv("S3_SECRET_KEY", "minioadmin"),
+        region_name=os.getenv("S3_REGION", "us-east-1"),
+        config=Config(signature_version="s3v4"),
+    )
+
+
+def _input_key(user_id, filename: str) -> str:
+    # Layout of AI job input images as of this revision: <user>/ai-inputs/<uuid>_<name>.
+    name = PurePath(filename).name or "upload.png"
+    return f"{user_id}/ai-inputs/{uuid.uuid4()}_{name}"
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    client = None
+    bucket = os.getenv("S3_BUCKET_JOB_OUTPUTS", "r2v-job-outputs")
+    select_batch = sa.text(
+        "SELECT id, user_id, settings_json FROM ai_jobs WHERE settings_json ? 'image_base64' ORDER BY id LIMIT :n"
+    )
+    update = sa.text(
+        "UPDATE ai_jobs SET settings_json = (settings_json - 'image_base64') || :patch WHERE id = :id"
+    ).bindparams(sa.bindparam("patch", type_=JSONB))
+    # Each batch rewrites its rows, so the next SELECT naturally moves past them.
+    while rows := conn.execute(select_batch, {"n": BATCH}).all():
+        for job_id, user_id, job_settings in rows:
+            filename = job_settings.get("image_filename") or "upload.png"
+            mime = job_settings.get("image_mime") or mimetypes.guess_type(filename)[0] or "image/png"
+            patch = {}
+            try:
+                data = base64.b64decode(job_settings["image_base64"] or "")
+            except ValueError:
+                data = b""
+            if data:
+                key = _input_key(user_id, filename)
+                client = client or _s3_client()
+                client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=mime)
+                patch["image_key"] = key
+            conn.execute(update, {"id": job_id, "patch": patch})
+
+
+def downgrade() -> None:
+    # The images stay in S3 under image_key; nothing to put back into the rows.
+    pass
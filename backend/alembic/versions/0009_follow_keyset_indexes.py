@@ -0,0 +1,33 @@
+"""add composite indexes backing keyset pagination of follower/following lists
+
+Revision ID: 0009_follow_keyset_indexes
+Revises: 0008_ai_inputs_to_s3
+Create Date: 2026-10-18 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_follow_keyset_indexes"
+down_revision = "0008_ai_inputs_to_s3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_follows_following_created_at_id",
+        "follows",
+        ["following_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_follows_follower_created_at_id",
+        "follows",
+        ["follower_id", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_follows_follower_created_at_id", table_name="follows")
+    op.drop_index("ix_follows_following_created_at_id", table_name="follows")
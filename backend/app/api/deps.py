@@ -1,12 +1,16 @@
 from __future__ import annotations
-from typing import Generator
-from fastapi import Depends
+import uuid
+from typing import Any, AsyncGenerator, Generator
+from fastapi import Depends, Query
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.requests import HTTPConnection
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.errors import unauthorized, forbidden
 from app.core.security import decode_token
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.db.models.user import User
+from app.services.principals import Principal, load_principal
 
 bearer = HTTPBearer(auto_error=False)
 
@@ -17,10 +21,11 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials | None = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> User:
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _access_payload(creds: HTTPAuthorizationCredentials | None) -> dict[str, Any]:
     if not creds:
         unauthorized("Missing bearer token")
     try:
@@ -29,6 +34,13 @@ def get_current_user(
         unauthorized("Invalid token")
     if payload.get("type") != "access":
         unauthorized("Invalid token type")
+    return payload
+
+def get_current_user(
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> User:
+    payload = _access_payload(creds)
     user_id = payload.get("sub")
     user = db.get(User, user_id)
     if not user or not user.is_active:
@@ -36,8 +48,46 @@ def get_current_user(
     user._jwt_role = payload.get("role")  # type: ignore[attr-defined]
     return user
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
-    role = getattr(user, "_jwt_role", user.role)
-    if role != "admin":
+async def get_current_principal(creds: HTTPAuthorizationCredentials | None = Depends(bearer)) -> Principal:
+    """Auth for routes that only need the caller's id/role; served from the principal cache."""
+    return await _active_principal(_access_payload(creds))
+
+async def _active_principal(payload: dict[str, Any]) -> Principal:
+    try:
+        user_id = uuid.UUID(str(payload.get("sub")))
+    except ValueError:
+        unauthorized("Invalid token")
+    principal = await load_principal(user_id, payload.get("role"))
+    if not principal or not principal.is_active:
+        unauthorized("User inactive")
+    return principal
+
+async def get_stream_principal(conn: HTTPConnection, stream_token: str | None = Query(None)) -> Principal:
+    """For SSE/WebSocket routes: EventSource and browser WebSockets cannot set headers, so they
+    pass ?stream_token= from POST .../events/token instead. It expires within a minute and only
+    opens the job it was issued for, so a URL that lands in a log is of little use."""
+    scheme, _, token = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return await get_current_principal(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+    if not stream_token:
+        unauthorized("Missing bearer token")
+    try:
+        payload = decode_token(stream_token)
+    except Exception:
+        unauthorized("Invalid token")
+    if payload.get("type") != "stream":
+        unauthorized("Invalid token type")
+    if payload.get("job") != conn.path_params.get("job_id"):
+        unauthorized("Token not valid for this job")
+    return await _active_principal(payload)
+
+async def get_optional_principal(creds: HTTPAuthorizationCredentials | None = Depends(bearer)) -> Principal | None:
+    """Like get_current_principal for public routes: anonymous callers get None, bad tokens still 401."""
+    if not creds:
+        return None
+    return await get_current_principal(creds)
+
+def require_admin(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if principal.role != "admin":
         forbidden("Admin only")
-    return user
+    return principal
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import asyncio
+from typing import AsyncIterator
+import orjson
+from fastapi import HTTPException, WebSocket, WebSocketException, status
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.errors import forbidden, not_found
+from app.db.session import AsyncSessionLocal
+from app.services.job_events import TERMINAL_STATUSES, channel, hub, job_event
+from app.services.job_progress import live_progress_async
+
+# Progress streams for /ai and /scan jobs. Each connection costs two primary-key reads (ownership
+# check, then the snapshot taken after subscribing); everything else arrives over the process-wide
+# Redis subscription in app.services.job_events.
+
+async def _load(model, job_id, user=None):
+    # Short-lived session: a stream stays open for minutes and must not pin a pooled connection.
+    async with AsyncSessionLocal() as db:
+        job = await db.get(model, job_id)
+        if not job: not_found()
+        if user is not None and job.user_id != user.id: forbidden()
+        return job
+
+async def _snapshot(kind: str, model, job_id) -> dict:
+    job = await _load(model, job_id)
+    live = await live_progress_async(kind, [job])
+    return job_event(job, live.get(job.id))
+
+async def check_job_owner(model, job_id, user) -> None:
+    await _load(model, job_id, user)
+
+async def job_events(kind: str, model, job_id) -> AsyncIterator[dict | None]:
+    """Current state, then every published change until a terminal status; None = keepalive tick."""
+    async with hub.subscribe(channel(kind, job_id)) as q:
+        event = await _snapshot(kind, model, job_id)
+        yield event
+        while event["status"] not in TERMINAL_STATUSES:
+            try:
+                event = orjson.loads(await asyncio.wait_for(q.get(), settings.job_events_keepalive_s))
+            except TimeoutError:
+                if hub.ready.is_set():
+                    yield None
+                    continue
+                event = await _snapshot(kind, model, job_id)
+            yield event
+
+def sse_response(kind: str, model, job_id) -> StreamingResponse:
+    async def body():
+        async for event in job_events(kind, model, job_id):
+            yield b": keepalive\n\n" if event is None else b"data: " + orjson.dumps(event) + b"\n\n"
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def serve_websocket(websocket: WebSocket, kind: str, model, job_id, user) -> None:
+    try:
+        await check_job_owner(model, job_id, user)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail)) from exc
+    await websocket.accept()
+
+    async def pump() -> None:
+        async for event in job_events(kind, model, job_id):
+            if event is not None:
+                await websocket.send_text(orjson.dumps(event).decode())
+
+    async def until_disconnect() -> None:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender, receiver = asyncio.create_task(pump()), asyncio.create_task(until_disconnect())
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if sender in done:
+        sender.result()
+        await websocket.close()
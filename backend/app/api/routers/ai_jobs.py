@@ -1,58 +1,123 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
-from app.api.deps import get_db, get_current_user
-from app.api.schemas.jobs import AIJobCreateIn, JobOut, DownloadOut
-from app.core.errors import not_found, forbidden
+from fastapi import APIRouter, Depends, Response, WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import select
+from app.api.deps import get_async_db, get_db, get_current_principal, get_stream_principal
+from app.api.job_streams import check_job_owner, serve_websocket, sse_response
+from app.api.pagination import paginate, set_next_cursor
+from app.api.schemas.common import PresignIn
+from app.api.schemas.jobs import AIInputPresignOut, AIJobCreateIn, JobOut, JobSummaryOut, DownloadOut, StreamTokenOut
+from app.core.errors import not_found, forbidden, bad_request
+from app.core.security import create_stream_token
 from app.db.models.jobs import AIJob
 from app.workers.tasks import ai_generate_task
+from app.services.ai_inputs import input_key, owns_input_key, store_base64_input
+from app.services.job_progress import live_progress, live_progress_async
 from app.services.s3 import s3
 from app.core.config import settings
 
 router = APIRouter()
 legacy_router = APIRouter()
 
-def to_job_out(j: AIJob) -> JobOut:
+def to_job_out(j: AIJob, progress: int | None = None) -> JobOut:
     return JobOut(
-        id=str(j.id), status=j.status, progress=j.progress,
+        id=str(j.id), status=j.status, progress=j.progress if progress is None else progress,
         created_at=j.created_at.isoformat(), updated_at=j.updated_at.isoformat() if j.updated_at else None,
         prompt=j.prompt,
         metadata=j.job_metadata or {}, output_glb_key=j.output_glb_key, output_stl_key=j.output_stl_key,
         output_image_key=j.output_image_key, preview_keys=j.preview_keys or [], error=j.error
     )
 
+# Columns behind JobSummaryOut; list pages load nothing else.
+SUMMARY_COLUMNS = (AIJob.id, AIJob.status, AIJob.progress, AIJob.prompt, AIJob.error, AIJob.preview_keys,
+                   AIJob.created_at, AIJob.updated_at)
+
+def to_job_summary(j: AIJob, progress: int | None = None) -> JobSummaryOut:
+    return JobSummaryOut(
+        id=str(j.id), status=j.status, progress=j.progress if progress is None else progress,
+        created_at=j.created_at.isoformat(), updated_at=j.updated_at.isoformat() if j.updated_at else None,
+        prompt=j.prompt, preview_key=(j.preview_keys or [None])[0], error=j.error
+    )
+
+def _job_settings(raw: dict, user) -> dict:
+    # Images travel through S3 (POST /ai/inputs/presign); the row only ever holds the key.
+    job_settings = dict(raw)
+    image_base64 = job_settings.pop("image_base64", None)
+    if image_base64:
+        job_settings["image_key"] = store_base64_input(
+            user.id, image_base64, job_settings.get("image_filename"), job_settings.get("image_mime"))
+    image_key = job_settings.get("image_key")
+    if image_key is not None and (not isinstance(image_key, str) or not owns_input_key(user.id, image_key)):
+        bad_request("Invalid image_key")
+    return job_settings
+
 def _create_job(payload: AIJobCreateIn, db: Session, user) -> JobOut:
-    job = AIJob(user_id=user.id, prompt=payload.prompt, settings_json=payload.settings, status="queued", progress=0)
+    job = AIJob(user_id=user.id, prompt=payload.prompt, settings_json=_job_settings(payload.settings, user),
+                status="queued", progress=0)
     db.add(job)
     db.commit()
     db.refresh(job)
     ai_generate_task.delay(str(job.id))
     return to_job_out(job)
 
+@router.post("/inputs/presign", response_model=AIInputPresignOut)
+def presign_input(payload: PresignIn, user = Depends(get_current_principal)):
+    key = input_key(user.id, payload.filename)
+    url = s3.presign_put(
+        settings.s3_bucket_job_outputs,
+        key,
+        expires=3600,
+        content_type=payload.content_type,
+    )
+    return AIInputPresignOut(url=url, headers={"Content-Type": payload.content_type}, image_key=key)
+
 @router.post("/jobs", response_model=JobOut)
-def create_job(payload: AIJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def create_job(payload: AIJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     return _create_job(payload, db, user)
 
 @legacy_router.post("/generate-from-text", response_model=JobOut)
-def generate_from_text(payload: AIJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def generate_from_text(payload: AIJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     return _create_job(payload, db, user)
 
-@router.get("/jobs", response_model=list[JobOut])
-def list_jobs(limit: int = 20, offset: int = 0, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    q = select(AIJob).where(AIJob.user_id == user.id).order_by(desc(AIJob.created_at)).limit(limit).offset(offset)
+@router.get("/jobs", response_model=list[JobSummaryOut])
+def list_jobs(response: Response, limit: int = 20, offset: int = 0, cursor: str | None = None,
+              db: Session = Depends(get_db), user = Depends(get_current_principal)):
+    stmt = select(AIJob).options(load_only(*SUMMARY_COLUMNS)).where(AIJob.user_id == user.id)
+    q = paginate(stmt, AIJob.created_at, AIJob.id,
+                 cursor=cursor, limit=limit, offset=offset)
     items = db.execute(q).scalars().all()
-    return [to_job_out(j) for j in items]
+    set_next_cursor(response, items, limit, lambda j: (j.created_at, j.id))
+    live = live_progress("ai", items)
+    return [to_job_summary(j, live.get(j.id)) for j in items]
 
 @router.get("/jobs/{job_id}", response_model=JobOut)
-def get_job(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    j = db.get(AIJob, job_id)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db), user = Depends(get_current_principal)):
+    j = await db.get(AIJob, job_id)
     if not j: not_found()
     if j.user_id != user.id: forbidden()
-    return to_job_out(j)
+    live = await live_progress_async("ai", [j])
+    return to_job_out(j, live.get(j.id))
+
+@router.post("/jobs/{job_id}/events/token", response_model=StreamTokenOut)
+async def job_events_token(job_id: str, user = Depends(get_current_principal)):
+    """Short-lived ?stream_token= for clients that cannot send an Authorization header on the stream."""
+    await check_job_owner(AIJob, job_id, user)
+    return StreamTokenOut(stream_token=create_stream_token(str(user.id), user.role, job_id),
+                          expires_in=settings.stream_token_expires_s)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, user = Depends(get_stream_principal)):
+    """Server-Sent Events: the job's current state, then each progress change until it finishes."""
+    await check_job_owner(AIJob, job_id, user)
+    return sse_response("ai", AIJob, job_id)
+
+@router.websocket("/jobs/{job_id}/events")
+async def job_events_ws(websocket: WebSocket, job_id: str, user = Depends(get_stream_principal)):
+    await serve_websocket(websocket, "ai", AIJob, job_id, user)
 
 @router.get("/jobs/{job_id}/download/glb", response_model=DownloadOut)
-def download_glb(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def download_glb(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     j = db.get(AIJob, job_id)
     if not j: not_found()
     if j.user_id != user.id: forbidden()
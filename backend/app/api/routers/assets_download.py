@@ -1,10 +1,11 @@
 from __future__ import annotations
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_principal
 from app.api.schemas.jobs import DownloadOut
 from app.core.errors import not_found, forbidden, bad_request
 from app.db.models.marketplace import Asset, Download
+from app.services.counters import bump
 from app.services.entitlements import is_entitled_to_asset
 from app.services.s3 import s3
 from app.core.config import settings
@@ -31,7 +32,7 @@ def download_asset(
     asset_id: str,
     format: str | None = None,
     db: Session = Depends(get_db),
-    user = Depends(get_current_user),
+    user = Depends(get_current_principal),
 ):
     a = db.get(Asset, asset_id)
     if not a: not_found()
@@ -52,5 +53,6 @@ def download_asset(
                 bad_request("Format not available")
     url = s3.presign_get(settings.s3_bucket_marketplace_models, object_key, expires=900)
     db.add(Download(user_id=user.id, asset_id=a.id))
+    bump(db, Asset, a.id, download_count=1)
     db.commit()
     return DownloadOut(url=url, expires_in=900)
@@ -1,15 +1,21 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select, desc, or_, func
-from app.api.deps import get_db, get_current_user
-from app.api.schemas.marketplace import AssetOut, AssetCreateIn, AssetUpdateIn, EntitlementOut, AssetPresignIn, AssetPresignOut
+from sqlalchemy import select, desc, or_
+from app.api.deps import get_async_db, get_db, get_current_principal, get_optional_principal
+from app.api.pagination import paginate, set_next_cursor
+from app.api.schemas.marketplace import AssetOut, AssetSearchOut, AssetCreateIn, AssetUpdateIn, EntitlementOut, AssetPresignIn, AssetPresignOut
 from app.core.errors import not_found, forbidden, bad_request, conflict
 from app.db.models.marketplace import Asset, RecentlyViewed
 from app.db.models.social import Like, Save
 from app.db.models.user import UserProfile
-from app.services.entitlements import is_entitled_to_asset
+from app.services.counters import bump, record_asset_view
+from app.services.profile_stats import invalidate_profile_stats
+from app.services.recently_viewed import recent_asset_ids, record_view, warm as warm_recent
+from app.services.entitlements import is_entitled_many, is_entitled_many_async, is_entitled_to_asset
 from app.services.s3 import s3
+from app.services.search import match_clause, search_assets
 from app.core.config import settings
 from uuid import UUID
 import datetime as dt
@@ -28,57 +34,85 @@ def _preview_url(a: Asset) -> str | None:
     key = a.preview_object_keys[0]
     return s3.presign_get(settings.s3_bucket_marketplace_models, key, expires=900)
 
-def _set_like_count(a: Asset, db: Session) -> None:
-    count = db.execute(select(func.count()).select_from(Like).where(Like.asset_id == a.id)).scalar_one()
-    meta = dict(a.meta_json or {})
-    meta["likes"] = count
-    a.meta_json = meta
+def _presign_page(items: list[Asset]) -> tuple[dict[str, str], dict[str, str]]:
+    thumbs = s3.presign_get_many(settings.s3_bucket_marketplace_thumbs, [a.thumb_object_key for a in items if a.thumb_object_key], expires=900)
+    previews = s3.presign_get_many(settings.s3_bucket_marketplace_models, [a.preview_object_keys[0] for a in items if a.preview_object_keys], expires=900)
+    return thumbs, previews
 
-def to_out(a: Asset, creator_username: str | None = None) -> AssetOut:
+def to_out(a: Asset, creator_username: str | None = None, *, thumb_url: str | None = None, preview_url: str | None = None,
+           entitled: bool | None = None) -> AssetOut:
     meta = dict(a.meta_json or {})
     if creator_username:
         meta.setdefault("creator_username", creator_username)
-    meta.setdefault("likes", meta.get("likes", 0))
+    meta["likes"] = a.like_count or 0
     return AssetOut(
         id=str(a.id), title=a.title, description=a.description, tags=a.tags or [], category=a.category, style=a.style,
         creator_id=str(a.creator_id), is_paid=a.is_paid, price=a.price, currency=a.currency,
         visibility=a.visibility, published_at=a.published_at.isoformat() if a.published_at else None,
-        thumb_object_key=a.thumb_object_key, thumb_url=_thumb_url(a),
-        model_object_key=a.model_object_key, preview_url=_preview_url(a),
-        metadata=meta,
+        thumb_object_key=a.thumb_object_key, thumb_url=thumb_url or _thumb_url(a),
+        model_object_key=a.model_object_key, preview_url=preview_url or _preview_url(a),
+        like_count=a.like_count or 0, save_count=a.save_count or 0,
+        download_count=a.download_count or 0, view_count=a.view_count or 0,
+        entitled=entitled, metadata=meta,
     )
 
+def to_out_many(items: list[Asset], usernames: dict, entitled: dict | None = None) -> list[AssetOut]:
+    thumbs, previews = _presign_page(items)
+    entitled = entitled or {}
+    return [
+        to_out(
+            a, usernames.get(a.creator_id),
+            thumb_url=thumbs.get(a.thumb_object_key) if a.thumb_object_key else None,
+            preview_url=previews.get(a.preview_object_keys[0]) if a.preview_object_keys else None,
+            entitled=entitled.get(a.id),
+        )
+        for a in items
+    ]
+
+async def _usernames(db: AsyncSession, creator_ids: set) -> dict:
+    if not creator_ids:
+        return {}
+    rows = (await db.execute(select(UserProfile.user_id, UserProfile.username).where(UserProfile.user_id.in_(creator_ids)))).all()
+    return {p.user_id: p.username for p in rows}
+
 @router.get("/assets", response_model=list[AssetOut])
-def list_assets(q: str | None = None, category: str | None = None, style: str | None = None,
-               limit: int = 20, offset: int = 0, db: Session = Depends(get_db)):
+async def list_assets(response: Response, q: str | None = None, category: str | None = None, style: str | None = None,
+                      limit: int = 20, offset: int = 0, cursor: str | None = None, db: AsyncSession = Depends(get_async_db),
+                      user = Depends(get_optional_principal)):
     stmt = select(Asset).where(Asset.visibility == "published")
     if q:
-        like = f"%{q}%"
-        stmt = stmt.where(or_(Asset.title.ilike(like), Asset.description.ilike(like)))
+        stmt = stmt.where(match_clause(q))
     if category:
         stmt = stmt.where(Asset.category == category)
     if style:
         stmt = stmt.where(Asset.style == style)
-    stmt = stmt.order_by(desc(Asset.published_at)).limit(limit).offset(offset)
-    items = db.execute(stmt).scalars().all()
-    creator_ids = {a.creator_id for a in items}
-    profiles = {}
-    if creator_ids:
-        rows = db.execute(select(UserProfile).where(UserProfile.user_id.in_(creator_ids))).scalars().all()
-        profiles = {p.user_id: p.username for p in rows}
-    return [to_out(a, profiles.get(a.creator_id)) for a in items]
+    stmt = paginate(stmt, Asset.published_at, Asset.id, cursor=cursor, limit=limit, offset=offset)
+    items = (await db.execute(stmt)).scalars().all()
+    set_next_cursor(response, items, limit, lambda a: (a.published_at, a.id))
+    entitled = await is_entitled_many_async(db, user.id, items) if user else None
+    return to_out_many(items, await _usernames(db, {a.creator_id for a in items}), entitled)
+
+@router.get("/search", response_model=AssetSearchOut)
+async def search(q: str, category: str | None = None, style: str | None = None,
+                 limit: int = 20, offset: int = 0, db: AsyncSession = Depends(get_async_db), user = Depends(get_optional_principal)):
+    q = q.strip()
+    if not q:
+        bad_request("q is required")
+    items, total, facets = await search_assets(db, q, category=category, style=style, limit=limit, offset=offset)
+    profiles = await _usernames(db, {a.creator_id for a in items})
+    entitled = await is_entitled_many_async(db, user.id, items) if user else None
+    return AssetSearchOut(items=to_out_many(items, profiles, entitled), total=total, limit=limit, offset=offset, facets=facets)
 
 @router.get("/assets/me", response_model=list[AssetOut])
-def list_my_assets(db: Session = Depends(get_db), user = Depends(get_current_user)):
+def list_my_assets(db: Session = Depends(get_db), user = Depends(get_current_principal)):
     items = db.execute(
         select(Asset).where(Asset.creator_id == user.id).order_by(desc(Asset.created_at))
     ).scalars().all()
     prof = db.execute(select(UserProfile).where(UserProfile.user_id == user.id)).scalar_one_or_none()
-    creator_name = prof.username if prof else None
-    return [to_out(a, creator_name) for a in items]
+    return to_out_many(items, {prof.user_id: prof.username} if prof else {}, is_entitled_many(db, user.id, items))
 
 @router.get("/assets/saved", response_model=list[AssetOut])
-def list_saved_assets(db: Session = Depends(get_db), user = Depends(get_current_user)):
+def list_saved_assets(db: Session = Depends(get_db), user = Depends(get_current_principal)):
     stmt = (
         select(Asset)
         .join(Save, Save.asset_id == Asset.id)
@@ -92,10 +126,10 @@ def list_saved_assets(db: Session = Depends(get_db), user = Depends(get_current_
     if creator_ids:
         rows = db.execute(select(UserProfile).where(UserProfile.user_id.in_(creator_ids))).scalars().all()
         profiles = {p.user_id: p.username for p in rows}
-    return [to_out(a, profiles.get(a.creator_id)) for a in items]
+    return to_out_many(items, profiles, is_entitled_many(db, user.id, items))
 
 @router.get("/assets/liked", response_model=list[AssetOut])
-def list_liked_assets(db: Session = Depends(get_db), user = Depends(get_current_user)):
+def list_liked_assets(db: Session = Depends(get_db), user = Depends(get_current_principal)):
     stmt = (
         select(Asset)
         .join(Like, Like.asset_id == Asset.id)
@@ -109,10 +143,33 @@ def list_liked_assets(db: Session = Depends(get_db), user = Depends(get_current_
     if creator_ids:
         rows = db.execute(select(UserProfile).where(UserProfile.user_id.in_(creator_ids))).scalars().all()
         profiles = {p.user_id: p.username for p in rows}
-    return [to_out(a, profiles.get(a.creator_id)) for a in items]
+    return to_out_many(items, profiles, is_entitled_many(db, user.id, items))
+
+@router.get("/assets/recent", response_model=list[AssetOut])
+async def list_recent_assets(limit: int = 20, db: AsyncSession = Depends(get_async_db), user = Depends(get_current_principal)):
+    limit = max(1, min(limit, settings.recently_viewed_max))
+    ids = await recent_asset_ids(user.id, limit)
+    if ids is None:
+        rows = (await db.execute(
+            select(RecentlyViewed.asset_id, RecentlyViewed.last_viewed_at)
+            .where(RecentlyViewed.user_id == user.id)
+            .order_by(desc(RecentlyViewed.last_viewed_at))
+            .limit(settings.recently_viewed_max)
+        )).all()
+        await warm_recent(user.id, [(r.asset_id, r.last_viewed_at) for r in rows])
+        ids = [r.asset_id for r in rows[:limit]]
+    if not ids:
+        return []
+    found = (await db.execute(
+        select(Asset).where(Asset.id.in_(ids), or_(Asset.visibility == "published", Asset.creator_id == user.id))
+    )).scalars().all()
+    by_id = {a.id: a for a in found}
+    items = [by_id[i] for i in ids if i in by_id]
+    entitled = await is_entitled_many_async(db, user.id, items)
+    return to_out_many(items, await _usernames(db, {a.creator_id for a in items}), entitled)
 
 @router.get("/assets/user/{user_id}", response_model=list[AssetOut])
-def list_user_assets(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def list_user_assets(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     stmt = (
         select(Asset)
         .where(Asset.creator_id == user_id)
@@ -121,11 +178,10 @@ def list_user_assets(user_id: UUID, db: Session = Depends(get_db), user = Depend
     )
     items = db.execute(stmt).scalars().all()
     prof = db.execute(select(UserProfile).where(UserProfile.user_id == user_id)).scalar_one_or_none()
-    creator_name = prof.username if prof else None
-    return [to_out(a, creator_name) for a in items]
+    return to_out_many(items, {prof.user_id: prof.username} if prof else {}, is_entitled_many(db, user.id, items))
 
 @router.post("/assets/presign", response_model=AssetPresignOut)
-def presign_asset(payload: AssetPresignIn, user = Depends(get_current_user)):
+def presign_asset(payload: AssetPresignIn, user = Depends(get_current_principal)):
     kind = payload.kind.lower()
     if kind not in {"model", "thumb"}:
         bad_request("kind must be model|thumb")
@@ -141,7 +197,7 @@ def presign_asset(payload: AssetPresignIn, user = Depends(get_current_user)):
     return AssetPresignOut(url=url, key=key)
 
 @router.post("/assets", response_model=AssetOut)
-def create_asset(payload: AssetCreateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def create_asset(payload: AssetCreateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = Asset(
         creator_id=user.id,
         title=payload.title,
@@ -160,30 +216,27 @@ def create_asset(payload: AssetCreateIn, db: Session = Depends(get_db), user = D
         meta_json=payload.metadata,
     )
     db.add(a); db.commit(); db.refresh(a)
+    invalidate_profile_stats(user.id)
     prof = db.execute(select(UserProfile).where(UserProfile.user_id == user.id)).scalar_one_or_none()
     creator_name = prof.username if prof else None
     return to_out(a, creator_name)
 
 @router.get("/assets/{asset_id}", response_model=AssetOut)
-def get_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def get_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     # viewing allowed if published or owner
     if a.visibility != "published" and a.creator_id != user.id:
         forbidden()
-    # track recently viewed
-    rv = db.execute(select(RecentlyViewed).where(RecentlyViewed.user_id == user.id, RecentlyViewed.asset_id == a.id)).scalar_one_or_none()
-    if rv:
-        rv.last_viewed_at = dt.datetime.now(dt.timezone.utc)
-    else:
-        db.add(RecentlyViewed(user_id=user.id, asset_id=a.id))
-    db.commit()
+    # buffered in Redis; the beat flusher writes recently_viewed / view_count in batches
+    record_view(db, user.id, a.id)
+    record_asset_view(db, a.id)
     prof = db.execute(select(UserProfile).where(UserProfile.user_id == a.creator_id)).scalar_one_or_none()
     creator_name = prof.username if prof else None
     return to_out(a, creator_name)
 
 @router.patch("/assets/{asset_id}", response_model=AssetOut)
-def update_asset(asset_id: str, payload: AssetUpdateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def update_asset(asset_id: str, payload: AssetUpdateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     if a.creator_id != user.id: forbidden()
@@ -199,7 +252,7 @@ def update_asset(asset_id: str, payload: AssetUpdateIn, db: Session = Depends(ge
     return to_out(a, creator_name)
 
 @router.post("/assets/{asset_id}/publish", response_model=AssetOut)
-def publish(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def publish(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     if a.creator_id != user.id: forbidden()
@@ -208,12 +261,13 @@ def publish(asset_id: str, db: Session = Depends(get_db), user = Depends(get_cur
     a.visibility = "published"
     a.published_at = dt.datetime.now(dt.timezone.utc)
     db.commit(); db.refresh(a)
+    invalidate_profile_stats(a.creator_id)
     prof = db.execute(select(UserProfile).where(UserProfile.user_id == user.id)).scalar_one_or_none()
     creator_name = prof.username if prof else None
     return to_out(a, creator_name)
 
 @router.post("/assets/{asset_id}/like")
-def like_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def like_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     existing = db.execute(select(Like).where(Like.user_id == user.id, Like.asset_id == a.id)).scalar_one_or_none()
@@ -221,12 +275,12 @@ def like_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_
         conflict("Already liked")
     db.add(Like(user_id=user.id, asset_id=a.id))
     db.flush()
-    _set_like_count(a, db)
+    bump(db, Asset, a.id, like_count=1)
     db.commit()
     return {"detail": "ok"}
 
 @router.delete("/assets/{asset_id}/like")
-def unlike_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def unlike_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     like = db.execute(select(Like).where(Like.user_id == user.id, Like.asset_id == a.id)).scalar_one_or_none()
@@ -234,43 +288,48 @@ def unlike_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(ge
         not_found("Like not found")
     db.delete(like)
     db.flush()
-    _set_like_count(a, db)
+    bump(db, Asset, a.id, like_count=-1)
     db.commit()
     return {"detail": "ok"}
 
 @router.post("/assets/{asset_id}/save")
-def save_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def save_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     existing = db.execute(select(Save).where(Save.user_id == user.id, Save.asset_id == a.id)).scalar_one_or_none()
     if existing:
         conflict("Already saved")
     db.add(Save(user_id=user.id, asset_id=a.id))
+    db.flush()
+    bump(db, Asset, a.id, save_count=1)
     db.commit()
     return {"detail": "ok"}
 
 @router.delete("/assets/{asset_id}/save")
-def unsave_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def unsave_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     saved = db.execute(select(Save).where(Save.user_id == user.id, Save.asset_id == a.id)).scalar_one_or_none()
     if not saved:
         not_found("Save not found")
     db.delete(saved)
+    db.flush()
+    bump(db, Asset, a.id, save_count=-1)
     db.commit()
     return {"detail": "ok"}
 
 @router.delete("/assets/{asset_id}")
-def delete_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def delete_asset(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     if a.creator_id != user.id: forbidden()
     db.delete(a)
     db.commit()
+    invalidate_profile_stats(user.id)
     return {"detail": "ok"}
 
 @router.get("/assets/{asset_id}/entitlement", response_model=EntitlementOut)
-def entitlement(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def entitlement(asset_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     a = db.get(Asset, asset_id)
     if not a: not_found()
     entitled, reason = is_entitled_to_asset(db, user.id, a)
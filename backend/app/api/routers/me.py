@@ -6,6 +6,7 @@ from app.api.deps import get_db, get_current_user
 from app.api.schemas.me import MeOut, MeUpdateIn
 from app.core.errors import conflict
 from app.db.models.user import UserProfile
+from app.services.profile_stats import follow_neighbours, invalidate_profile_stats
 
 router = APIRouter()
 
@@ -40,10 +41,15 @@ def update_me(payload: MeUpdateIn, db: Session = Depends(get_db), user = Depends
     if payload.links is not None:
         profile.links = payload.links
     db.commit(); db.refresh(user)
+    invalidate_profile_stats(user.id)
     return get_me(user)
 
 @router.delete("/me")
 def delete_me(db: Session = Depends(get_db), user = Depends(get_current_user)):
+    user_id = user.id
+    # Their follows cascade away with them; read the other ends first.
+    neighbours = follow_neighbours(db, user_id)
     db.delete(user)
     db.commit()
+    invalidate_profile_stats(user_id, *neighbours)
     return {"detail": "ok"}
@@ -1,21 +1,26 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
-from app.api.deps import get_db, get_current_user
+from sqlalchemy import select
+from app.api.deps import get_async_db, get_db, get_current_principal
+from app.api.pagination import paginate, set_next_cursor
 from app.core.errors import not_found
 from app.db.models.social import Notification
 
 router = APIRouter()
 
 @router.get("", response_model=list[dict])
-def list_notifications(limit: int = 50, offset: int = 0, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    q = select(Notification).where(Notification.user_id == user.id).order_by(desc(Notification.created_at)).limit(limit).offset(offset)
-    items = db.execute(q).scalars().all()
+async def list_notifications(response: Response, limit: int = 50, offset: int = 0, cursor: str | None = None,
+                             db: AsyncSession = Depends(get_async_db), user = Depends(get_current_principal)):
+    q = paginate(select(Notification).where(Notification.user_id == user.id), Notification.created_at, Notification.id,
+                 cursor=cursor, limit=limit, offset=offset)
+    items = (await db.execute(q)).scalars().all()
+    set_next_cursor(response, items, limit, lambda n: (n.created_at, n.id))
     return [{"id": str(n.id), "type": n.type, "payload": n.payload_json, "is_read": n.is_read, "created_at": n.created_at.isoformat()} for n in items]
 
 @router.post("/{notif_id}/read")
-def mark_read(notif_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def mark_read(notif_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     n = db.get(Notification, notif_id)
     if not n or n.user_id != user.id:
         not_found()
@@ -1,30 +1,46 @@
 from __future__ import annotations
 import uuid
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
-from app.api.deps import get_db, get_current_user
+from fastapi import APIRouter, Depends, Response, WebSocket
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import select
+from app.api.deps import get_async_db, get_db, get_current_principal, get_stream_principal
+from app.api.job_streams import check_job_owner, serve_websocket, sse_response
+from app.api.pagination import paginate, set_next_cursor
 from app.api.schemas.common import PresignedURL, PresignIn
-from app.api.schemas.jobs import ScanJobCreateIn, JobOut, DownloadOut
+from app.api.schemas.jobs import ScanJobCreateIn, JobOut, JobSummaryOut, DownloadOut, StreamTokenOut
 from app.core.errors import not_found, forbidden, bad_request
+from app.core.security import create_stream_token
 from app.db.models.jobs import ScanJob
 from app.workers.tasks import scan_reconstruct_task
+from app.services.job_progress import live_progress, live_progress_async
 from app.services.s3 import s3
 from app.core.config import settings
 
 router = APIRouter()
 
-def to_job_out(j: ScanJob) -> JobOut:
+def to_job_out(j: ScanJob, progress: int | None = None) -> JobOut:
     return JobOut(
-        id=str(j.id), status=j.status, progress=j.progress,
+        id=str(j.id), status=j.status, progress=j.progress if progress is None else progress,
         created_at=j.created_at.isoformat(), updated_at=j.updated_at.isoformat() if j.updated_at else None,
         prompt=None,
         metadata=j.job_metadata or {}, output_glb_key=j.output_glb_key, output_stl_key=j.output_stl_key,
         preview_keys=j.preview_keys or [], error=j.error
     )
 
+# Columns behind JobSummaryOut; list pages load nothing else.
+SUMMARY_COLUMNS = (ScanJob.id, ScanJob.status, ScanJob.progress, ScanJob.error, ScanJob.preview_keys,
+                   ScanJob.created_at, ScanJob.updated_at)
+
+def to_job_summary(j: ScanJob, progress: int | None = None) -> JobSummaryOut:
+    return JobSummaryOut(
+        id=str(j.id), status=j.status, progress=j.progress if progress is None else progress,
+        created_at=j.created_at.isoformat(), updated_at=j.updated_at.isoformat() if j.updated_at else None,
+        prompt=None, preview_key=(j.preview_keys or [None])[0], error=j.error
+    )
+
 @router.post("/jobs", response_model=JobOut)
-def create_scan_job(payload: ScanJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def create_scan_job(payload: ScanJobCreateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     if payload.kind not in ["photos", "zip"]:
         bad_request("kind must be photos|zip")
     job = ScanJob(user_id=user.id, status="created", progress=0, job_metadata={"kind": payload.kind})
@@ -32,7 +48,7 @@ def create_scan_job(payload: ScanJobCreateIn, db: Session = Depends(get_db), use
     return to_job_out(job)
 
 @router.post("/jobs/{job_id}/presign", response_model=PresignedURL)
-def presign_upload(job_id: str, payload: PresignIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def presign_upload(job_id: str, payload: PresignIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     j = db.get(ScanJob, job_id)
     if not j: not_found()
     if j.user_id != user.id: forbidden()
@@ -51,7 +67,7 @@ def presign_upload(job_id: str, payload: PresignIn, db: Session = Depends(get_db
     return PresignedURL(url=url, headers={"Content-Type": payload.content_type})
 
 @router.post("/jobs/{job_id}/start", response_model=JobOut)
-def start_reconstruction(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def start_reconstruction(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     j = db.get(ScanJob, job_id)
     if not j: not_found()
     if j.user_id != user.id: forbidden()
@@ -63,14 +79,44 @@ def start_reconstruction(job_id: str, db: Session = Depends(get_db), user = Depe
     scan_reconstruct_task.delay(str(j.id))
     return to_job_out(j)
 
-@router.get("/jobs", response_model=list[JobOut])
-def list_jobs(limit: int = 20, offset: int = 0, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    q = select(ScanJob).where(ScanJob.user_id == user.id).order_by(desc(ScanJob.created_at)).limit(limit).offset(offset)
+@router.get("/jobs", response_model=list[JobSummaryOut])
+def list_jobs(response: Response, limit: int = 20, offset: int = 0, cursor: str | None = None,
+              db: Session = Depends(get_db), user = Depends(get_current_principal)):
+    stmt = select(ScanJob).options(load_only(*SUMMARY_COLUMNS)).where(ScanJob.user_id == user.id)
+    q = paginate(stmt, ScanJob.created_at, ScanJob.id,
+                 cursor=cursor, limit=limit, offset=offset)
     items = db.execute(q).scalars().all()
-    return [to_job_out(j) for j in items]
+    set_next_cursor(response, items, limit, lambda j: (j.created_at, j.id))
+    live = live_progress("scan", items)
+    return [to_job_summary(j, live.get(j.id)) for j in items]
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db), user = Depends(get_current_principal)):
+    j = await db.get(ScanJob, job_id)
+    if not j: not_found()
+    if j.user_id != user.id: forbidden()
+    live = await live_progress_async("scan", [j])
+    return to_job_out(j, live.get(j.id))
+
+@router.post("/jobs/{job_id}/events/token", response_model=StreamTokenOut)
+async def job_events_token(job_id: str, user = Depends(get_current_principal)):
+    """Short-lived ?stream_token= for clients that cannot send an Authorization header on the stream."""
+    await check_job_owner(ScanJob, job_id, user)
+    return StreamTokenOut(stream_token=create_stream_token(str(user.id), user.role, job_id),
+                          expires_in=settings.stream_token_expires_s)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, user = Depends(get_stream_principal)):
+    """Server-Sent Events: the job's current state, then each progress change until it finishes."""
+    await check_job_owner(ScanJob, job_id, user)
+    return sse_response("scan", ScanJob, job_id)
+
+@router.websocket("/jobs/{job_id}/events")
+async def job_events_ws(websocket: WebSocket, job_id: str, user = Depends(get_stream_principal)):
+    await serve_websocket(websocket, "scan", ScanJob, job_id, user)
 
 @router.get("/jobs/{job_id}/download/glb", response_model=DownloadOut)
-def download_glb(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def download_glb(job_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     j = db.get(ScanJob, job_id)
     if not j: not_found()
     if j.user_id != user.id: forbidden()
@@ -1,103 +1,99 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from uuid import UUID
-from sqlalchemy import select, desc, func, or_
-from app.api.deps import get_db, get_current_user
+from sqlalchemy import select, or_
+from app.api.deps import get_async_db, get_db, get_current_principal
+from app.api.pagination import paginate, set_next_cursor
 from app.api.schemas.social import FollowUserOut, PostCreateIn, PostOut, ProfileOut
 from app.core.errors import not_found, conflict
 from app.db.models.social import Post, Like, Save, Follow
-from app.db.models.marketplace import Asset
 from app.db.models.user import User, UserProfile
+from app.services.counters import bump
+from app.services.profile_stats import get_profile_stats, invalidate_profile_stats
 
 router = APIRouter()
 
 def to_post_out(p: Post) -> PostOut:
     return PostOut(
         id=str(p.id), creator_id=str(p.creator_id), asset_id=str(p.asset_id) if p.asset_id else None,
-        caption=p.caption, media_keys=p.media_keys or [], created_at=p.created_at.isoformat()
+        caption=p.caption, media_keys=p.media_keys or [], created_at=p.created_at.isoformat(),
+        like_count=p.like_count or 0, save_count=p.save_count or 0,
     )
 
 @router.post("/posts", response_model=PostOut)
-def create_post(payload: PostCreateIn, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def create_post(payload: PostCreateIn, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     p = Post(creator_id=user.id, asset_id=payload.asset_id, caption=payload.caption, media_keys=payload.media_keys)
     db.add(p); db.commit(); db.refresh(p)
     return to_post_out(p)
 
 @router.get("/posts", response_model=list[PostOut])
-def feed(limit: int = 20, offset: int = 0, db: Session = Depends(get_db)):
-    q = select(Post).order_by(desc(Post.created_at)).limit(limit).offset(offset)
-    return [to_post_out(p) for p in db.execute(q).scalars().all()]
+async def feed(response: Response, limit: int = 20, offset: int = 0, cursor: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    q = paginate(select(Post), Post.created_at, Post.id, cursor=cursor, limit=limit, offset=offset)
+    items = (await db.execute(q)).scalars().all()
+    set_next_cursor(response, items, limit, lambda p: (p.created_at, p.id))
+    return [to_post_out(p) for p in items]
 
 @router.post("/posts/{post_id}/like")
-def like(post_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def like(post_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     existing = db.execute(select(Like).where(Like.user_id==user.id, Like.post_id==post_id)).scalar_one_or_none()
     if existing:
         conflict("Already liked")
     db.add(Like(user_id=user.id, post_id=post_id))
+    db.flush()
+    bump(db, Post, post_id, like_count=1)
     db.commit()
     return {"detail": "ok"}
 
 @router.post("/posts/{post_id}/save")
-def save(post_id: str, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def save(post_id: str, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     existing = db.execute(select(Save).where(Save.user_id==user.id, Save.post_id==post_id)).scalar_one_or_none()
     if existing:
         conflict("Already saved")
     db.add(Save(user_id=user.id, post_id=post_id))
+    db.flush()
+    bump(db, Post, post_id, save_count=1)
     db.commit()
     return {"detail": "ok"}
 
 @router.post("/follow/{user_id}")
-def follow(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def follow(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     existing = db.execute(select(Follow).where(Follow.follower_id==user.id, Follow.following_id==user_id)).scalar_one_or_none()
     if existing:
         conflict("Already following")
     db.add(Follow(follower_id=user.id, following_id=user_id))
     db.commit()
+    invalidate_profile_stats(user.id, user_id)
     return {"detail": "ok"}
 
 @router.delete("/follow/{user_id}")
-def unfollow(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def unfollow(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_principal)):
     existing = db.execute(select(Follow).where(Follow.follower_id==user.id, Follow.following_id==user_id)).scalar_one_or_none()
     if not existing:
         not_found("Follow not found")
     db.delete(existing)
     db.commit()
+    invalidate_profile_stats(user.id, user_id)
     return {"detail": "ok"}
 
 @router.get("/profile/{user_id}", response_model=ProfileOut)
-def profile(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    prof = db.get(UserProfile, user_id)
-    if not prof:
-        target_user = db.get(User, user_id)
-        if not target_user:
-            not_found("Profile not found")
-        default_username = target_user.email.split("@")[0]
-        prof = UserProfile(user_id=user_id, username=default_username, bio=None, avatar_url=None, links=None)
-        db.add(prof)
-        db.commit()
-        db.refresh(prof)
-    posts_stmt = select(func.count()).select_from(Asset).where(Asset.creator_id==user_id)
-    if user.id != user_id:
-        posts_stmt = posts_stmt.where(Asset.visibility == "published")
-    posts = db.execute(posts_stmt).scalar_one()
-    followers = db.execute(select(func.count()).select_from(Follow).where(Follow.following_id==user_id)).scalar_one()
-    following = db.execute(select(func.count()).select_from(Follow).where(Follow.follower_id==user_id)).scalar_one()
-    is_following = False
-    if user.id != user_id:
-        is_following = db.execute(
-            select(Follow).where(Follow.follower_id==user.id, Follow.following_id==user_id)
-        ).scalar_one_or_none() is not None
+def profile(user_id: UUID, db: Session = Depends(get_db), user = Depends(get_current_principal)):
+    loaded = get_profile_stats(db, user_id, user.id)
+    if loaded is None:
+        not_found("Profile not found")
+    stats, is_following = loaded
+    is_self = user.id == user_id
     return ProfileOut(
         user_id=str(user_id),
-        username=prof.username,
-        bio=prof.bio,
-        avatar_url=prof.avatar_url,
-        posts=posts,
-        followers=followers,
-        following=following,
+        username=stats["username"],
+        bio=stats["bio"],
+        avatar_url=stats["avatar_url"],
+        posts=stats["assets"] if is_self else stats["published"],
+        followers=stats["followers"],
+        following=stats["following"],
         is_following=is_following,
-        is_self=user.id == user_id,
+        is_self=is_self,
     )
 
 def _follow_user_out(user: User, profile: UserProfile | None) -> FollowUserOut:
@@ -108,30 +104,32 @@ def _follow_user_out(user: User, profile: UserProfile | None) -> FollowUserOut:
         avatar_url=profile.avatar_url if profile else None,
     )
 
+def _follow_page(stmt, response: Response, limit: int, offset: int, cursor: str | None, db: Session) -> list[FollowUserOut]:
+    # Newest relationships first: (follower_id|following_id, created_at, id) is one index range
+    # scan per page. A display-name order spans users and user_profiles, which no index can serve.
+    stmt = paginate(stmt.add_columns(Follow.created_at, Follow.id), Follow.created_at, Follow.id, cursor=cursor, limit=limit, offset=offset)
+    rows = db.execute(stmt).all()
+    set_next_cursor(response, rows, limit, lambda row: (row[2], row[3]))
+    return [_follow_user_out(row[0], row[1]) for row in rows]
+
 @router.get("/followers/{user_id}", response_model=list[FollowUserOut])
-def followers(user_id: UUID, limit: int = 50, offset: int = 0, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def followers(user_id: UUID, response: Response, limit: int = 50, offset: int = 0, cursor: str | None = None,
+              db: Session = Depends(get_db), user = Depends(get_current_principal)):
     stmt = (
         select(User, UserProfile)
         .join(Follow, Follow.follower_id == User.id)
         .outerjoin(UserProfile, UserProfile.user_id == User.id)
         .where(Follow.following_id == user_id)
-        .order_by(UserProfile.username.nullslast(), User.email)
-        .limit(limit)
-        .offset(offset)
     )
-    rows = db.execute(stmt).all()
-    return [_follow_user_out(row[0], row[1]) for row in rows]
+    return _follow_page(stmt, response, limit, offset, cursor, db)
 
 @router.get("/following/{user_id}", response_model=list[FollowUserOut])
-def following(user_id: UUID, limit: int = 50, offset: int = 0, db: Session = Depends(get_db), user = Depends(get_current_user)):
+def following(user_id: UUID, response: Response, limit: int = 50, offset: int = 0, cursor: str | None = None,
+              db: Session = Depends(get_db), user = Depends(get_current_principal)):
     stmt = (
         select(User, UserProfile)
         .join(Follow, Follow.following_id == User.id)
         .outerjoin(UserProfile, UserProfile.user_id == User.id)
         .where(Follow.follower_id == user_id)
-        .order_by(UserProfile.username.nullslast(), User.email)
-        .limit(limit)
-        .offset(offset)
     )
-    rows = db.execute(stmt).all()
-    return [_follow_user_out(row[0], row[1]) for row in rows]
+    return _follow_page(stmt, response, limit, offset, cursor, db)
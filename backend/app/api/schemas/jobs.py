@@ -1,11 +1,15 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
 from typing import Any
+from app.api.schemas.common import PresignedURL
 
 class AIJobCreateIn(BaseModel):
     prompt: str = Field(min_length=1, max_length=2000)
     settings: dict[str, Any] = Field(default_factory=dict)
 
+class AIInputPresignOut(PresignedURL):
+    image_key: str
+
 class ScanJobCreateIn(BaseModel):
     kind: str = Field(default="photos", description="photos|zip")
 
@@ -26,6 +30,21 @@ class JobOut(BaseModel):
     preview_keys: list[str] = Field(default_factory=list)
     error: str | None = None
 
+class JobSummaryOut(BaseModel):
+    """List view: enough to render a job row; GET /jobs/{id} returns the full JobOut."""
+    id: str
+    status: str
+    progress: int
+    created_at: str
+    updated_at: str | None = None
+    prompt: str | None = None
+    preview_key: str | None = None
+    error: str | None = None
+
 class DownloadOut(BaseModel):
     url: str
     expires_in: int
+
+class StreamTokenOut(BaseModel):
+    stream_token: str
+    expires_in: int
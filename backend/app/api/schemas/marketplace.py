@@ -19,6 +19,11 @@ class AssetOut(BaseModel):
     thumb_url: str | None = None
     model_object_key: str
     preview_url: str | None = None
+    like_count: int = 0
+    save_count: int = 0
+    download_count: int = 0
+    view_count: int = 0
+    entitled: bool | None = None
     metadata: dict[str, Any] = Field(default_factory=dict)
 
 class AssetCreateIn(BaseModel):
@@ -63,3 +68,10 @@ class EntitlementOut(BaseModel):
     asset_id: str
     entitled: bool
     reason: str
+
+class AssetSearchOut(BaseModel):
+    items: list[AssetOut]
+    total: int
+    limit: int
+    offset: int
+    facets: dict[str, dict[str, int]] = Field(default_factory=dict)
@@ -28,4 +28,6 @@ class PostOut(BaseModel):
     asset_id: str | None = None
     caption: str | None = None
     media_keys: list[str] = Field(default_factory=list)
+    like_count: int = 0
+    save_count: int = 0
     created_at: str
@@ -7,6 +7,9 @@ class Settings(BaseSettings):
 
     database_url: str = "postgresql+psycopg://r2v:r2v@db:5432/r2v"
     redis_url: str = "redis://redis:6379/0"
+    redis_socket_timeout_s: float = 1.0
+    # Longest a buffered-counter flush may hold its drain lock before another worker may take over.
+    redis_drain_lock_ttl_s: float = 300.0
 
     s3_endpoint_url: str = "http://minio:9000"
     s3_public_endpoint_url: str | None = "http://localhost:9000"
@@ -17,14 +20,53 @@ class Settings(BaseSettings):
     s3_bucket_marketplace_thumbs: str = "r2v-marketplace-thumbs"
     s3_bucket_scans_raw: str = "r2v-user-scans-raw"
     s3_bucket_job_outputs: str = "r2v-job-outputs"
+    s3_presign_cache_size: int = 10000
+    s3_multipart_threshold_bytes: int = 16 * 1024 * 1024
+    s3_multipart_chunksize_bytes: int = 16 * 1024 * 1024
+    s3_transfer_max_concurrency: int = 8
+    # 0 = sized for every worker thread running a full-concurrency transfer at once.
+    s3_max_pool_connections: int = 0
+    scan_ingest_concurrency: int = 8
+    scan_input_cache_dir: str = "/tmp/r2v-scan-cache"
+    scan_input_cache_max_bytes: int = 10 * 1024 * 1024 * 1024
+    # Zip scans: per-image size is capped by max_upload_bytes, the archive and its expanded
+    # images by scan_zip_max_bytes.
+    scan_zip_max_bytes: int = 8 * 1024 * 1024 * 1024
+    scan_zip_max_members: int = 10000
+    scan_zip_max_ratio: int = 50
+    scan_zip_read_bytes: int = 8 * 1024 * 1024
+    scan_preprocess_max_px: int = 3200
+    scan_preprocess_format: str = "JPEG"
+    scan_preprocess_quality: int = 92
+    # Laplacian variance measured at scan_blur_analysis_px; frames below it are dropped as blurry.
+    scan_blur_threshold: float = 60.0
+    scan_blur_analysis_px: int = 1024
+    # 0 = one process per core
+    scan_preprocess_workers: int = 0
+    # Mesh repair: weld distance as a fraction of the bounding box, largest hole (in edges) to fill.
+    mesh_weld_tolerance: float = 1e-6
+    mesh_hole_max_edges: int = 32
 
     jwt_secret: str = "dev_secret_change_in_prod"
     jwt_issuer: str = "r2v-backend"
     jwt_audience: str = "r2v-client"
     access_token_expires_min: int = 30
+    stream_token_expires_s: int = 60
     refresh_token_expires_days: int = 30
     verification_code_expires_min: int = 15
     password_reset_expires_min: int = 30
+    principal_cache_size: int = 10000
+    principal_cache_local_ttl_s: int = 5
+    principal_cache_ttl_s: int = 60
+    counter_flush_interval_s: int = 30
+    counter_reconcile_interval_s: int = 3600
+    profile_stats_ttl_s: int = 300
+    entitlement_cache_ttl_s: int = 300
+    user_stats_rebuild_interval_s: int = 24 * 3600
+    user_stats_rebuild_days: int = 7
+    recently_viewed_max: int = 50
+    recently_viewed_ttl_s: int = 30 * 24 * 3600
+    recently_viewed_flush_interval_s: int = 5
 
     google_oauth_client_id: str = ""
     google_oauth_client_secret: str = ""
@@ -45,11 +87,23 @@ class Settings(BaseSettings):
     allowed_origin_regex: str = r"^https?://(localhost|127\.0\.0\.1)(:\d+)?$"
     env: str = "dev"
     log_level: str = "INFO"
+    log_format: str = "json"
+    log_request_sample_rate: float = 1.0
+    log_slow_request_ms: float = 1000.0
+    metrics_enabled: bool = True
 
     rate_limit_requests: int = 120
     rate_limit_window_seconds: int = 60
+    rate_limit_routes: dict[str, str] = {}
+    rate_limit_local_max_keys: int = 10000
+    rate_limit_redis_retry_s: float = 5.0
     max_upload_bytes: int = 104857600
 
+    job_events_keepalive_s: float = 15.0
+    job_events_queue_size: int = 64
+    job_events_retry_s: float = 1.0
+    job_progress_ttl_s: int = 86400
+
     modal_api_url: str = "https://realtwovirtual1--r2v-gpu-api-fastapi-app.modal.run"
     modal_image_to_3d_path: str = "/image-to-3d"
     modal_prompt_to_3d_path: str = "/text-to-3d"
@@ -57,5 +111,17 @@ class Settings(BaseSettings):
     modal_download_retry_s: int = 5
     modal_download_max_attempts: int = 30
     modal_download_fallback_max_attempts: int = 6
+    modal_backoff_cap_s: float = 60.0
+    modal_submit_attempts: int = 4
+    modal_connect_timeout_s: float = 10.0
+    modal_max_connections: int = 32
+    modal_stream_chunk_bytes: int = 1048576
+    modal_max_artifact_bytes: int = 1073741824
+    modal_endpoint_cache_ttl_s: int = 86400
+    modal_endpoint_local_ttl_s: float = 300.0
+    modal_probe_on_startup: bool = False
+    # ai_generate_task runs on its own queue, consumed by a threads-pool worker (see docker-compose).
+    celery_modal_queue: str = "r2v-modal"
+    worker_metrics_port: int = 0
 
 settings = Settings()
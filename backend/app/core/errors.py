@@ -15,3 +15,6 @@ def not_found(message: str = "Not found"):
 
 def conflict(message: str = "Conflict"):
     raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=message)
+
+def too_many_requests(message: str = "Too many requests", retry_after: int = 1):
+    raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=message, headers={"Retry-After": str(retry_after)})
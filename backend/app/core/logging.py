@@ -1,8 +1,116 @@
 from __future__ import annotations
-import logging, sys
+import atexit
+import datetime as dt
+import logging, os, sys
+import queue
+import random
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+import orjson
+from app.core.config import settings
+
+# Set by the request middleware and by Celery task_prerun; stamped onto every record.
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+_listener: QueueListener | None = None
+_handler: QueueHandler | None = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: fixed keys, then any ``extra`` fields attached to the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": dt.datetime.fromtimestamp(record.created, dt.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+class ContextFilter(logging.Filter):
+    """Copies the request_id contextvar onto the record while still on the logging thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+class RequestSampler(logging.Filter):
+    """Keeps a fraction of routine access logs; errors and slow requests are always kept."""
+
+    def __init__(self, rate: float, slow_ms: float) -> None:
+        super().__init__()
+        self.rate = rate
+        self.slow_ms = slow_ms
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.msg != "request" or record.levelno > logging.INFO:
+            return True
+        if getattr(record, "status_code", 0) >= 400 or getattr(record, "duration_ms", 0) >= self.slow_ms:
+            return True
+        return random.random() < self.rate
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stdlib version merges everything into msg via self.format; keep the fields
+        # structured and only make the record safe to hand to another thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 def configure_logging() -> None:
-    logging.basicConfig(level=logging.INFO, stream=sys.stdout, format="%(levelname)s %(name)s %(message)s")
+    """Routes the root logger through a queue; a background listener thread does the I/O."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(q)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(RequestSampler(settings.log_request_sample_rate, settings.log_slow_request_ms))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.log_level.upper())
+    _handler = handler
+    _listener = QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_restart_listener)
+
+def _restart_listener() -> None:
+    # A forked child (Celery prefork, multi-worker servers) inherits the handler and queue but not
+    # the listener thread: without its own, every record it logs would pile up unread. The fresh
+    # queue also keeps the child from re-emitting whatever the parent had not written yet.
+    global _listener
+    if _listener is None or _handler is None:
+        return
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    _handler.queue = q
+    _listener = QueueListener(q, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
 
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+import os
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+# With several uvicorn workers each process writes its samples to mmap files under
+# PROMETHEUS_MULTIPROC_DIR (set before this module is imported; see docker/entrypoint.api.sh)
+# and /metrics merges every worker's files, so a scrape hitting any worker sees the whole server.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template (p50/p95/p99 via histogram_quantile).",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size by route template.",
+    ["method", "route"], buckets=SIZE_BUCKETS,
+)
+
+TRANSFER_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+THROUGHPUT_BUCKETS = tuple(mb * 1024 * 1024 for mb in (1, 5, 10, 25, 50, 100, 200, 400, 800))
+
+S3_TRANSFER_SECONDS = Histogram(
+    "s3_transfer_duration_seconds", "S3 object transfer time.", ["direction"], buckets=TRANSFER_SECONDS_BUCKETS,
+)
+S3_TRANSFER_THROUGHPUT = Histogram(
+    "s3_transfer_throughput_bytes_per_second", "Per-object S3 transfer throughput.", ["direction"],
+    buckets=THROUGHPUT_BUCKETS,
+)
+S3_TRANSFER_BYTES = Counter("s3_transfer_bytes", "Bytes moved to/from S3.", ["direction"])
+
+def observe_transfer(direction: str, size: int, seconds: float) -> None:
+    S3_TRANSFER_SECONDS.labels(direction).observe(seconds)
+    S3_TRANSFER_BYTES.labels(direction).inc(size)
+    if seconds > 0:
+        S3_TRANSFER_THROUGHPUT.labels(direction).observe(size / seconds)
+
+def observe_request(method: str, route: str, status: int, duration_ns: int, size: int) -> None:
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(duration_ns / 1e9)
+    RESPONSE_SIZE.labels(method, route).observe(size)
+
+def collector_registry() -> CollectorRegistry:
+    """What to expose: every process's samples merged when running multi-process (uvicorn
+    workers, Celery prefork children), else this process's default registry."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(collector_registry()), CONTENT_TYPE_LATEST
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Called as a process exits: drops its live-gauge files from PROMETHEUS_MULTIPROC_DIR so the
+    merged output stops reporting a pid that is gone (counters and histograms are kept)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROC_DIR)
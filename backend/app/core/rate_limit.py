@@ -1,20 +1,128 @@
 from __future__ import annotations
-from fastapi import Request
-from starlette.responses import JSONResponse
+import math
+import time
+from collections import OrderedDict
+from fastapi import Response
+from starlette.requests import HTTPConnection
 from app.core.config import settings
-from app.services.redis_client import get_redis_sync
-
-async def rate_limit_middleware(request: Request, call_next):
-    ip = request.client.host if request.client else "unknown"
-    key = f"rl:{ip}:{request.url.path}"
-    r = get_redis_sync()
-    try:
-        count = r.incr(key)
-        if count == 1:
-            r.expire(key, settings.rate_limit_window_seconds)
-        if count > settings.rate_limit_requests:
-            retry_after = r.ttl(key)
-            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers={"Retry-After": str(max(retry_after, 1))})
-    except Exception:
-        pass
-    return await call_next(request)
+from app.core.errors import too_many_requests
+from app.core.logging import get_logger
+from app.core.routes import route_template
+from app.core.security import decode_token
+from app.services.redis_client import get_redis_async
+
+log = get_logger(__name__)
+
+# Per-route budgets as "METHOD /route/template" -> (requests, window seconds); 0 requests = unlimited.
+# Anything not listed gets rate_limit_requests / rate_limit_window_seconds. Entries in
+# settings.rate_limit_routes ("POST /auth/login": "10/60") override these.
+ROUTE_BUDGETS: dict[str, tuple[int, int]] = {
+    "POST /auth/login": (10, 60),
+    "POST /auth/signup": (5, 60),
+    "POST /auth/refresh": (30, 60),
+    "POST /auth/verify/request": (5, 300),
+    "POST /auth/password/forgot": (5, 300),
+    "POST /auth/password/verify": (10, 300),
+    "POST /auth/password/reset": (5, 300),
+    "POST /ai/jobs": (20, 60),
+    "POST /scan/jobs": (20, 60),
+    "POST /stripe/webhook": (0, 60),
+}
+
+# GCRA in one round trip. KEYS[1] holds the theoretical arrival time (ms, Redis clock).
+# ARGV: emission interval ms, burst tolerance ms. Returns {allowed, retry_after_ms, remaining}.
+GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - tolerance
+if allow_at > now then
+  return {0, allow_at - now, 0}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, 0, math.floor((tolerance - (new_tat - now)) / interval)}
+"""
+
+def _budget(route_key: str) -> tuple[int, int]:
+    override = settings.rate_limit_routes.get(route_key)
+    if override:
+        limit, window = override.split("/", 1)
+        return int(limit), int(window)
+    return ROUTE_BUDGETS.get(route_key, (settings.rate_limit_requests, settings.rate_limit_window_seconds))
+
+def _identity(request: HTTPConnection) -> str:
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        try:
+            payload = decode_token(auth[7:])
+            if payload.get("type") == "access" and payload.get("sub"):
+                return f"u:{payload['sub']}"
+        except Exception:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+class LocalTokenBuckets:
+    """Per-process fallback used while Redis is unreachable; limits then apply per worker."""
+
+    def __init__(self, max_keys: int) -> None:
+        self._max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, limit: int, window_s: int) -> tuple[bool, float, int]:
+        rate = limit / window_s
+        now = time.monotonic()
+        tokens, stamp = self._buckets.pop(key, (float(limit), now))
+        tokens = min(float(limit), tokens + (now - stamp) * rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1.0 - tokens) / rate
+        return allowed, retry_after, int(tokens)
+
+class RateLimiter:
+    def __init__(self) -> None:
+        self._script = None
+        self._local = LocalTokenBuckets(settings.rate_limit_local_max_keys)
+        self._redis_down_until = 0.0
+
+    async def _redis_check(self, key: str, limit: int, window_s: int) -> tuple[bool, float, int]:
+        if self._script is None:
+            self._script = get_redis_async().register_script(GCRA_LUA)
+        interval_ms = window_s * 1000 / limit
+        allowed, retry_ms, remaining = await self._script(keys=[key], args=[interval_ms, window_s * 1000])
+        return bool(allowed), int(retry_ms) / 1000, int(remaining)
+
+    async def check(self, key: str, limit: int, window_s: int) -> tuple[bool, float, int]:
+        """Returns (allowed, retry_after_s, remaining). Redis errors trip a short circuit breaker."""
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                return await self._redis_check(key, limit, window_s)
+            except Exception:
+                log.warning("rate limiter falling back to local buckets", exc_info=True)
+                self._redis_down_until = time.monotonic() + settings.rate_limit_redis_retry_s
+        return self._local.take(key, limit, window_s)
+
+limiter = RateLimiter()
+
+async def rate_limit(request: HTTPConnection, response: Response) -> None:
+    """Router dependency: budgets are keyed by route template and principal (or client IP).
+
+    Also runs for WebSocket routes, where it limits connection attempts under the "WS" method.
+    """
+    method = request.scope.get("method", "WS")
+    route_key = f"{method} {route_template(request.scope) or request.url.path}"
+    limit, window_s = _budget(route_key)
+    if limit <= 0:
+        return
+    allowed, retry_after, remaining = await limiter.check(f"rl:{route_key}:{_identity(request)}", limit, window_s)
+    if not allowed:
+        too_many_requests("Rate limit exceeded", retry_after=max(1, math.ceil(retry_after)))
+    response.headers["X-RateLimit-Limit"] = str(limit)
+    response.headers["X-RateLimit-Remaining"] = str(remaining)
@@ -0,0 +1,16 @@
+from __future__ import annotations
+from typing import Any, MutableMapping
+
+def route_template(scope: MutableMapping[str, Any]) -> str | None:
+    """Full path template of the route matched for this scope ("/marketplace/assets/{asset_id}").
+
+    scope["route"].path carries the include_router prefixes where routers are copied in at
+    include time; releases that resolve included routers lazily record the combined prefix in
+    scope["fastapi"]["included_router"] instead. None until routing has matched a route.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return None
+    included = (scope.get("fastapi") or {}).get("included_router")
+    prefix = getattr(getattr(included, "include_context", None), "prefix", "")
+    return prefix + template
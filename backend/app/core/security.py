@@ -33,6 +33,22 @@ def create_access_token(sub: str, role: str) -> str:
     }
     return jwt.encode(payload, settings.jwt_secret, algorithm=ALGORITHM)
 
+def create_stream_token(sub: str, role: str, job_id: str) -> str:
+    """Short-lived token for one job's event stream; the only credential that may ride in a URL."""
+    now = dt.datetime.now(dt.timezone.utc)
+    exp = now + dt.timedelta(seconds=settings.stream_token_expires_s)
+    payload = {
+        "iss": settings.jwt_issuer,
+        "aud": settings.jwt_audience,
+        "sub": sub,
+        "role": role,
+        "job": job_id,
+        "iat": int(now.timestamp()),
+        "exp": int(exp.timestamp()),
+        "type": "stream",
+    }
+    return jwt.encode(payload, settings.jwt_secret, algorithm=ALGORITHM)
+
 def create_refresh_token() -> str:
     return secrets.token_urlsafe(48)
 
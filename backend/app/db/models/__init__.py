@@ -4,3 +4,4 @@ from app.db.models.jobs import AIJob, ScanJob
 from app.db.models.marketplace import Asset, Download, Purchase, Subscription, RecentlyViewed
 from app.db.models.social import Post, Like, Save, Follow, Notification
 from app.db.models.audit import AuditLog
+from app.db.models.stats import UserStatsDaily
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import uuid, datetime as dt
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -12,10 +12,11 @@ class AIJob(Base):
     status: Mapped[str] = mapped_column(String(32), index=True, default="queued", nullable=False)
     progress: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     prompt: Mapped[str] = mapped_column(Text, nullable=False)
-    settings_json: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
-    logs: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Heavy payload columns are deferred: only the worker reads them, never the job endpoints.
+    settings_json: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False, deferred=True)
+    logs: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
-    timings: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    timings: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False, deferred=True)
     # NOTE: attribute name cannot be "metadata" (reserved by SQLAlchemy Declarative).
     # Column name MUST remain "metadata" per the project spec.
     job_metadata: Mapped[dict] = mapped_column("metadata", JSONB, default=dict, nullable=False)
@@ -26,14 +27,16 @@ class AIJob(Base):
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), onupdate=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
 
+Index("ix_ai_jobs_user_created_at_id", AIJob.user_id, AIJob.created_at.desc(), AIJob.id.desc())
+
 class ScanJob(Base):
     __tablename__ = "scan_jobs"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     status: Mapped[str] = mapped_column(String(32), index=True, default="created", nullable=False)
     progress: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
-    input_keys: Mapped[list] = mapped_column(JSONB, default=list, nullable=False)
-    logs: Mapped[str | None] = mapped_column(Text, nullable=True)
+    input_keys: Mapped[list] = mapped_column(JSONB, default=list, nullable=False, deferred=True)
+    logs: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
     # NOTE: attribute name cannot be "metadata" (reserved by SQLAlchemy Declarative).
     # Column name MUST remain "metadata" per the project spec.
@@ -43,3 +46,5 @@ class ScanJob(Base):
     preview_keys: Mapped[list] = mapped_column(JSONB, default=list, nullable=False)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), onupdate=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
+
+Index("ix_scan_jobs_user_created_at_id", ScanJob.user_id, ScanJob.created_at.desc(), ScanJob.id.desc())
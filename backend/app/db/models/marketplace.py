@@ -1,13 +1,21 @@
 from __future__ import annotations
 import uuid, datetime as dt
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, Index
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy import Boolean, Computed, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
 
+ASSET_SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(jsonb_to_tsvector('english', coalesce(tags, '[]'::jsonb), '[\"string\"]'), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
 class Asset(Base):
     __tablename__ = "assets"
-    __table_args__ = (Index("ix_assets_search", "title", "category", "style"),)
+    __table_args__ = (Index("ix_assets_search", "title", "category", "style"),
+                      Index("ix_assets_search_vector", "search_vector", postgresql_using="gin"),
+                      Index("ix_assets_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}))
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     creator_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     title: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
@@ -27,9 +35,20 @@ class Asset(Base):
     # NOTE: attribute name cannot be "metadata" (reserved by SQLAlchemy Declarative).
     # Column name MUST remain "metadata" per the project spec.
     meta_json: Mapped[dict] = mapped_column("metadata", JSONB, default=dict, nullable=False)
+    # Denormalized counters, bumped with atomic UPDATEs (views are buffered in Redis) and
+    # repaired from the source tables by the reconcile_counters beat task.
+    like_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    save_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    download_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    view_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Maintained by Postgres (generated column); deferred so listings never transfer it.
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, Computed(ASSET_SEARCH_VECTOR_SQL, persisted=True), nullable=True, deferred=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), onupdate=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
 
+# Keyset pagination of public listings: WHERE visibility = 'published' ORDER BY published_at DESC, id DESC.
+Index("ix_assets_visibility_published_at_id", Asset.visibility, Asset.published_at.desc(), Asset.id.desc())
+
 class Download(Base):
     __tablename__ = "downloads"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
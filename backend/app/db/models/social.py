@@ -1,6 +1,6 @@
 from __future__ import annotations
 import uuid, datetime as dt
-from sqlalchemy import Boolean, CheckConstraint, DateTime, ForeignKey, String, Text, UniqueConstraint, Index
+from sqlalchemy import Boolean, CheckConstraint, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -12,8 +12,12 @@ class Post(Base):
     asset_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("assets.id", ondelete="SET NULL"), index=True, nullable=True)
     caption: Mapped[str | None] = mapped_column(Text, nullable=True)
     media_keys: Mapped[list] = mapped_column(JSONB, default=list, nullable=False)
+    like_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    save_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), index=True, nullable=False)
 
+Index("ix_posts_created_at_id", Post.created_at.desc(), Post.id.desc())
+
 class Like(Base):
     __tablename__ = "likes"
     __table_args__ = (CheckConstraint("(post_id IS NOT NULL) <> (asset_id IS NOT NULL)", name="ck_like_exactly_one"),
@@ -45,6 +49,10 @@ class Follow(Base):
     following_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
 
+# Keyset pagination of follower/following lists: newest relationship first.
+Index("ix_follows_following_created_at_id", Follow.following_id, Follow.created_at.desc(), Follow.id.desc())
+Index("ix_follows_follower_created_at_id", Follow.follower_id, Follow.created_at.desc(), Follow.id.desc())
+
 class Notification(Base):
     __tablename__ = "notifications"
     __table_args__ = (Index("ix_notifications_user_unread", "user_id", "is_read"),)
@@ -54,3 +62,5 @@ class Notification(Base):
     payload_json: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
     is_read: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), index=True, nullable=False)
+
+Index("ix_notifications_user_created_at_id", Notification.user_id, Notification.created_at.desc(), Notification.id.desc())
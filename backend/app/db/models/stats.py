@@ -0,0 +1,16 @@
+from __future__ import annotations
+import uuid, datetime as dt
+from sqlalchemy import Date, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class UserStatsDaily(Base):
+    """Per-user, per-UTC-day rollup behind the dashboard; maintained by app.services.user_stats."""
+    __tablename__ = "user_stats_daily"
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    assets: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    downloads: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    ai_jobs: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    scan_jobs: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
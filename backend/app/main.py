@@ -3,15 +3,17 @@ from __future__ import annotations
 import time
 import uuid
 import re
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config import settings
-from app.core.logging import configure_logging, get_logger
-from app.core.rate_limit import rate_limit_middleware
+from app.core.logging import configure_logging, get_logger, request_id_var
+from app.core.metrics import mark_process_dead, observe_request, render_latest
+from app.core.rate_limit import rate_limit
+from app.core.routes import route_template
 from app.api.router import api_router
 
 configure_logging()
@@ -32,47 +34,97 @@ class NormalizePathMiddleware:
                     scope["raw_path"] = normalized.encode()
         await self.app(scope, receive, send)
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-        request.state.request_id = request_id
-        start = time.time()
-        response = await call_next(request)
-        response.headers["x-request-id"] = request_id
-        duration_ms = int((time.time() - start) * 1000)
-        log.info(
-            "request",
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "status_code": response.status_code,
-                "duration_ms": duration_ms,
-            },
-        )
-        return response
+class RequestIDMiddleware:
+    """Pure ASGI: assigns/echoes x-request-id, times the request and records per-route metrics.
+
+    Wrapping ``send`` (rather than BaseHTTPMiddleware's call_next) adds no task or memory-stream
+    hop and leaves streaming responses untouched; the clock stops when the last body chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        start = time.perf_counter_ns()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ns = time.perf_counter_ns() - start
+            route = route_template(scope) or "unmatched"
+            observe_request(scope["method"], route, status, duration_ns, size)
+            log.info(
+                "request",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status_code": status,
+                    "duration_ms": round(duration_ns / 1e6, 3),
+                    "response_bytes": size,
+                },
+            )
+            request_id_var.reset(token)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Each uvicorn worker runs this on its way out.
+    mark_process_dead()
 
 app = FastAPI(
     title="R2V Studio Backend",
     version="0.1.0",
     default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
-app.add_middleware(NormalizePathMiddleware)
+# add_middleware wraps, so the last one added runs first: CORS, then path normalization, then
+# RequestID, which therefore sees the normalized scope that routing annotates with the route.
 app.add_middleware(RequestIDMiddleware)
+app.add_middleware(NormalizePathMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[o.strip() for o in settings.allowed_origins.split(",") if o.strip()],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
     allow_origin_regex=settings.allowed_origin_regex,
 )
 
-
-app.middleware("http")(rate_limit_middleware)
-app.include_router(api_router)
+app.include_router(api_router, dependencies=[Depends(rate_limit)])
 
 @app.get("/health")
 async def health():
-    return {"ok": True, "env": settings.env}
\ No newline at end of file
+    return {"ok": True, "env": settings.env}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    body, content_type = render_latest()
+    return Response(body, media_type=content_type)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import base64
+import binascii
+import mimetypes
+import uuid
+from pathlib import PurePath
+from app.core.config import settings
+from app.core.errors import bad_request
+from app.services.s3 import s3
+
+# AI job input images live next to the job outputs, under a per-user prefix; the job row only
+# keeps settings_json["image_key"] (plus filename/mime), never the bytes.
+
+def input_key(user_id, filename: str) -> str:
+    name = PurePath(filename).name or "upload.png"
+    return f"{user_id}/ai-inputs/{uuid.uuid4()}_{name}"
+
+def owns_input_key(user_id, key: str) -> bool:
+    return key.startswith(f"{user_id}/ai-inputs/") and ".." not in key
+
+def store_base64_input(user_id, image_base64: str, filename: str | None, mime: str | None) -> str:
+    """Legacy clients still send image_base64: upload it once here and return the object key."""
+    if image_base64.startswith("data:") and "," in image_base64:
+        image_base64 = image_base64.split(",", 1)[1]
+    if len(image_base64) * 3 // 4 > settings.max_upload_bytes:
+        bad_request("Image too large")
+    try:
+        data = base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        bad_request("image_base64 is not valid base64")
+    filename = filename or "upload.png"
+    key = input_key(user_id, filename)
+    s3.upload_bytes(data, settings.s3_bucket_job_outputs, key, content_type=mime or mimetypes.guess_type(filename)[0] or "image/png")
+    return key
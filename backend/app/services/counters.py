@@ -0,0 +1,66 @@
+from __future__ import annotations
+import uuid
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+from app.core.logging import get_logger
+from app.db.models.marketplace import Asset, Download
+from app.db.models.social import Like, Post, Save
+from app.services.redis_client import drain_hash, get_redis_sync
+
+log = get_logger(__name__)
+
+ASSET_VIEWS_KEY = "counters:asset_views"
+ASSET_VIEWS_FLUSHING_KEY = "counters:asset_views:flushing"
+
+def bump(db: Session, model, row_id, **deltas: int) -> None:
+    """Atomic ``SET col = greatest(col + delta, 0)`` in the caller's transaction; no row is loaded."""
+    cols = model.__table__.c
+    values = {name: func.greatest(cols[name] + delta, 0) for name, delta in deltas.items()}
+    db.execute(update(model).where(model.id == row_id).values(values))
+
+def record_asset_view(db: Session, asset_id: uuid.UUID) -> None:
+    """Buffers a view in Redis (flushed by ``flush_view_counters``); falls back to a direct update."""
+    try:
+        get_redis_sync().hincrby(ASSET_VIEWS_KEY, str(asset_id), 1)
+    except Exception:
+        log.warning("view counter buffer unavailable, writing through", exc_info=True)
+        bump(db, Asset, asset_id, view_count=1)
+        db.commit()
+
+def flush_view_counters(db: Session) -> int:
+    """Moves buffered view increments into ``assets.view_count`` in one batched UPDATE."""
+    stmt = (
+        update(Asset.__table__)
+        .where(Asset.__table__.c.id == bindparam("b_id"))
+        .values(view_count=Asset.__table__.c.view_count + bindparam("b_delta"))
+    )
+
+    def apply(pending: dict[str, str]) -> None:
+        db.execute(stmt, [{"b_id": uuid.UUID(k), "b_delta": int(v)} for k, v in pending.items()])
+        db.commit()
+
+    return drain_hash(get_redis_sync(), ASSET_VIEWS_KEY, ASSET_VIEWS_FLUSHING_KEY, apply)
+
+def _count(model, fk):
+    return select(func.count()).select_from(model).where(fk).correlate_except(model).scalar_subquery()
+
+def reconcile_counters(db: Session) -> None:
+    """Recomputes like/save/download counters from the source tables where they drifted."""
+    targets = (
+        (Asset, {
+            "like_count": _count(Like, Like.asset_id == Asset.id),
+            "save_count": _count(Save, Save.asset_id == Asset.id),
+            "download_count": _count(Download, Download.asset_id == Asset.id),
+        }),
+        (Post, {
+            "like_count": _count(Like, Like.post_id == Post.id),
+            "save_count": _count(Save, Save.post_id == Post.id),
+        }),
+    )
+    for model, counts in targets:
+        cols = model.__table__.c
+        drifted = or_(*(cols[name] != expr for name, expr in counts.items()))
+        result = db.execute(update(model).where(drifted).values(counts).execution_options(synchronize_session=False))
+        if result.rowcount:
+            log.info("reconciled %s drifted %s counters", result.rowcount, model.__tablename__)
+    db.commit()
@@ -1,17 +1,104 @@
 from __future__ import annotations
+from typing import Iterable
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_
+from sqlalchemy import Select, exists, func, select, and_
+from app.core.config import settings
+from app.core.logging import get_logger
 from app.db.models.marketplace import Asset, Purchase, Subscription
+from app.services.redis_client import get_redis_async, get_redis_sync
 
-def is_entitled_to_asset(db: Session, user_id, asset: Asset) -> tuple[bool, str]:
+log = get_logger(__name__)
+
+def _key(user_id) -> str:
+    return f"entitlements:{user_id}"
+
+def _state_stmt(user_id) -> Select:
+    """Subscription flag and purchased asset ids in one row."""
+    subscribed = exists().where(and_(Subscription.user_id == user_id, Subscription.status.in_(["active", "trialing"])))
+    purchased = (
+        select(func.array_agg(Purchase.asset_id.distinct()))
+        .where(and_(Purchase.user_id == user_id, Purchase.status == "succeeded"))
+        .scalar_subquery()
+    )
+    return select(subscribed.label("subscribed"), purchased.label("purchased"))
+
+def _state(row) -> dict:
+    return {"subscribed": bool(row.subscribed), "purchased": {str(a) for a in row.purchased or ()}}
+
+def _decode(cached) -> dict:
+    data = orjson.loads(cached)
+    return {"subscribed": data["subscribed"], "purchased": set(data["purchased"])}
+
+def _encode(state: dict) -> bytes:
+    return orjson.dumps({"subscribed": state["subscribed"], "purchased": sorted(state["purchased"])})
+
+def entitlement_state(db: Session, user_id) -> dict:
+    """{"subscribed": bool, "purchased": set of asset id strings}, cached in Redis per user."""
+    r = get_redis_sync()
+    try:
+        cached = r.get(_key(user_id))
+    except Exception:
+        log.warning("entitlement cache unavailable", exc_info=True)
+        return _state(db.execute(_state_stmt(user_id)).one())
+    if cached:
+        return _decode(cached)
+    state = _state(db.execute(_state_stmt(user_id)).one())
+    try:
+        r.set(_key(user_id), _encode(state), ex=settings.entitlement_cache_ttl_s)
+    except Exception:
+        log.warning("entitlement cache unavailable", exc_info=True)
+    return state
+
+async def entitlement_state_async(db: AsyncSession, user_id) -> dict:
+    r = get_redis_async()
+    try:
+        cached = await r.get(_key(user_id))
+    except Exception:
+        log.warning("entitlement cache unavailable", exc_info=True)
+        return _state((await db.execute(_state_stmt(user_id))).one())
+    if cached:
+        return _decode(cached)
+    state = _state((await db.execute(_state_stmt(user_id))).one())
+    try:
+        await r.set(_key(user_id), _encode(state), ex=settings.entitlement_cache_ttl_s)
+    except Exception:
+        log.warning("entitlement cache unavailable", exc_info=True)
+    return state
+
+def invalidate_entitlements(user_id) -> None:
+    try:
+        get_redis_sync().delete(_key(user_id))
+    except Exception:
+        log.warning("could not invalidate entitlements for %s", user_id, exc_info=True)
+
+_NO_STATE = {"subscribed": False, "purchased": frozenset()}
+
+def _needs_state(assets: list[Asset]) -> bool:
+    return any(a.is_paid and a.visibility == "published" for a in assets)
+
+def _resolve(state: dict, asset: Asset) -> tuple[bool, str]:
     if asset.visibility != "published":
         return False, "asset_not_published"
     if not asset.is_paid:
         return True, "free"
-    q = select(Purchase).where(and_(Purchase.user_id == user_id, Purchase.asset_id == asset.id, Purchase.status == "succeeded"))
-    if db.execute(q).scalar_one_or_none():
+    if str(asset.id) in state["purchased"]:
         return True, "purchase"
-    sq = select(Subscription).where(and_(Subscription.user_id == user_id, Subscription.status.in_(["active", "trialing"])))
-    if db.execute(sq).scalar_one_or_none():
+    if state["subscribed"]:
         return True, "subscription"
     return False, "not_entitled"
+
+def is_entitled_to_asset(db: Session, user_id, asset: Asset) -> tuple[bool, str]:
+    return _resolve(entitlement_state(db, user_id) if _needs_state([asset]) else _NO_STATE, asset)
+
+def is_entitled_many(db: Session, user_id, assets: Iterable[Asset]) -> dict:
+    """asset.id -> entitled, for a whole page from at most one query (none on a cache hit)."""
+    assets = list(assets)
+    state = entitlement_state(db, user_id) if _needs_state(assets) else _NO_STATE
+    return {a.id: _resolve(state, a)[0] for a in assets}
+
+async def is_entitled_many_async(db: AsyncSession, user_id, assets: Iterable[Asset]) -> dict:
+    assets = list(assets)
+    state = await entitlement_state_async(db, user_id) if _needs_state(assets) else _NO_STATE
+    return {a.id: _resolve(state, a)[0] for a in assets}
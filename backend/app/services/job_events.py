@@ -0,0 +1,86 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+from typing import AsyncIterator
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.redis_client import get_redis_pubsub
+
+log = get_logger(__name__)
+
+CHANNEL_PREFIX = "job-events:"
+TERMINAL_STATUSES = frozenset({"succeeded", "failed"})
+
+def channel(kind: str, job_id) -> str:
+    return f"{CHANNEL_PREFIX}{kind}:{job_id}"
+
+def job_event(job, progress: int | None = None) -> dict:
+    """The progress snapshot streamed to clients; a subset of JobOut. Published by ProgressReporter."""
+    return {
+        "id": str(job.id), "status": job.status, "progress": job.progress if progress is None else progress,
+        "error": job.error,
+        "output_glb_key": job.output_glb_key, "preview_keys": job.preview_keys or [],
+    }
+
+class JobEventHub:
+    """One Redis pattern subscription per API process, fanned out to per-connection queues.
+
+    Streams never open their own pub/sub connection; a slow client only loses its own oldest
+    buffered events. While Redis is unreachable ``ready`` is cleared and streams fall back to
+    re-reading the job on each keepalive tick.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._task: asyncio.Task | None = None
+        self.ready = asyncio.Event()
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = get_redis_pubsub().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self.ready.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("job event subscription lost; retrying", exc_info=True)
+            finally:
+                self.ready.clear()
+                with contextlib.suppress(Exception):
+                    await pubsub.aclose()
+            await asyncio.sleep(settings.job_events_retry_s)
+
+    def _dispatch(self, name: str, data: str) -> None:
+        for q in self._subscribers.get(name, ()):
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(data)
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.ready = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, name: str) -> AsyncIterator[asyncio.Queue]:
+        q: asyncio.Queue = asyncio.Queue(maxsize=settings.job_events_queue_size)
+        self._subscribers.setdefault(name, set()).add(q)
+        self._ensure_running()
+        with contextlib.suppress(TimeoutError):
+            # Subscribed before the caller reads its snapshot, so no event falls in between.
+            await asyncio.wait_for(self.ready.wait(), timeout=settings.redis_socket_timeout_s)
+        try:
+            yield q
+        finally:
+            subscribers = self._subscribers.get(name)
+            if subscribers is not None:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[name]
+
+hub = JobEventHub()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import datetime as dt
+from typing import Iterable
+import orjson
+from sqlalchemy.orm import undefer
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.session import SessionLocal
+from app.services.job_events import TERMINAL_STATUSES, channel, job_event
+from app.services.redis_client import get_redis_async, get_redis_sync
+
+log = get_logger(__name__)
+
+def progress_key(kind: str, job_id) -> str:
+    return f"job-progress:{kind}:{job_id}"
+
+class ProgressReporter:
+    """Job state for workers: percentages go to Redis (and out to event streams), while Postgres
+    only sees status transitions, each in its own short session. No connection is held between
+    calls, so long external work (Modal, S3) never pins a pooled connection."""
+
+    def __init__(self, kind: str, model, job_id) -> None:
+        self.kind = kind
+        self.model = model
+        self.job_id = job_id
+        self._event: dict | None = None
+
+    def transition(self, status: str, progress: int | None = None, *, load: Iterable = (), **fields):
+        """Persists a state change and returns the job (detached, attributes loaded), or None if gone."""
+        with SessionLocal(expire_on_commit=False) as db:
+            job = db.get(self.model, self.job_id, options=[undefer(col) for col in load])
+            if job is None:
+                return None
+            job.status = status
+            if progress is not None:
+                job.progress = progress
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.updated_at = dt.datetime.now(dt.timezone.utc)
+            db.commit()
+        self._event = job_event(job)
+        self._push(status in TERMINAL_STATUSES)
+        return job
+
+    def progress(self, progress: int) -> None:
+        if self._event is None:
+            return
+        self._event["progress"] = progress
+        self._push(False)
+
+    def _push(self, terminal: bool) -> None:
+        key = progress_key(self.kind, self.job_id)
+        try:
+            pipe = get_redis_sync().pipeline(transaction=False)
+            if terminal:
+                pipe.delete(key)
+            else:
+                pipe.set(key, self._event["progress"], ex=settings.job_progress_ttl_s)
+            pipe.publish(channel(self.kind, self.job_id), orjson.dumps(self._event))
+            pipe.execute()
+        except Exception:
+            log.warning("could not push %s job progress for %s", self.kind, self.job_id, exc_info=True)
+
+def _running(jobs) -> list:
+    return [j for j in jobs if j.status not in TERMINAL_STATUSES]
+
+def _parse(jobs, values) -> dict:
+    return {j.id: int(v) for j, v in zip(jobs, values) if v is not None}
+
+def live_progress(kind: str, jobs: Iterable) -> dict:
+    """job.id -> latest reported progress for unfinished jobs; Postgres holds it only per transition."""
+    jobs = _running(jobs)
+    if not jobs:
+        return {}
+    try:
+        return _parse(jobs, get_redis_sync().mget([progress_key(kind, j.id) for j in jobs]))
+    except Exception:
+        log.warning("job progress unavailable", exc_info=True)
+        return {}
+
+async def live_progress_async(kind: str, jobs: Iterable) -> dict:
+    jobs = _running(jobs)
+    if not jobs:
+        return {}
+    try:
+        return _parse(jobs, await get_redis_async().mget([progress_key(kind, j.id) for j in jobs]))
+    except Exception:
+        log.warning("job progress unavailable", exc_info=True)
+        return {}
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+import orjson
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.session import AsyncSessionLocal
+from app.db.models.user import User
+from app.services.redis_client import get_redis_async, get_redis_sync
+
+log = get_logger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated caller as far as auth-only routes need it; no ORM session attached."""
+    id: uuid.UUID
+    role: str
+    is_active: bool
+
+class _LocalCache:
+    def __init__(self, size: int, ttl_s: float) -> None:
+        self._size = size
+        self._ttl_s = ttl_s
+        self._items: OrderedDict[uuid.UUID, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: uuid.UUID) -> dict | None:
+        with self._lock:
+            hit = self._items.get(user_id)
+            if hit is None:
+                return None
+            if hit[0] < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return hit[1]
+
+    def put(self, user_id: uuid.UUID, record: dict) -> None:
+        with self._lock:
+            self._items[user_id] = (time.monotonic() + self._ttl_s, record)
+            self._items.move_to_end(user_id)
+            if len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+    def pop(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            self._items.pop(user_id, None)
+
+_local = _LocalCache(settings.principal_cache_size, settings.principal_cache_local_ttl_s)
+
+def _redis_key(user_id: uuid.UUID) -> str:
+    return f"principal:{user_id}"
+
+async def _load_record(user_id: uuid.UUID) -> dict | None:
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(User.role, User.is_active).where(User.id == user_id))).one_or_none()
+    if row is None:
+        return None
+    return {"role": row.role, "is_active": row.is_active}
+
+async def load_principal(user_id: uuid.UUID, token_role: str | None = None) -> Principal | None:
+    """Resolves a principal from the local LRU, then Redis, then Postgres (filling both caches)."""
+    record = _local.get(user_id)
+    if record is None:
+        r = get_redis_async()
+        try:
+            raw = await r.get(_redis_key(user_id))
+            record = orjson.loads(raw) if raw else None
+        except Exception:
+            log.debug("principal cache read failed", exc_info=True)
+        if record is None:
+            record = await _load_record(user_id)
+            if record is None:
+                return None
+            try:
+                await r.set(_redis_key(user_id), orjson.dumps(record), ex=settings.principal_cache_ttl_s)
+            except Exception:
+                log.debug("principal cache write failed", exc_info=True)
+        _local.put(user_id, record)
+    return Principal(id=user_id, role=token_role or record["role"], is_active=record["is_active"])
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    _local.pop(user_id)
+    try:
+        get_redis_sync().delete(_redis_key(user_id))
+    except Exception:
+        log.warning("principal cache invalidation failed for %s", user_id, exc_info=True)
+
+# Any committed change to a User row (deletion, deactivation, password change, role change)
+# drops its cached principal, so routes don't have to remember to do it.
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session: Session, flush_context) -> None:
+    changed = [o.id for o in session.deleted if isinstance(o, User)]
+    changed += [o.id for o in session.dirty if isinstance(o, User) and session.is_modified(o)]
+    if changed:
+        session.info.setdefault("principal_invalidations", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop("principal_invalidations", ()):
+        invalidate_principal(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("principal_invalidations", None)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+import uuid
+import orjson
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.models.marketplace import Asset
+from app.db.models.social import Follow
+from app.db.models.user import User, UserProfile
+from app.services.redis_client import get_redis_sync
+
+log = get_logger(__name__)
+
+def _key(user_id) -> str:
+    return f"profile_stats:{user_id}"
+
+def _count(*where):
+    return select(func.count()).where(*where).scalar_subquery()
+
+def _is_following(viewer_id, user_id):
+    return exists().where(Follow.follower_id == viewer_id, Follow.following_id == user_id)
+
+def _load(db: Session, user_id: uuid.UUID, viewer_id: uuid.UUID) -> tuple[dict, bool] | None:
+    """Profile fields, every counter and the viewer's follow edge in one statement."""
+    row = db.execute(
+        select(
+            User.email, UserProfile.username, UserProfile.bio, UserProfile.avatar_url,
+            _count(Asset.creator_id == user_id).label("assets"),
+            _count(Asset.creator_id == user_id, Asset.visibility == "published").label("published"),
+            _count(Follow.following_id == user_id).label("followers"),
+            _count(Follow.follower_id == user_id).label("following"),
+            _is_following(viewer_id, user_id).label("is_following"),
+        )
+        .select_from(User)
+        .outerjoin(UserProfile, UserProfile.user_id == User.id)
+        .where(User.id == user_id)
+    ).one_or_none()
+    if row is None:
+        return None
+    stats = {
+        "username": row.username or row.email.split("@")[0], "bio": row.bio, "avatar_url": row.avatar_url,
+        "assets": row.assets, "published": row.published, "followers": row.followers, "following": row.following,
+    }
+    return stats, row.is_following
+
+def get_profile_stats(db: Session, user_id: uuid.UUID, viewer_id: uuid.UUID) -> tuple[dict, bool] | None:
+    """Returns (stats, viewer follows user) or None if the user does not exist.
+
+    Stats are cached per user_id and invalidated by follow/unfollow/publish/delete; a cache hit
+    costs one EXISTS query for someone else's profile and none for your own.
+    """
+    r = get_redis_sync()
+    try:
+        cached = r.get(_key(user_id))
+    except Exception:
+        log.warning("profile stats cache unavailable", exc_info=True)
+        cached = None
+    if cached:
+        stats = orjson.loads(cached)
+        if viewer_id == user_id:
+            return stats, False
+        return stats, db.execute(select(_is_following(viewer_id, user_id))).scalar_one()
+    loaded = _load(db, user_id, viewer_id)
+    if loaded is not None:
+        try:
+            r.set(_key(user_id), orjson.dumps(loaded[0]), ex=settings.profile_stats_ttl_s)
+        except Exception:
+            log.warning("profile stats cache unavailable", exc_info=True)
+    return loaded
+
+def follow_neighbours(db: Session, user_id) -> list:
+    """Everyone ``user_id`` follows or is followed by: the users whose follower/following counts
+    change when that user goes away."""
+    return db.execute(
+        select(Follow.following_id).where(Follow.follower_id == user_id)
+        .union(select(Follow.follower_id).where(Follow.following_id == user_id))
+    ).scalars().all()
+
+def invalidate_profile_stats(*user_ids) -> None:
+    try:
+        get_redis_sync().delete(*(_key(u) for u in user_ids))
+    except Exception:
+        log.warning("could not invalidate profile stats for %s", user_ids, exc_info=True)
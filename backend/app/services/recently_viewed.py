@@ -0,0 +1,86 @@
+from __future__ import annotations
+import datetime as dt
+import uuid
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.models.marketplace import Asset, RecentlyViewed
+from app.db.models.user import User
+from app.services.redis_client import drain_hash, get_redis_async, get_redis_sync
+
+log = get_logger(__name__)
+
+PENDING_KEY = "recent:pending"
+FLUSHING_KEY = "recent:pending:flushing"
+
+def _user_key(user_id) -> str:
+    return f"recent:{user_id}"
+
+def record_view(db: Session, user_id: uuid.UUID, asset_id: uuid.UUID) -> None:
+    """One pipelined round trip: bump the per-user ZSET (trimmed) and queue the row for the flusher.
+
+    Falls back to a direct upsert when Redis is unavailable.
+    """
+    now = dt.datetime.now(dt.timezone.utc)
+    key = _user_key(user_id)
+    try:
+        pipe = get_redis_sync().pipeline(transaction=False)
+        pipe.zadd(key, {str(asset_id): now.timestamp()})
+        pipe.zremrangebyrank(key, 0, -settings.recently_viewed_max - 1)
+        pipe.expire(key, settings.recently_viewed_ttl_s)
+        pipe.hset(PENDING_KEY, f"{user_id}:{asset_id}", now.timestamp())
+        pipe.execute()
+    except Exception:
+        log.warning("recently-viewed buffer unavailable, writing through", exc_info=True)
+        _upsert(db, [{"user_id": user_id, "asset_id": asset_id, "last_viewed_at": now}])
+        db.commit()
+
+def _upsert(db: Session, rows: list[dict]) -> None:
+    stmt = insert(RecentlyViewed).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        constraint="uq_recent_user_asset",
+        set_={"last_viewed_at": func.greatest(RecentlyViewed.last_viewed_at, stmt.excluded.last_viewed_at)},
+    ))
+
+def flush_recently_viewed(db: Session) -> int:
+    """Upserts buffered views into ``recently_viewed`` with one INSERT ... ON CONFLICT DO UPDATE."""
+    def apply(pending: dict[str, str]) -> None:
+        rows = []
+        for field, ts in pending.items():
+            user_id, asset_id = field.split(":", 1)
+            rows.append({
+                "id": uuid.uuid4(), "user_id": uuid.UUID(user_id), "asset_id": uuid.UUID(asset_id),
+                "last_viewed_at": dt.datetime.fromtimestamp(float(ts), dt.timezone.utc),
+            })
+        # Drop views of assets/users deleted since they were buffered so one FK miss can't fail the batch.
+        assets = set(db.execute(select(Asset.id).where(Asset.id.in_({r["asset_id"] for r in rows}))).scalars())
+        users = set(db.execute(select(User.id).where(User.id.in_({r["user_id"] for r in rows}))).scalars())
+        rows = [r for r in rows if r["asset_id"] in assets and r["user_id"] in users]
+        if rows:
+            _upsert(db, rows)
+        db.commit()
+
+    return drain_hash(get_redis_sync(), PENDING_KEY, FLUSHING_KEY, apply)
+
+async def recent_asset_ids(user_id: uuid.UUID, limit: int) -> list[uuid.UUID] | None:
+    """Most recent first, straight from the ZSET; None when Redis has nothing (or is down)."""
+    try:
+        members = await get_redis_async().zrevrange(_user_key(user_id), 0, limit - 1)
+    except Exception:
+        log.warning("recently-viewed buffer unavailable, reading from the database", exc_info=True)
+        return None
+    return [uuid.UUID(m) for m in members] if members else None
+
+async def warm(user_id: uuid.UUID, views: list[tuple[uuid.UUID, dt.datetime]]) -> None:
+    if not views:
+        return
+    key = _user_key(user_id)
+    try:
+        pipe = get_redis_async().pipeline(transaction=False)
+        pipe.zadd(key, {str(asset_id): at.timestamp() for asset_id, at in views})
+        pipe.expire(key, settings.recently_viewed_ttl_s)
+        await pipe.execute()
+    except Exception:
+        log.warning("could not warm recently-viewed buffer", exc_info=True)
@@ -1,12 +1,79 @@
 from __future__ import annotations
+import uuid
+from typing import Callable
 import redis
+import redis.asyncio as aioredis
 from redis import Redis
 from app.core.config import settings
 
 _redis_sync: Redis | None = None
+_redis_async: aioredis.Redis | None = None
+_redis_pubsub: aioredis.Redis | None = None
 
 def get_redis_sync() -> Redis:
     global _redis_sync
     if _redis_sync is None:
         _redis_sync = redis.Redis.from_url(settings.redis_url, decode_responses=True)
     return _redis_sync
+
+def get_redis_async() -> aioredis.Redis:
+    global _redis_async
+    if _redis_async is None:
+        _redis_async = aioredis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=settings.redis_socket_timeout_s,
+            socket_connect_timeout=settings.redis_socket_timeout_s,
+        )
+    return _redis_async
+
+def get_redis_pubsub() -> aioredis.Redis:
+    """For long-lived subscriptions: no socket_timeout, since a quiet channel is not a dead one."""
+    global _redis_pubsub
+    if _redis_pubsub is None:
+        _redis_pubsub = aioredis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.redis_socket_timeout_s,
+            health_check_interval=30,
+        )
+    return _redis_pubsub
+
+def drain_hash(r: Redis, live_key: str, flushing_key: str, apply: Callable[[dict[str, str]], None]) -> int:
+    """Hands buffered hash entries to ``apply`` and deletes them once it returns.
+
+    The live hash is RENAMEd aside first so writes arriving during the flush land in a fresh
+    hash. A leftover hash from a failed flush is applied before the next rename. Only one caller
+    drains at a time (SET NX lock): two flushes reading the same batch would apply it twice.
+    Returns 0 without touching anything while another drain holds the lock.
+    """
+    lock_key, token = f"{flushing_key}:lock", uuid.uuid4().hex
+    if not r.set(lock_key, token, nx=True, px=int(settings.redis_drain_lock_ttl_s * 1000)):
+        return 0
+    try:
+        drained = 0
+        for _ in range(2):
+            if not r.exists(flushing_key):
+                if not r.exists(live_key):
+                    break
+                r.rename(live_key, flushing_key)
+            pending = r.hgetall(flushing_key)
+            if pending:
+                apply(pending)
+                drained += len(pending)
+            r.delete(flushing_key)
+        return drained
+    finally:
+        _release(r, lock_key, token)
+
+def _release(r: Redis, lock_key: str, token: str) -> None:
+    # Only our own lock: if it expired mid-drain, another caller may hold it now.
+    with r.pipeline() as pipe:
+        try:
+            pipe.watch(lock_key)
+            if pipe.get(lock_key) == token:
+                pipe.multi()
+                pipe.delete(lock_key)
+                pipe.execute()
+        except redis.WatchError:
+            pass  # taken over between the check and the delete: not ours to remove
@@ -1,8 +1,142 @@
 from __future__ import annotations
+import datetime as dt
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+from urllib.parse import quote, urlparse
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
 from botocore.client import Config
-from urllib.parse import urlparse, urlunparse
+from s3transfer.subscribers import BaseSubscriber
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import observe_transfer
+
+log = get_logger(__name__)
+
+_MAX_PRESIGN_EXPIRES = 7 * 24 * 3600
+
+class SigV4Presigner:
+    """Signs path-style S3 GET URLs locally (SigV4 query auth) without going through botocore.
+
+    The daily signing key is derived once per UTC date. Signing time is floored to a window of
+    ``expires // 4`` seconds and ``X-Amz-Expires`` is extended by that window, so a URL stays valid
+    for at least ``expires`` seconds after it is handed out and identical requests within a window
+    reuse the cached URL.
+    """
+
+    def __init__(self, endpoint_url: str, access_key: str, secret_key: str, region: str, *, cache_size: int = 10000) -> None:
+        parsed = urlparse(endpoint_url)
+        self._origin = f"{parsed.scheme}://{parsed.netloc}"
+        self._host = parsed.netloc
+        self._base_path = parsed.path.rstrip("/")
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._region = region
+        self._cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str, int, int], str] = OrderedDict()
+        self._signing_key: tuple[str, bytes] | None = None
+        self._lock = threading.Lock()
+
+    def _key_for(self, datestamp: str) -> bytes:
+        cached = self._signing_key
+        if cached and cached[0] == datestamp:
+            return cached[1]
+        k = hmac.new(f"AWS4{self._secret_key}".encode(), datestamp.encode(), hashlib.sha256).digest()
+        for part in (self._region, "s3", "aws4_request"):
+            k = hmac.new(k, part.encode(), hashlib.sha256).digest()
+        self._signing_key = (datestamp, k)
+        return k
+
+    def sign_get(self, bucket: str, key: str, expires: int, signed_at: float) -> str:
+        when = dt.datetime.fromtimestamp(int(signed_at), tz=dt.timezone.utc)
+        amz_date = when.strftime("%Y%m%dT%H%M%SZ")
+        datestamp = amz_date[:8]
+        scope = f"{datestamp}/{self._region}/s3/aws4_request"
+        path = f"{self._base_path}/{bucket}/{quote(key, safe='/~')}"
+        query = (
+            "X-Amz-Algorithm=AWS4-HMAC-SHA256"
+            f"&X-Amz-Credential={quote(f'{self._access_key}/{scope}', safe='-_.~')}"
+            f"&X-Amz-Date={amz_date}"
+            f"&X-Amz-Expires={min(int(expires), _MAX_PRESIGN_EXPIRES)}"
+            "&X-Amz-SignedHeaders=host"
+        )
+        canonical = f"GET\n{path}\n{query}\nhost:{self._host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = (
+            f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n{hashlib.sha256(canonical.encode()).hexdigest()}"
+        )
+        signature = hmac.new(self._key_for(datestamp), string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return f"{self._origin}{path}?{query}&X-Amz-Signature={signature}"
+
+    def presign_get(self, bucket: str, key: str, expires: int = 3600, now: float | None = None) -> str:
+        now = time.time() if now is None else now
+        window = max(expires // 4, 1)
+        slot = int(now // window)
+        cache_key = (bucket, key, expires, slot)
+        with self._lock:
+            url = self._cache.get(cache_key)
+            if url is not None:
+                self._cache.move_to_end(cache_key)
+                return url
+            url = self.sign_get(bucket, key, expires + window, slot * window)
+            self._cache[cache_key] = url
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return url
+
+@dataclass(frozen=True, slots=True)
+class Upload:
+    local_path: str
+    key: str
+    content_type: str | None = None
+
+class _TransferTimer(BaseSubscriber):
+    """Records duration and throughput of one transfer once the transfer manager finishes it.
+
+    The clock starts at the first transferred bytes, not at submission: transfers queued behind
+    others in the shared manager would otherwise report their wait as slow throughput.
+    """
+
+    def __init__(self, direction: str, key: str, size: int | None = None) -> None:
+        self.direction = direction
+        self.key = key
+        self.size = size
+        self.started: float | None = None
+
+    def on_progress(self, future, bytes_transferred, **kwargs) -> None:
+        if self.started is None:
+            self.started = time.perf_counter()
+
+    def on_done(self, future, **kwargs) -> None:
+        try:
+            future.result()
+        except Exception:
+            return
+        seconds = time.perf_counter() - self.started if self.started is not None else 0.0
+        size = self.size if self.size is not None else future.meta.size or 0
+        observe_transfer(self.direction, size, seconds)
+        log.info("s3 %s", self.direction, extra={
+            "key": self.key, "bytes": size, "seconds": round(seconds, 3),
+            "mib_per_s": round(size / seconds / 1048576, 2) if seconds else None,
+        })
+
+def transfer_config() -> TransferConfig:
+    return TransferConfig(
+        multipart_threshold=settings.s3_multipart_threshold_bytes,
+        multipart_chunksize=settings.s3_multipart_chunksize_bytes,
+        max_concurrency=settings.s3_transfer_max_concurrency,
+        use_threads=True,
+    )
+
+def _pool_connections() -> int:
+    # The process-wide transfer manager keeps at most max_concurrency requests in flight whatever
+    # the number of callers; the rest of the pool is headroom for direct client calls.
+    return settings.s3_max_pool_connections or max(10, 2 * settings.s3_transfer_max_concurrency)
 
 class S3Client:
     def __init__(self) -> None:
@@ -12,8 +146,12 @@ class S3Client:
             aws_access_key_id=settings.s3_access_key,
             aws_secret_access_key=settings.s3_secret_key,
             region_name=settings.s3_region,
-            config=Config(signature_version="s3v4"),
+            config=Config(signature_version="s3v4", max_pool_connections=_pool_connections()),
         )
+        self.transfer_config = transfer_config()
+        self._manager = None
+        self._manager_pid: int | None = None
+        self._manager_lock = threading.Lock()
         self.public_client = None
         if settings.s3_public_endpoint_url:
             self.public_client = boto3.client(
@@ -24,22 +162,12 @@ class S3Client:
                 region_name=settings.s3_region,
                 config=Config(signature_version="s3v4"),
             )
-
-    def _apply_public_endpoint(self, url: str) -> str:
-        if not settings.s3_public_endpoint_url:
-            return url
-        public = urlparse(settings.s3_public_endpoint_url)
-        original = urlparse(url)
-        if not public.scheme or not public.netloc:
-            return url
-        public_path = public.path.rstrip("/")
-        new_path = f"{public_path}{original.path}" if public_path else original.path
-        return urlunparse(
-            original._replace(
-                scheme=public.scheme,
-                netloc=public.netloc,
-                path=new_path,
-            )
+        self.presigner = SigV4Presigner(
+            settings.s3_public_endpoint_url or settings.s3_endpoint_url,
+            settings.s3_access_key,
+            settings.s3_secret_key,
+            settings.s3_region,
+            cache_size=settings.s3_presign_cache_size,
         )
 
     def presign_put(
@@ -56,14 +184,46 @@ class S3Client:
         return client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires)
 
     def presign_get(self, bucket: str, key: str, expires: int = 3600) -> str:
-        client = self.public_client or self.client
-        url = client.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires)
-        if client is self.client:
-            return self._apply_public_endpoint(url)
-        return url
+        return self.presigner.presign_get(bucket, key, expires)
+
+    def presign_get_many(self, bucket: str, keys: Iterable[str], expires: int = 3600) -> dict[str, str]:
+        now = time.time()
+        return {key: self.presigner.presign_get(bucket, key, expires, now=now) for key in keys if key}
+
+    @property
+    def transfers(self):
+        """One transfer manager (and thread pools) per process, shared by every upload/download."""
+        with self._manager_lock:
+            if self._manager is None or self._manager_pid != os.getpid():
+                self._manager = create_transfer_manager(self.client, self.transfer_config)
+                self._manager_pid = os.getpid()
+            return self._manager
 
     def upload_file(self, local_path: str, bucket: str, key: str, content_type: str | None = None) -> None:
+        self.upload_files(bucket, [Upload(local_path, key, content_type)])
+
+    def upload_files(self, bucket: str, uploads: Iterable[Upload]) -> None:
+        """Uploads all files concurrently (multipart above the threshold) and waits for every one;
+        the first failure is raised after the rest have finished."""
+        futures = []
+        for upload in uploads:
+            extra = {"ContentType": upload.content_type} if upload.content_type else {}
+            timer = _TransferTimer("upload", upload.key, os.path.getsize(upload.local_path))
+            futures.append(self.transfers.upload(upload.local_path, bucket, upload.key, extra_args=extra, subscribers=[timer]))
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                errors.append(exc)
+        if errors:
+            raise errors[0]
+
+    def upload_bytes(self, data: bytes, bucket: str, key: str, content_type: str | None = None) -> None:
         extra = {"ContentType": content_type} if content_type else {}
-        self.client.upload_file(local_path, bucket, key, ExtraArgs=extra)
+        self.client.put_object(Bucket=bucket, Key=key, Body=data, **extra)
+
+    def download_file(self, bucket: str, key: str, local_path: str) -> None:
+        self.transfers.download(bucket, key, local_path, subscribers=[_TransferTimer("download", key)]).result()
 
 s3 = S3Client()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+from collections import defaultdict
+from sqlalchemy import Select, and_, desc, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models.marketplace import Asset
+
+SEARCH_CONFIG = "english"
+
+def _tsquery(q: str):
+    return func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+def match_clause(q: str):
+    """Full-text match on the weighted search_vector, or a trigram-similar title (typos, partial words)."""
+    return or_(Asset.search_vector.op("@@")(_tsquery(q)), Asset.title.op("%")(q))
+
+def rank_expr(q: str):
+    return func.ts_rank_cd(Asset.search_vector, _tsquery(q)) + func.similarity(Asset.title, q)
+
+def _published_matches(q: str):
+    return and_(Asset.visibility == "published", match_clause(q))
+
+def ranked_stmt(q: str, *, category: str | None = None, style: str | None = None) -> Select:
+    stmt = select(Asset).where(_published_matches(q))
+    if category:
+        stmt = stmt.where(Asset.category == category)
+    if style:
+        stmt = stmt.where(Asset.style == style)
+    return stmt.order_by(desc(rank_expr(q)), desc(Asset.published_at), desc(Asset.id))
+
+async def search_assets(
+    db: AsyncSession, q: str, *, category: str | None = None, style: str | None = None, limit: int = 20, offset: int = 0,
+) -> tuple[list[Asset], int, dict[str, dict[str, int]]]:
+    """Returns (ranked page, total matching the filters, facet counts).
+
+    Facets are computed over the text match only, so each facet also shows the values a user
+    could switch to. One grouped query yields both facets and the filtered total.
+    """
+    items = (await db.execute(ranked_stmt(q, category=category, style=style).limit(limit).offset(offset))).scalars().all()
+    cells = (await db.execute(
+        select(Asset.category, Asset.style, func.count())
+        .where(_published_matches(q))
+        .group_by(Asset.category, Asset.style)
+    )).all()
+    facets: dict[str, dict[str, int]] = {"category": defaultdict(int), "style": defaultdict(int)}
+    total = 0
+    for cat, sty, count in cells:
+        facets["category"][cat] += count
+        facets["style"][sty] += count
+        if (not category or cat == category) and (not style or sty == style):
+            total += count
+    return list(items), total, {name: dict(counts) for name, counts in facets.items()}
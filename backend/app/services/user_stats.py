@@ -0,0 +1,146 @@
+from __future__ import annotations
+import datetime as dt
+from collections import defaultdict
+from sqlalchemy import Date, case, cast, event, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.logging import get_logger
+from app.db.models.jobs import AIJob, ScanJob
+from app.db.models.marketplace import Asset, Download
+from app.db.models.stats import UserStatsDaily
+from app.db.models.user import User
+
+log = get_logger(__name__)
+
+STAT_COLUMNS = ("assets", "downloads", "ai_jobs", "scan_jobs")
+# model -> (rollup column, owning user attribute)
+_SOURCES = {Asset: ("assets", "creator_id"), Download: ("downloads", "user_id"), AIJob: ("ai_jobs", "user_id"), ScanJob: ("scan_jobs", "user_id")}
+
+def _utc_day(ts: dt.datetime | None) -> dt.date:
+    return (ts or dt.datetime.now(dt.timezone.utc)).astimezone(dt.timezone.utc).date()
+
+def _upsert_stmt(rows: list[dict]):
+    stmt = insert(UserStatsDaily).values(rows)
+    table = UserStatsDaily.__table__.c
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={c: func.greatest(table[c] + stmt.excluded[c], 0) for c in STAT_COLUMNS},
+    )
+
+@event.listens_for(Session, "before_flush")
+def _roll_up_cascades(session: Session, flush_context, instances) -> None:
+    """Downloads removed by ON DELETE CASCADE (their asset, or its creator, is deleted in this
+    flush) never reach the session, so they are counted off the rollup here, before the DELETE."""
+    assets = {obj.id for obj in session.deleted if isinstance(obj, Asset)}
+    users = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    if not assets and not users:
+        return
+    # Downloads deleted through the ORM in this flush are counted by _roll_up_flush.
+    explicit = {obj.id for obj in session.deleted if isinstance(obj, Download)}
+    day = cast(func.timezone("UTC", Download.created_at), Date).label("day")
+    stmt = (
+        select(Download.user_id, day, func.count().label("n"))
+        .join(Asset, Asset.id == Download.asset_id)
+        .where(or_(Download.asset_id.in_(assets), Asset.creator_id.in_(users)))
+        .group_by(Download.user_id, day)
+    )
+    if users:
+        stmt = stmt.where(Download.user_id.not_in(users))  # their rollup goes with them
+    if explicit:
+        stmt = stmt.where(Download.id.not_in(explicit))
+    conn = session.connection()
+    rows = [{"user_id": r.user_id, "day": r.day, **dict.fromkeys(STAT_COLUMNS, 0), "downloads": -r.n}
+            for r in conn.execute(stmt)]
+    if rows:
+        conn.execute(_upsert_stmt(rows))
+
+@event.listens_for(Session, "after_flush")
+def _roll_up_flush(session: Session, flush_context) -> None:
+    """Applies this flush's inserts/deletes of tracked rows to the rollup in the same transaction."""
+    deltas: dict[tuple, dict[str, int]] = defaultdict(lambda: dict.fromkeys(STAT_COLUMNS, 0))
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            source = _SOURCES.get(type(obj))
+            if source:
+                column, owner = source
+                deltas[(getattr(obj, owner), _utc_day(obj.created_at))][column] += sign
+    if not deltas:
+        return
+    # Rows of a user deleted in this same flush are going away with the user.
+    gone = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    rows = [{"user_id": u, "day": d, **counts} for (u, d), counts in deltas.items() if u not in gone and any(counts.values())]
+    if rows:
+        # session.execute would re-enter the flush; go through the flush's connection.
+        session.connection().execute(_upsert_stmt(rows))
+
+def dashboard_stats(db: Session, user_id, days: int) -> dict:
+    """Totals plus a zero-filled per-day series for the last ``days`` UTC days, in one query.
+
+    Days older than the window collapse into a single NULL bucket, so the result is at most
+    ``days + 1`` rows whatever the account's age.
+    """
+    today = _utc_day(None)
+    since = today - dt.timedelta(days=days - 1)
+    bucket = case((UserStatsDaily.day >= since, UserStatsDaily.day), else_=None).label("bucket")
+    rows = db.execute(
+        select(bucket, *(func.sum(getattr(UserStatsDaily, c)).label(c) for c in STAT_COLUMNS))
+        .where(UserStatsDaily.user_id == user_id)
+        .group_by(bucket)
+    ).all()
+    totals = dict.fromkeys(STAT_COLUMNS, 0)
+    by_day = {}
+    for row in rows:
+        counts = {c: int(getattr(row, c) or 0) for c in STAT_COLUMNS}
+        for c in STAT_COLUMNS:
+            totals[c] += counts[c]
+        if row.bucket is not None:
+            by_day[row.bucket] = counts
+    series = []
+    for i in range(days):
+        day = since + dt.timedelta(days=i)
+        series.append({"day": day.isoformat(), **by_day.get(day, dict.fromkeys(STAT_COLUMNS, 0))})
+    return {**totals, "series": series}
+
+_REBUILD_SQL = text("""
+WITH src AS (
+    SELECT user_id, day, sum(assets) AS assets, sum(downloads) AS downloads,
+           sum(ai_jobs) AS ai_jobs, sum(scan_jobs) AS scan_jobs
+    FROM (
+        SELECT creator_id AS user_id, (created_at AT TIME ZONE 'UTC')::date AS day, 1 AS assets, 0 AS downloads, 0 AS ai_jobs, 0 AS scan_jobs
+          FROM assets WHERE created_at >= :start AND created_at < :end
+        UNION ALL
+        SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 1, 0, 0
+          FROM downloads WHERE created_at >= :start AND created_at < :end
+        UNION ALL
+        SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 1, 0
+          FROM ai_jobs WHERE created_at >= :start AND created_at < :end
+        UNION ALL
+        SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, 0, 0, 0, 1
+          FROM scan_jobs WHERE created_at >= :start AND created_at < :end
+    ) events
+    GROUP BY user_id, day
+), upserted AS (
+    INSERT INTO user_stats_daily (user_id, day, assets, downloads, ai_jobs, scan_jobs)
+    SELECT * FROM src
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        assets = excluded.assets, downloads = excluded.downloads,
+        ai_jobs = excluded.ai_jobs, scan_jobs = excluded.scan_jobs
+    WHERE (user_stats_daily.assets, user_stats_daily.downloads, user_stats_daily.ai_jobs, user_stats_daily.scan_jobs)
+          IS DISTINCT FROM (excluded.assets, excluded.downloads, excluded.ai_jobs, excluded.scan_jobs)
+    RETURNING 1
+)
+DELETE FROM user_stats_daily s
+WHERE s.day >= :start_day AND s.day < :end_day
+  AND NOT EXISTS (SELECT 1 FROM src WHERE src.user_id = s.user_id AND src.day = s.day)
+""")
+
+def rebuild_user_stats(db: Session, days: int) -> None:
+    """Recomputes the last ``days`` closed UTC days from the raw tables to repair drift.
+
+    Today is skipped: it is still receiving incremental updates that a rebuild could race.
+    """
+    end = dt.datetime.combine(_utc_day(None), dt.time.min, tzinfo=dt.timezone.utc)
+    start = end - dt.timedelta(days=days)
+    db.execute(_REBUILD_SQL, {"start": start, "end": end, "start_day": start.date(), "end_day": end.date()})
+    db.commit()
+    log.info("rebuilt user stats rollup for %s..%s", start.date(), end.date())
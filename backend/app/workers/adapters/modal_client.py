@@ -0,0 +1,160 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import random
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, TypeVar
+import httpx
+from app.core.config import settings
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+T = TypeVar("T")
+
+# Artifact GETs are idempotent, so any gateway error is worth another try.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# A generation POST is only retried on answers that mean Modal never took the work on: a 502/504
+# can come back after the app already started generating.
+SUBMIT_RETRY_STATUSES = frozenset({429, 503})
+
+class ArtifactError(ValueError):
+    """A downloaded artifact failed verification (oversize or checksum mismatch)."""
+
+class TruncatedArtifact(ArtifactError):
+    """The body ended before Content-Length; worth retrying."""
+
+def backoff_delays(attempts: int, base_s: float | None = None, cap_s: float | None = None):
+    """Full-jitter exponential backoff: attempt n sleeps uniform(0, min(cap, base * 2**n))."""
+    base_s = settings.modal_download_retry_s if base_s is None else base_s
+    cap_s = settings.modal_backoff_cap_s if cap_s is None else cap_s
+    for attempt in range(attempts):
+        yield random.uniform(0, min(cap_s, base_s * 2 ** attempt))
+
+class ModalClient:
+    """Shared HTTP/2 connection pool to the Modal API, driven by one event loop thread per process.
+
+    Every Celery worker thread hands its coroutine to the same loop via ``run``, so any number of
+    generations can be in flight in one process while sharing connections; a waiting task costs a
+    parked thread rather than a held socket per request. The loop is created lazily and again after
+    a fork, since prefork children must not inherit the parent's loop thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="modal-client", daemon=True).start()
+                self._loop, self._pid, self._client = loop, os.getpid(), None
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Only touched from the loop thread, so it binds to that loop.
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.modal_api_timeout_s, connect=settings.modal_connect_timeout_s),
+                limits=httpx.Limits(max_connections=settings.modal_max_connections,
+                                    max_keepalive_connections=settings.modal_max_connections),
+            )
+        return self._client
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Blocks the calling (worker) thread until ``coro`` finishes on the shared loop."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def submit(self, url: str, **kwargs: Any) -> httpx.Response:
+        """POSTs a generation request. Retries only when Modal did not accept the work (connect
+        errors, 429 and 503), so a retry never starts a second generation.
+
+        Modal's endpoints generate synchronously and answer with the model (or where to fetch it),
+        so this is one long request of up to modal_api_timeout_s; there is no job id to poll. It
+        holds a stream on the shared connection, not a worker process.
+
+        The response comes back unread so a GLB body can be streamed to disk; callers must
+        ``aclose()`` it.
+        """
+        delays = backoff_delays(settings.modal_submit_attempts - 1)
+        while True:
+            try:
+                response = await self.client.send(self.client.build_request("POST", url, **kwargs), stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                log.warning("modal submit connect failed; retrying in %.1fs", delay, extra={"url": url})
+            else:
+                if response.status_code not in SUBMIT_RETRY_STATUSES:
+                    return response
+                delay = next(delays, None)
+                if delay is None:
+                    return response
+                await response.aclose()
+                log.warning("modal submit got %s; retrying in %.1fs", response.status_code, delay, extra={"url": url})
+            await asyncio.sleep(delay)
+
+    async def stream_to(self, response: httpx.Response, out_path: Path, *, sha256: str | None = None) -> str:
+        """Writes a streaming response body to ``out_path`` chunk by chunk, so memory stays flat
+        whatever the model size. Checks Content-Length, the size cap and (if given) the SHA-256;
+        the file only appears under its final name once verified. Returns the hex digest."""
+        expected = response.headers.get("content-length")
+        if response.headers.get("content-encoding"):
+            expected = None  # Content-Length counts the encoded bytes
+        digest = hashlib.sha256()
+        size = 0
+        part = out_path.with_name(out_path.name + ".part")
+        try:
+            with part.open("wb") as fh:
+                async for chunk in response.aiter_bytes(settings.modal_stream_chunk_bytes):
+                    size += len(chunk)
+                    if size > settings.modal_max_artifact_bytes:
+                        raise ArtifactError(f"Modal artifact exceeds {settings.modal_max_artifact_bytes} bytes")
+                    digest.update(chunk)
+                    fh.write(chunk)
+            if expected is not None and size != int(expected):
+                raise TruncatedArtifact(f"Modal artifact truncated: {size} of {expected} bytes")
+            if sha256 and digest.hexdigest() != sha256.lower():
+                raise ArtifactError("Modal artifact checksum mismatch")
+            part.replace(out_path)
+        finally:
+            part.unlink(missing_ok=True)
+        return digest.hexdigest()
+
+    async def fetch_to(self, url: str, out_path: Path, *, max_attempts: int | None = None,
+                       sha256: str | None = None) -> str:
+        """Downloads an artifact that may not exist yet: 404s, transient errors and short reads back
+        off and retry; oversize or checksum failures do not."""
+        attempts = max_attempts or settings.modal_download_max_attempts
+        last_error: Exception | None = None
+        for attempt, delay in enumerate(backoff_delays(attempts), start=1):
+            try:
+                response = await self.client.send(self.client.build_request("GET", url), stream=True)
+                try:
+                    if response.status_code != 404 and response.status_code not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        return await self.stream_to(response, out_path, sha256=sha256)
+                    last_error = httpx.HTTPStatusError(
+                        f"Modal download not ready after {attempts} attempts: {url}",
+                        request=response.request,
+                        response=response,
+                    )
+                finally:
+                    await response.aclose()
+            except (httpx.TransportError, TruncatedArtifact) as exc:
+                last_error = exc
+            if attempt < attempts:
+                await asyncio.sleep(delay)
+        if last_error:
+            raise last_error
+        raise ValueError(f"Modal download failed: {url}")
+
+modal = ModalClient()
@@ -1,32 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import mimetypes
 import time
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 
 import httpx
 
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.redis_client import get_redis_sync
+from app.workers.adapters.modal_client import modal
 
-def _download_with_retry(url: str, *, max_attempts: int | None = None) -> bytes:
-    last_error: httpx.HTTPStatusError | None = None
-    attempts = max_attempts or settings.modal_download_max_attempts
-    for _ in range(attempts):
-        response = httpx.get(url, timeout=settings.modal_api_timeout_s, follow_redirects=True)
-        if response.status_code == 404:
-            last_error = httpx.HTTPStatusError(
-                f"Modal download not ready after {attempts} attempts: {url}",
-                request=response.request,
-                response=response,
-            )
-            time.sleep(settings.modal_download_retry_s)
-            continue
-        response.raise_for_status()
-        return response.content
-    if last_error:
-        raise last_error
-    raise ValueError(f"Modal download failed: {url}")
+log = get_logger(__name__)
+
+BASE64_SLICE_CHARS = 4 * 256 * 1024
 
 def _resolve_asset_url(response: httpx.Response, url: str) -> str:
     if url.startswith("http://") or url.startswith("https://"):
@@ -34,13 +24,21 @@ def _resolve_asset_url(response: httpx.Response, url: str) -> str:
     base_url = str(response.request.url)
     return urljoin(base_url, url)
 
-def _resolve_download_from_payload(payload: dict, response: httpx.Response) -> bytes | None:
+def _artifact_sha256(payload: dict, artifact: dict | None = None) -> str | None:
+    for source in (artifact or {}, payload):
+        checksum = source.get("sha256") or source.get("checksum_sha256")
+        if isinstance(checksum, str):
+            return checksum
+    return None
+
+async def _download_from_payload(payload: dict, response: httpx.Response, out_glb: Path) -> bool:
     artifacts = payload.get("artifacts")
     if isinstance(artifacts, dict):
         artifact_url = artifacts.get("glb_url") or artifacts.get("model_url") or artifacts.get("download_url")
         if artifact_url:
             resolved_url = _resolve_asset_url(response, artifact_url)
-            return _download_with_retry(resolved_url)
+            await modal.fetch_to(resolved_url, out_glb, sha256=_artifact_sha256(payload, artifacts))
+            return True
     if isinstance(artifacts, list):
         for artifact in artifacts:
             if not isinstance(artifact, dict):
@@ -49,13 +47,15 @@ def _resolve_download_from_payload(payload: dict, response: httpx.Response) -> b
             filename = artifact.get("filename") or artifact.get("file_name")
             if artifact_url and (not filename or filename.endswith(".glb")):
                 resolved_url = _resolve_asset_url(response, artifact_url)
-                return _download_with_retry(resolved_url)
+                await modal.fetch_to(resolved_url, out_glb, sha256=_artifact_sha256(payload, artifact))
+                return True
 
     for key in ("glb_url", "url", "output_url", "model_url", "download_url"):
         url = payload.get(key)
         if url:
             resolved_url = _resolve_asset_url(response, url)
-            return _download_with_retry(resolved_url)
+            await modal.fetch_to(resolved_url, out_glb, sha256=_artifact_sha256(payload))
+            return True
 
     job_id = payload.get("job_id") or payload.get("id")
     if job_id:
@@ -70,46 +70,65 @@ def _resolve_download_from_payload(payload: dict, response: httpx.Response) -> b
             settings.modal_api_url.rstrip("/") + "/",
             f"download/{job_id}/{filename}",
         )
-        return _download_with_retry(
+        await modal.fetch_to(
             download_url,
+            out_glb,
             max_attempts=settings.modal_download_fallback_max_attempts,
+            sha256=_artifact_sha256(payload),
         )
-    return None
-
-def _write_glb_from_response(response: httpx.Response, out_glb: Path) -> None:
+        return True
+    return False
+
+def _write_base64(encoded: str, out_glb: Path) -> None:
+    # Decode in slices (a multiple of 4 chars) so the decoded model is never held whole next to
+    # the JSON text it came from.
+    if "\n" in encoded or " " in encoded:
+        encoded = "".join(encoded.split())
+    step = BASE64_SLICE_CHARS
+    with out_glb.open("wb") as fh:
+        for start in range(0, len(encoded), step):
+            fh.write(base64.b64decode(encoded[start:start + step]))
+
+async def _write_glb_from_response(response: httpx.Response, out_glb: Path) -> None:
+    """Consumes a streaming Modal response: GLB bodies go straight to disk, JSON bodies (small
+    unless they inline base64) are read and point at an artifact to stream or decode."""
     content_type = response.headers.get("content-type", "").lower()
     if "application/json" in content_type:
+        await response.aread()
         payload = response.json()
         if not isinstance(payload, dict):
             raise ValueError("Modal response JSON must be an object")
-        downloaded = _resolve_download_from_payload(payload, response)
-        if downloaded is not None:
-            out_glb.write_bytes(downloaded)
+        if await _download_from_payload(payload, response, out_glb):
             return
         for key in ("glb_base64", "model_base64", "data"):
             encoded = payload.get(key)
             if encoded:
-                out_glb.write_bytes(base64.b64decode(encoded))
+                await asyncio.to_thread(_write_base64, encoded, out_glb)
                 return
         raise ValueError("Modal response JSON missing GLB payload")
 
     if "model/gltf-binary" in content_type or "application/octet-stream" in content_type:
-        out_glb.write_bytes(response.content)
+        await modal.stream_to(response, out_glb)
         return
 
     raise ValueError(f"Unexpected Modal response type: {content_type}")
 
-def image_to_3d(image_path: Path, out_glb: Path) -> None:
+async def image_to_3d_async(image_path: Path, out_glb: Path) -> None:
     if not settings.modal_api_url:
         raise ValueError("Modal API URL is not configured")
 
     endpoint = urljoin(settings.modal_api_url.rstrip("/") + "/", settings.modal_image_to_3d_path.lstrip("/"))
-    with httpx.Client(timeout=settings.modal_api_timeout_s, follow_redirects=True) as client:
-        with image_path.open("rb") as handle:
-            files = {"file": (image_path.name, handle, "image/png")}
-            response = client.post(endpoint, files=files)
+    content_type = mimetypes.guess_type(image_path.name)[0] or "image/png"
+    files = {"file": (image_path.name, await asyncio.to_thread(image_path.read_bytes), content_type)}
+    response = await modal.submit(endpoint, files=files)
+    try:
         response.raise_for_status()
-        _write_glb_from_response(response, out_glb)
+        await _write_glb_from_response(response, out_glb)
+    finally:
+        await response.aclose()
+
+def image_to_3d(image_path: Path, out_glb: Path) -> None:
+    modal.run(image_to_3d_async(image_path, out_glb))
 
 def _prompt_endpoints() -> list[str]:
     base = settings.modal_api_url.rstrip("/") + "/"
@@ -132,16 +151,73 @@ def _prompt_endpoints() -> list[str]:
         endpoints.append(urljoin(base, path))
     return endpoints
 
-def prompt_to_3d(prompt: str, out_glb: Path) -> None:
+# The prompt endpoint that last answered, shared by every worker through Redis and kept per process
+# so most jobs skip even the Redis read; a 404 from it drops it and discovery runs again.
+_known_endpoint: dict[str, tuple[str, float]] = {}
+
+def _endpoint_key() -> str:
+    return f"modal:prompt-endpoint:{settings.modal_api_url}"
+
+def _cached_prompt_endpoint() -> str | None:
+    hit = _known_endpoint.get(settings.modal_api_url)
+    if hit and hit[1] > time.monotonic():
+        return hit[0]
+    try:
+        endpoint = get_redis_sync().get(_endpoint_key())
+    except Exception:
+        log.warning("modal endpoint cache unavailable", exc_info=True)
+        return None
+    if endpoint:
+        _known_endpoint[settings.modal_api_url] = (endpoint, time.monotonic() + settings.modal_endpoint_local_ttl_s)
+    return endpoint
+
+def _remember_prompt_endpoint(endpoint: str) -> None:
+    _known_endpoint[settings.modal_api_url] = (endpoint, time.monotonic() + settings.modal_endpoint_local_ttl_s)
+    try:
+        get_redis_sync().set(_endpoint_key(), endpoint, ex=settings.modal_endpoint_cache_ttl_s)
+    except Exception:
+        log.warning("modal endpoint cache unavailable", exc_info=True)
+
+def _forget_prompt_endpoint() -> None:
+    _known_endpoint.pop(settings.modal_api_url, None)
+    try:
+        get_redis_sync().delete(_endpoint_key())
+    except Exception:
+        log.warning("modal endpoint cache unavailable", exc_info=True)
+
+async def probe_prompt_endpoint_async() -> str | None:
+    """Reads the GPU service's OpenAPI schema and remembers the first candidate it serves."""
+    base = settings.modal_api_url.rstrip("/") + "/"
+    response = await modal.client.get(urljoin(base, "openapi.json"), timeout=settings.modal_connect_timeout_s)
+    if response.status_code != 200:
+        return None
+    paths = response.json().get("paths") or {}
+    for endpoint in _prompt_endpoints():
+        if "post" in (paths.get(urlparse(endpoint).path) or {}):
+            await asyncio.to_thread(_remember_prompt_endpoint, endpoint)
+            return endpoint
+    return None
+
+def probe_prompt_endpoint() -> str | None:
+    return modal.run(probe_prompt_endpoint_async())
+
+async def prompt_to_3d_async(prompt: str, out_glb: Path) -> None:
     if not settings.modal_api_url:
         raise ValueError("Modal API URL is not configured")
 
     payload = {"prompt": prompt}
     last_error: Exception | None = None
-    with httpx.Client(timeout=settings.modal_api_timeout_s, follow_redirects=True) as client:
-        for endpoint in _prompt_endpoints():
-            response = client.post(endpoint, json=payload)
+    candidates = _prompt_endpoints()
+    cached = await asyncio.to_thread(_cached_prompt_endpoint)
+    if cached in candidates:
+        candidates.remove(cached)
+        candidates.insert(0, cached)
+    for endpoint in candidates:
+        response = await modal.submit(endpoint, json=payload)
+        try:
             if response.status_code == 404:
+                if endpoint == cached:
+                    await asyncio.to_thread(_forget_prompt_endpoint)
                 last_error = httpx.HTTPStatusError(
                     f"Prompt endpoint not found: {endpoint}",
                     request=response.request,
@@ -149,7 +225,14 @@ def prompt_to_3d(prompt: str, out_glb: Path) -> None:
                 )
                 continue
             response.raise_for_status()
-            _write_glb_from_response(response, out_glb)
+            if endpoint != cached:
+                await asyncio.to_thread(_remember_prompt_endpoint, endpoint)
+            await _write_glb_from_response(response, out_glb)
             return
+        finally:
+            await response.aclose()
     if last_error:
         raise last_error
+
+def prompt_to_3d(prompt: str, out_glb: Path) -> None:
+    modal.run(prompt_to_3d_async(prompt, out_glb))
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import numpy as np
+from PIL import Image, ImageOps
+from app.core.config import settings
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+SUFFIXES = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    max_px: int
+    format: str
+    quality: int
+    blur_threshold: float
+    analysis_px: int
+
+    @classmethod
+    def from_settings(cls) -> PreprocessOptions:
+        return cls(
+            max_px=settings.scan_preprocess_max_px,
+            format=settings.scan_preprocess_format.upper(),
+            quality=settings.scan_preprocess_quality,
+            blur_threshold=settings.scan_blur_threshold,
+            analysis_px=settings.scan_blur_analysis_px,
+        )
+
+def sharpness(img: Image.Image, analysis_px: int) -> float:
+    """Variance of the 4-neighbour Laplacian of the grey image, measured at a fixed size so the
+    threshold means the same thing for a 12 MP phone photo and a 2 MP one."""
+    grey = img.convert("L")
+    grey.thumbnail((analysis_px, analysis_px), Image.Resampling.BILINEAR)
+    g = np.asarray(grey, dtype=np.float32)
+    if g.shape[0] < 3 or g.shape[1] < 3:
+        return 0.0
+    lap = g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:] - 4.0 * g[1:-1, 1:-1]
+    return float(lap.var())
+
+def _process_one(src: str, out_dir: str, opts: PreprocessOptions) -> dict:
+    # Runs in a pool process; takes and returns only plain data.
+    name = Path(src).name
+    try:
+        with Image.open(src) as img:
+            # JPEG decodes straight to a reduced scale (1/2..1/8), so a 48 MP frame never
+            # materializes at full size.
+            img.draft("RGB", (opts.max_px, opts.max_px))
+            img = ImageOps.exif_transpose(img)
+            exif = img.getexif()  # orientation already applied and dropped; focal length etc. kept
+            img = img.convert("RGB")
+            img.thumbnail((opts.max_px, opts.max_px), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return {"source": name, "reason": "unreadable", "detail": str(exc)}
+    score = round(sharpness(img, opts.analysis_px), 2)
+    if score < opts.blur_threshold:
+        return {"source": name, "reason": "blurry", "sharpness": score}
+    out = Path(out_dir) / (Path(src).stem + SUFFIXES[opts.format])
+    img.save(out, opts.format, quality=opts.quality, exif=exif)
+    return {"source": name, "output": out.name, "width": img.width, "height": img.height, "sharpness": score}
+
+def _allow_children() -> None:
+    # Celery's prefork children are daemonic billiard processes: multiprocessing refuses to start
+    # processes from a daemon, and cannot pickle billiard's authkey into a spawned one. Both are
+    # reset to what a plain parent would hand down; the key's value is kept.
+    current = multiprocessing.current_process()
+    if not current.daemon:
+        return
+    current._config["daemon"] = False
+    current._config["authkey"] = multiprocessing.process.AuthenticationString(bytes(current.authkey))
+
+class _Pool:
+    """One process pool per worker process, shared by every scan job running in it, so concurrent
+    jobs split the cores instead of each starting cpu_count processes. Spawned rather than forked:
+    the Celery worker is multi-threaded and forking it could copy held locks.
+
+    Prefork children exit without running interpreter hooks, so celery_app shuts the pool down
+    on worker_process_shutdown."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                _allow_children()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.scan_preprocess_workers or os.cpu_count(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drops a pool that broke (a child was OOM-killed or crashed) so the next use starts a
+        fresh one; a broken ProcessPoolExecutor fails every later submit."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stops this process's pool and waits for its children."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            owned = self._pid == os.getpid()
+        if executor is not None and owned:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+pool = _Pool()
+
+def preprocess_images(src_dir: Path, out_dir: Path, opts: PreprocessOptions | None = None) -> dict:
+    """Normalizes every photo in ``src_dir`` into ``out_dir`` (EXIF orientation applied, longest
+    side capped, one format) and drops blurry frames. Returns the manifest of kept and rejected
+    frames; raises if nothing usable is left."""
+    opts = opts or PreprocessOptions.from_settings()
+    if opts.format not in SUFFIXES:
+        raise ValueError(f"unsupported preprocess format: {opts.format}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sources = sorted(str(p) for p in src_dir.iterdir() if p.is_file())
+    for attempt in range(2):
+        executor = pool.executor
+        try:
+            results = list(executor.map(_process_one, sources, [str(out_dir)] * len(sources), [opts] * len(sources)))
+            break
+        except BrokenProcessPool:
+            # Shared with other jobs, so one bad frame or OOM kill must not wedge the worker; the
+            # frames are rewritten from scratch on the fresh pool.
+            pool.discard(executor)
+            if attempt:
+                raise
+            log.warning("preprocess pool broke; retrying on a fresh pool", extra={"frames": len(sources)})
+    manifest: dict = {"options": asdict(opts), "kept": [], "rejected": []}
+    for result in results:
+        manifest["kept" if "output" in result else "rejected"].append(result)
+    log.info("scan frames preprocessed", extra={"kept": len(manifest["kept"]), "rejected": len(manifest["rejected"])})
+    if not manifest["kept"]:
+        raise ValueError(f"no usable frames: {len(manifest['rejected'])} rejected")
+    return manifest
@@ -1,6 +1,413 @@
 from __future__ import annotations
+import json
+import shutil
+import struct
+from dataclasses import dataclass
 from pathlib import Path
+import numpy as np
+from app.core.config import settings
+from app.core.logging import get_logger
 
-def repair_mesh(in_glb: Path, out_glb: Path) -> None:
-    # Placeholder: replace with Trimesh/MeshLab/PyMeshLab repair + hole filling
-    out_glb.write_bytes(in_glb.read_bytes())
+log = get_logger(__name__)
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+TRIANGLES = 4
+FLOAT = 5126
+COMPONENT_TYPES = {5120: np.int8, 5121: np.uint8, 5122: np.int16, 5123: np.uint16, 5125: np.uint32, FLOAT: np.float32}
+COMPONENT_CODES = {np.dtype(t): code for code, t in COMPONENT_TYPES.items()}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+TYPE_NAMES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+GRID_BITS = 21  # per axis, so a quantized position packs into one int64
+# Extensions that keep no byte offsets of their own (material/texture/light JSON, or data reached
+# through ordinary bufferView references), so re-laying the BIN chunk leaves them intact. Anything
+# else, EXT_meshopt_compression and KHR_draco_mesh_compression included, may point into the
+# original BIN in ways write_glb cannot follow: such files are passed through unrepaired.
+SAFE_EXTENSIONS = frozenset({
+    "KHR_texture_transform", "KHR_texture_basisu", "EXT_texture_webp", "EXT_texture_avif",
+    "KHR_lights_punctual", "KHR_mesh_quantization", "EXT_mesh_gpu_instancing", "KHR_xmp_json_ld",
+})
+SAFE_EXTENSION_PREFIXES = ("KHR_materials_",)
+
+class _Unsupported(Exception):
+    """A primitive this engine leaves untouched (strips, morph targets, compressed, sparse...)."""
+
+@dataclass
+class Glb:
+    """Parsed GLB: the glTF JSON plus, per bufferView, its bytes. Views read from a file are
+    memoryviews into the BIN chunk; rewritten geometry is appended as NumPy arrays."""
+    gltf: dict
+    views: list
+
+def read_glb(data: bytes | np.ndarray) -> Glb:
+    """Parses a GLB held in any byte buffer; the views point into it rather than copying."""
+    magic, version, length = struct.unpack_from("<4sII", data)
+    if magic != GLB_MAGIC or version != 2 or length > len(data):
+        raise ValueError("not a glTF 2.0 binary")
+    gltf, binary, offset = None, memoryview(b""), 12
+    while offset < length:
+        size, kind = struct.unpack_from("<II", data, offset)
+        chunk = memoryview(data)[offset + 8:offset + 8 + size]
+        if kind == CHUNK_JSON:
+            gltf = json.loads(bytes(chunk))
+        elif kind == CHUNK_BIN and not binary:
+            binary = chunk
+        offset += 8 + size
+    if gltf is None:
+        raise ValueError("GLB has no JSON chunk")
+    views = []
+    for view in gltf.get("bufferViews", []):
+        start = view.get("byteOffset", 0)
+        views.append(binary[start:start + view["byteLength"]])
+    return Glb(gltf, views)
+
+def write_glb(glb: Glb, path: Path) -> None:
+    """Lays the views out back to back (4-byte aligned) in a single BIN chunk and streams it out."""
+    gltf, chunks, offset = glb.gltf, [], 0
+    for view, data in zip(gltf.get("bufferViews", []), glb.views):
+        raw = memoryview(data).cast("B")
+        view.update(buffer=0, byteOffset=offset, byteLength=raw.nbytes)
+        chunks.append(raw)
+        offset += raw.nbytes + (-raw.nbytes % 4)
+    if chunks:
+        gltf["buffers"] = [{"byteLength": offset}]
+    else:
+        gltf.pop("buffers", None)
+    doc = json.dumps(gltf, separators=(",", ":")).encode()
+    doc += b" " * (-len(doc) % 4)
+    total = 12 + 8 + len(doc) + (8 + offset if chunks else 0)
+    with path.open("wb") as fh:
+        fh.write(struct.pack("<4sII", GLB_MAGIC, 2, total))
+        fh.write(struct.pack("<II", len(doc), CHUNK_JSON))
+        fh.write(doc)
+        if chunks:
+            fh.write(struct.pack("<II", offset, CHUNK_BIN))
+            for raw in chunks:
+                fh.write(raw)
+                fh.write(b"\0" * (-raw.nbytes % 4))
+
+def write_triangle_mesh(path: Path, positions: np.ndarray, faces: np.ndarray) -> None:
+    """Minimal single-primitive GLB (used by the benchmark and tests)."""
+    glb = Glb({"asset": {"version": "2.0"}, "scenes": [{"nodes": [0]}], "scene": 0, "nodes": [{"mesh": 0}],
+               "meshes": [{"primitives": [{"attributes": {}, "mode": TRIANGLES}]}], "bufferViews": [], "accessors": []}, [])
+    prim = glb.gltf["meshes"][0]["primitives"][0]
+    prim["attributes"]["POSITION"] = _add_accessor(glb, np.asarray(positions, np.float32), bounds=True)
+    prim["indices"] = _add_accessor(glb, np.asarray(faces, np.uint32).reshape(-1))
+    write_glb(glb, path)
+
+def _read_accessor(glb: Glb, index: int) -> tuple[np.ndarray, dict]:
+    """(count, components) view straight into the BIN chunk: no copy, strides honoured."""
+    acc = glb.gltf["accessors"][index]
+    if "sparse" in acc or "bufferView" not in acc:
+        raise _Unsupported("sparse or empty accessor")
+    view = glb.gltf["bufferViews"][acc["bufferView"]]
+    if view.get("buffer", 0) != 0 or "EXT_meshopt_compression" in view.get("extensions", {}):
+        raise _Unsupported("external or compressed buffer")
+    dtype = np.dtype(COMPONENT_TYPES[acc["componentType"]])
+    width = TYPE_SIZES[acc["type"]]
+    stride = view.get("byteStride") or dtype.itemsize * width
+    array = np.ndarray((acc["count"], width), dtype, buffer=glb.views[acc["bufferView"]],
+                       offset=acc.get("byteOffset", 0), strides=(stride, dtype.itemsize))
+    return array, acc
+
+def _bounds(array: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Column by column: NumPy's axis=0 reduction over narrow rows is several times slower.
+    columns = array.T if array.ndim == 2 else array[None]
+    return np.array([c.min() for c in columns]), np.array([c.max() for c in columns])
+
+def _add_accessor(glb: Glb, array: np.ndarray, like: dict | None = None, *, bounds: bool = False,
+                  replace: int | None = None) -> int:
+    """Stores ``array`` in a new bufferView; the accessor goes in slot ``replace`` if given (so
+    every reference to it stays valid), else at the end."""
+    array = np.ascontiguousarray(array)
+    width = 1 if array.ndim == 1 else array.shape[1]
+    glb.gltf["bufferViews"].append({"buffer": 0, "byteLength": array.nbytes})
+    glb.views.append(array)
+    acc = {"bufferView": len(glb.views) - 1, "componentType": COMPONENT_CODES[array.dtype],
+           "count": len(array), "type": TYPE_NAMES[width]}
+    if like and like.get("normalized"):
+        acc["normalized"] = True
+    if like and "name" in like:
+        acc["name"] = like["name"]
+    if bounds and len(array):
+        lo, hi = _bounds(array)
+        acc["min"], acc["max"] = lo.tolist(), hi.tolist()
+    if replace is not None:
+        glb.gltf["accessors"][replace] = acc
+        return replace
+    glb.gltf["accessors"].append(acc)
+    return len(glb.gltf["accessors"]) - 1
+
+def _groups(key: np.ndarray, *more: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """np.unique(rows, return_index=True, return_inverse=True) over one or more key columns,
+    without the stable sort (or, for several columns, the row-by-row comparisons) it costs: any
+    member may represent its group here. Returns (representatives, row -> group id)."""
+    order = np.lexsort(more[::-1] + (key,)) if more else np.argsort(key)
+    starts = np.zeros(len(key), bool)
+    starts[:1] = True
+    for column in (key, *more):
+        ordered = column[order]
+        starts[1:] |= ordered[1:] != ordered[:-1]
+    del ordered
+    ids = np.cumsum(starts, dtype=np.int32 if len(key) < 2 ** 31 else np.int64)
+    ids -= 1
+    inverse = np.empty_like(ids)
+    inverse[order] = ids
+    return order[starts], inverse
+
+def _weld(positions: np.ndarray, extras: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Spatial hash: positions snap to a grid of mesh_weld_tolerance x the bounding box, each cell
+    packs into one int64, and vertices sharing a cell (and identical other attributes, so UV and
+    colour seams survive) become one. Returns (representative vertex ids, old -> new map)."""
+    lo, hi = _bounds(positions)
+    scale = float((hi - lo).max()) or 1.0
+    cell = max(scale * settings.mesh_weld_tolerance, scale / (2 ** GRID_BITS - 2))
+    key = np.zeros(len(positions), np.int64)
+    for axis in range(3):  # one column at a time keeps the temporaries to a single axis
+        key <<= GRID_BITS
+        key |= ((positions[:, axis] - lo[axis]) / cell).astype(np.int64)
+    columns = [word for e in extras for word in _row_words(e).T]
+    return _groups(key, *columns)
+
+def _row_words(values: np.ndarray) -> np.ndarray:
+    # Exact-match key for an attribute row, whatever its component type.
+    raw = np.ascontiguousarray(values).view(np.uint8).reshape(len(values), -1)
+    if raw.shape[1] % 4 == 0:
+        raw = raw.view(np.uint32)
+    return raw
+
+def _face_cross(positions: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    # np.take gathers rows several times faster than fancy indexing.
+    p0 = np.take(positions, faces[:, 0], axis=0)
+    e1 = np.take(positions, faces[:, 1], axis=0)
+    e1 -= p0
+    e2 = np.take(positions, faces[:, 2], axis=0)
+    e2 -= p0
+    del p0
+    return np.cross(e1, e2)
+
+def _unique_rows(faces: np.ndarray, vertex_count: int) -> np.ndarray:
+    """One index per distinct face, whatever its winding, in original order."""
+    s = np.sort(faces, axis=1).astype(np.int64)
+    if vertex_count < 2 ** GRID_BITS:
+        first, _ = _groups((s[:, 0] << (2 * GRID_BITS)) | (s[:, 1] << GRID_BITS) | s[:, 2])
+    else:
+        first, _ = _groups(s[:, 0], s[:, 1], s[:, 2])
+    return np.sort(first)
+
+def _boundary_loops(faces: np.ndarray, max_edges: int) -> list[list[int]]:
+    """Closed loops of edges used by exactly one face, following face winding. Loops through a
+    non-manifold vertex or longer than max_edges are left open."""
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2)
+    key = np.minimum(edges[:, 0], edges[:, 1]).astype(np.int64)
+    key <<= 32
+    key |= np.maximum(edges[:, 0], edges[:, 1])
+    ordered = np.sort(key)
+    lone = np.ones(len(ordered), bool)
+    repeat = ordered[1:] == ordered[:-1]
+    lone[1:] &= ~repeat
+    lone[:-1] &= ~repeat
+    singles = ordered[lone]
+    del ordered, lone, repeat
+    if not len(singles):
+        return []
+    # Few boundary edges against millions of edges: a binary search beats another full sort.
+    at = np.searchsorted(singles, key)
+    np.minimum(at, len(singles) - 1, out=at)
+    boundary = edges[singles[at] == key].astype(np.int64)
+    starts, multiplicity = np.unique(boundary[:, 0], return_counts=True)
+    pinched = set(starts[multiplicity > 1].tolist())
+    following = dict(zip(boundary[:, 0].tolist(), boundary[:, 1].tolist()))
+    seen: set[int] = set()
+    loops = []
+    for start in following:
+        if start in seen or start in pinched:
+            continue
+        loop, v = [], start
+        while v not in seen and v in following and v not in pinched and len(loop) <= max_edges:
+            seen.add(v)
+            loop.append(v)
+            v = following[v]
+        if v == start and 3 <= len(loop) <= max_edges:
+            loops.append(loop)
+    return loops
+
+def _fill_holes(positions: np.ndarray, extras: list[np.ndarray], faces: np.ndarray, loops: list[list[int]],
+                copied: list[bool] | None = None):
+    """Fans each loop around a new vertex at its centroid; fill faces run against the loop so the
+    patch inherits the surrounding winding. The centre averages the ring's attributes, except the
+    ``copied`` ones (skin JOINTS_n/WEIGHTS_n), which come whole from one ring vertex: averaged
+    joint indices name unrelated bones and averaged weights no longer match the joints."""
+    copied = copied or [False] * len(extras)
+    new_faces, centres, centre_extras = [], [], [[] for _ in extras]
+    next_vertex = len(positions)
+    for loop in loops:
+        ring = np.asarray(loop, np.int64)
+        if len(ring) == 3:
+            new_faces.append(ring[::-1][None, :])
+            continue
+        centres.append(positions[ring].mean(axis=0))
+        for out, extra, copy in zip(centre_extras, extras, copied):
+            out.append(extra[ring[0]] if copy else extra[ring].mean(axis=0))
+        nxt = np.roll(ring, -1)
+        new_faces.append(np.column_stack([np.full(len(ring), next_vertex), nxt, ring]))
+        next_vertex += 1
+    if centres:
+        positions = np.vstack([positions, np.asarray(centres, positions.dtype)])
+        extras = [np.vstack([e, np.asarray(c).round().astype(e.dtype) if e.dtype.kind in "iu" else np.asarray(c, e.dtype)])
+                  for e, c in zip(extras, centre_extras)]
+    return positions, extras, np.vstack([faces] + [f.astype(faces.dtype) for f in new_faces])
+
+def _vertex_normals(count: int, faces: np.ndarray, cross: np.ndarray) -> np.ndarray:
+    # Face cross products have length 2 x area, so summing them weights larger faces more.
+    normals = np.empty((count, 3), np.float32)
+    corners = faces.reshape(-1)
+    for axis in range(3):
+        normals[:, axis] = np.bincount(corners, weights=np.repeat(cross[:, axis], 3), minlength=count)
+    length = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+    normals[length == 0] = (0.0, 0.0, 1.0)
+    length[length == 0] = 1.0
+    normals /= length[:, None]
+    return normals
+
+def _repair_primitive(glb: Glb, prim: dict, uses: dict[int, int], stats: dict) -> None:
+    if prim.get("mode", TRIANGLES) != TRIANGLES or prim.get("targets"):
+        raise _Unsupported("not a plain triangle list")
+    if "KHR_draco_mesh_compression" in prim.get("extensions", {}):
+        raise _Unsupported("Draco-compressed")
+    attributes = prim["attributes"]
+    positions, pos_acc = _read_accessor(glb, attributes["POSITION"])
+    if pos_acc["componentType"] != FLOAT or positions.shape[1] != 3:
+        raise _Unsupported("quantized positions")
+    if "indices" in prim:
+        indices, _ = _read_accessor(glb, prim["indices"])
+        faces = indices.reshape(-1)[: len(indices) // 3 * 3].reshape(-1, 3)
+    else:
+        faces = np.arange(len(positions) // 3 * 3).reshape(-1, 3)
+    # NORMAL is recomputed; everything else is carried through the weld.
+    extra_names = [name for name in attributes if name not in ("POSITION", "NORMAL")]
+    extra_read = [_read_accessor(glb, attributes[name]) for name in extra_names]
+    extras = [array for array, _ in extra_read]
+    stats["vertices_in"] += len(positions)
+    stats["faces_in"] += len(faces)
+    if not len(faces):
+        return
+
+    first, remap = _weld(positions, extras)
+    positions = np.take(positions, first, axis=0)
+    extras = [np.take(e, first, axis=0) for e in extras]
+    faces = np.take(remap, faces)
+    del first, remap
+
+    # Computed once: zero-area test now, area-weighted vertex normals at the end.
+    cross = _face_cross(positions, faces)
+    lo, hi = _bounds(positions)
+    scale = float((hi - lo).max()) or 1.0
+    collapsed = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 2] == faces[:, 0])
+    degenerate = collapsed | (np.einsum("ij,ij->i", cross, cross) <= (scale * 1e-9) ** 4)
+    faces, cross = faces[~degenerate], cross[~degenerate]
+    stats["degenerate_removed"] += int(degenerate.sum())
+
+    keep = _unique_rows(faces, len(positions))
+    stats["duplicates_removed"] += len(faces) - len(keep)
+    faces, cross = faces[keep], cross[keep]
+
+    loops = _boundary_loops(faces, settings.mesh_hole_max_edges)
+    before = len(faces)
+    skin = [name.startswith(("JOINTS_", "WEIGHTS_")) for name in extra_names]
+    positions, extras, faces = _fill_holes(positions, extras, faces, loops, skin)
+    cross = np.vstack([cross, _face_cross(positions, faces[before:])])
+    stats["holes_filled"] += len(loops)
+
+    used = np.zeros(len(positions), bool)
+    used[faces.reshape(-1)] = True
+    compact = np.cumsum(used, dtype=np.int64) - 1
+    positions = positions[used]
+    extras = [e[used] for e in extras]
+    faces = compact[faces]
+    stats["vertices_out"] += len(positions)
+    stats["faces_out"] += len(faces)
+
+    def own(index):  # accessors shared with another primitive keep their old data for it
+        return index if index is not None and uses.get(index) == 1 else None
+
+    attributes["POSITION"] = _add_accessor(glb, positions, pos_acc, bounds=True, replace=own(attributes["POSITION"]))
+    attributes["NORMAL"] = _add_accessor(glb, _vertex_normals(len(positions), faces, cross), replace=own(attributes.get("NORMAL")))
+    for name, extra, (_, like) in zip(extra_names, extras, extra_read):
+        attributes[name] = _add_accessor(glb, extra, like, replace=own(attributes[name]))
+    index_dtype = np.uint16 if len(positions) <= 0xFFFF else np.uint32
+    prim["indices"] = _add_accessor(glb, faces.astype(index_dtype).reshape(-1), replace=own(prim.get("indices")))
+
+def _accessor_uses(gltf: dict) -> dict[int, int]:
+    uses: dict[int, int] = {}
+    refs = []
+    for mesh in gltf.get("meshes", []):
+        for prim in mesh["primitives"]:
+            refs += list(prim["attributes"].values()) + [prim.get("indices")]
+            refs += [i for target in prim.get("targets", []) for i in target.values()]
+    refs += [skin.get("inverseBindMatrices") for skin in gltf.get("skins", [])]
+    refs += [i for anim in gltf.get("animations", []) for sampler in anim["samplers"] for i in (sampler["input"], sampler["output"])]
+    for ref in refs:
+        if ref is not None:
+            uses[ref] = uses.get(ref, 0) + 1
+    return uses
+
+def _view_holders(node, found: list) -> list:
+    if isinstance(node, dict):
+        if isinstance(node.get("bufferView"), int):
+            found.append(node)
+        for key, value in node.items():
+            if key != "bufferViews":
+                _view_holders(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _view_holders(value, found)
+    return found
+
+def _compact(glb: Glb) -> None:
+    """Drops bufferViews nothing points at any more (the pre-repair geometry) and renumbers
+    every ``bufferView`` reference, wherever in the document it lives."""
+    view_map: dict[int, int] = {}
+    for holder in _view_holders(glb.gltf, []):
+        holder["bufferView"] = view_map.setdefault(holder["bufferView"], len(view_map))
+    order = sorted(view_map, key=view_map.get)
+    glb.gltf["bufferViews"] = [glb.gltf["bufferViews"][old] for old in order]
+    glb.views = [glb.views[old] for old in order]
+
+def repair_mesh(in_glb: Path, out_glb: Path) -> dict:
+    """GLB -> weld -> drop degenerate/duplicate faces -> fill small holes -> recompute normals ->
+    GLB. The file is memory-mapped and geometry read as NumPy views over its BIN chunk, so only
+    the rewritten arrays are held in memory; textures and anything else not rewritten are copied
+    through from the mapping. Input that isn't a GLB, or that uses external buffers or an
+    extension outside SAFE_EXTENSIONS, is copied as is."""
+    # Unmapped once the last view into it is gone; an empty file cannot be mapped.
+    data = np.memmap(in_glb, dtype=np.uint8, mode="r") if in_glb.stat().st_size else b""
+    if bytes(data[:4]) != GLB_MAGIC:
+        log.warning("repair skipped: not a GLB", extra={"path": str(in_glb)})
+        shutil.copyfile(in_glb, out_glb)
+        return {"skipped": "not a GLB"}
+    glb = read_glb(data)
+    if any("uri" in buffer for buffer in glb.gltf.get("buffers", [])):
+        shutil.copyfile(in_glb, out_glb)
+        return {"skipped": "external buffers"}
+    unknown = sorted(name for name in {*glb.gltf.get("extensionsUsed", []), *glb.gltf.get("extensionsRequired", [])}
+                     if name not in SAFE_EXTENSIONS and not name.startswith(SAFE_EXTENSION_PREFIXES))
+    if unknown:
+        log.info("repair skipped: unsupported extensions", extra={"extensions": unknown})
+        shutil.copyfile(in_glb, out_glb)
+        return {"skipped": f"unsupported extensions: {', '.join(unknown)}"}
+    stats = dict.fromkeys(("primitives", "vertices_in", "vertices_out", "faces_in", "faces_out",
+                           "degenerate_removed", "duplicates_removed", "holes_filled"), 0)
+    uses = _accessor_uses(glb.gltf)
+    for mesh in glb.gltf.get("meshes", []):
+        for prim in mesh["primitives"]:
+            try:
+                _repair_primitive(glb, prim, uses, stats)
+                stats["primitives"] += 1
+            except _Unsupported as exc:
+                log.info("repair left primitive untouched: %s", exc)
+    _compact(glb)
+    write_glb(glb, out_glb)
+    log.info("mesh repaired", extra=stats)
+    return stats
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from celery import Celery
+from celery import Celery, signals
 from app.core.config import settings
+from app.core.logging import configure_logging, get_logger, request_id_var
 
 celery_app = Celery(
     "r2v",
@@ -9,6 +10,85 @@ celery_app = Celery(
     include=["app.workers.tasks"],
 )
 celery_app.conf.task_default_queue = "r2v"
-celery_app.conf.task_routes = {"app.workers.tasks.*": {"queue": "r2v"}}
+# AI generations spend minutes waiting on one Modal request, so they get their own queue, consumed
+# by a worker started with --pool threads: many generations share one process and the Modal client
+# loop (app.workers.adapters.modal_client). Everything else stays on the prefork "r2v" queue where
+# CPU work is not serialized behind one GIL: scan reconstruction, and mesh repair of generated
+# models, which ai_generate_task hands to ai_finalize_task once Modal returns.
+celery_app.conf.task_routes = {
+    "app.workers.tasks.ai_generate_task": {"queue": settings.celery_modal_queue},
+    "app.workers.tasks.*": {"queue": "r2v"},
+}
 celery_app.conf.worker_prefetch_multiplier = 1
 celery_app.conf.task_acks_late = True
+celery_app.conf.beat_schedule = {
+    "flush-view-counters": {
+        "task": "app.workers.tasks.flush_view_counters_task",
+        "schedule": float(settings.counter_flush_interval_s),
+    },
+    "flush-recently-viewed": {
+        "task": "app.workers.tasks.flush_recently_viewed_task",
+        "schedule": float(settings.recently_viewed_flush_interval_s),
+    },
+    "rebuild-user-stats": {
+        "task": "app.workers.tasks.rebuild_user_stats_task",
+        "schedule": float(settings.user_stats_rebuild_interval_s),
+    },
+    "reconcile-counters": {
+        "task": "app.workers.tasks.reconcile_counters_task",
+        "schedule": float(settings.counter_reconcile_interval_s),
+    },
+}
+
+@signals.setup_logging.connect
+def _setup_logging(**kwargs):
+    # Connecting this stops Celery from replacing the root logger's handlers with its own.
+    configure_logging()
+
+@signals.before_task_publish.connect
+def _propagate_request_id(headers=None, **kwargs):
+    request_id = request_id_var.get()
+    if request_id and headers is not None:
+        headers.setdefault("request_id", request_id)
+
+@signals.task_prerun.connect
+def _bind_request_id(task=None, **kwargs):
+    request_id = getattr(task.request, "request_id", None) or (task.request.headers or {}).get("request_id")
+    task.request._request_id_token = request_id_var.set(request_id)
+
+@signals.task_postrun.connect
+def _unbind_request_id(task=None, **kwargs):
+    token = getattr(task.request, "_request_id_token", None)
+    if token is not None:
+        request_id_var.reset(token)
+
+@signals.worker_ready.connect
+def _serve_metrics(**kwargs):
+    # Worker-side metrics (S3 transfer throughput etc.) on their own port; 0 disables. Tasks run
+    # in prefork children, so this serves the PROMETHEUS_MULTIPROC_DIR merge of all of them (see
+    # docker/entrypoint.worker.sh), not the main process's own, empty, registry.
+    if settings.worker_metrics_port:
+        from prometheus_client import start_http_server
+        from app.core.metrics import collector_registry
+        start_http_server(settings.worker_metrics_port, registry=collector_registry())
+
+@signals.worker_process_shutdown.connect
+def _mark_child_dead(**kwargs):
+    from app.core.metrics import mark_process_dead
+    mark_process_dead()
+
+@signals.worker_process_shutdown.connect
+def _stop_preprocess_pool(**kwargs):
+    from app.workers.adapters.preprocess import pool
+    pool.shutdown()
+
+@signals.worker_ready.connect
+def _probe_modal(**kwargs):
+    # Optional: learn the prompt endpoint once up front so the first jobs don't go looking for it.
+    if not settings.modal_probe_on_startup:
+        return
+    from app.workers.adapters.model_gen import probe_prompt_endpoint
+    try:
+        probe_prompt_endpoint()
+    except Exception:
+        get_logger(__name__).warning("modal endpoint probe failed", exc_info=True)
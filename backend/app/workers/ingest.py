@@ -0,0 +1,259 @@
+from __future__ import annotations
+import fcntl
+import hashlib
+import io
+import os
+import shutil
+import struct
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import observe_transfer
+from app.services.s3 import s3
+
+log = get_logger(__name__)
+
+CHUNK_BYTES = 1024 * 1024
+IMAGE_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".webp", ".heic", ".tif", ".tiff"})
+
+class ArchiveRejected(ValueError):
+    """A scan archive is too large, too deeply compressed or otherwise unsafe to expand."""
+
+@dataclass
+class Fetched:
+    cache_hit: bool = False
+    resumed: bool = False
+    bytes_downloaded: int = 0
+
+@dataclass
+class IngestStats:
+    paths: list[Path] = field(default_factory=list)
+    cache_hits: int = 0
+    resumed: int = 0
+    skipped: int = 0
+    bytes_downloaded: int = 0
+
+    def as_metrics(self) -> dict:
+        return {"files": len(self.paths), "cache_hits": self.cache_hits, "resumed": self.resumed,
+                "skipped": self.skipped, "bytes_downloaded": self.bytes_downloaded}
+
+def _cache_dir() -> Path:
+    path = Path(settings.scan_input_cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _content_id(head: dict) -> str:
+    # S3's ETag identifies the object's content (the MD5 for single-part uploads), so the same
+    # photo under another key or job maps to the same cache entry.
+    return hashlib.sha256(f"{head['ETag']}:{head['ContentLength']}".encode()).hexdigest()
+
+def _place(cached: Path, dest: Path) -> None:
+    try:
+        os.link(cached, dest)
+    except OSError:
+        shutil.copyfile(cached, dest)
+
+def _fetch_into_cache(bucket: str, key: str, head: dict, cached: Path, dest: Path) -> Fetched:
+    """Downloads to ``<id>.part`` (resuming from its current length via a Range GET pinned to the
+    ETag), renames it into the cache once complete and places it at ``dest``. The flock keeps
+    concurrent jobs, in this or another worker process, from writing the same entry twice."""
+    size = head["ContentLength"]
+    part = cached.with_name(cached.name + ".part")
+    with part.open("ab") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        if cached.exists():
+            # Another job finished it while we waited; don't leave the part file we just created.
+            if not fh.tell():
+                part.unlink(missing_ok=True)
+            _place(cached, dest)
+            return Fetched(cache_hit=True)
+        offset = fh.tell()
+        if offset > size:
+            fh.truncate(0)
+            offset = 0
+        started = time.perf_counter()
+        if offset < size:
+            body = s3.client.get_object(Bucket=bucket, Key=key, Range=f"bytes={offset}-", IfMatch=head["ETag"])["Body"]
+            for chunk in body.iter_chunks(CHUNK_BYTES):
+                fh.write(chunk)
+            fh.flush()
+        written = fh.tell()
+        if written != size:
+            raise IOError(f"incomplete download of {key}: {written} of {size} bytes")
+        observe_transfer("download", size - offset, time.perf_counter() - started)
+        os.replace(part, cached)
+        _place(cached, dest)
+    return Fetched(resumed=offset > 0, bytes_downloaded=size - offset)
+
+def _ingest_one(bucket: str, key: str, dest: Path, attempts: int = 3) -> Fetched:
+    head = s3.client.head_object(Bucket=bucket, Key=key)
+    cached = _cache_dir() / _content_id(head)
+    for attempt in range(attempts):
+        try:
+            if cached.exists():
+                os.utime(cached)  # LRU clock for prune_cache
+                _place(cached, dest)
+                return Fetched(cache_hit=True)
+            return _fetch_into_cache(bucket, key, head, cached, dest)
+        except FileNotFoundError:
+            # prune_cache (in another job) evicted the entry between the check and the link.
+            if attempt == attempts - 1:
+                raise
+            log.info("scan input evicted while placing; fetching again", extra={"key": key})
+
+def ingest_inputs(bucket: str, keys: list[str], inputs_dir: Path) -> IngestStats:
+    """Materializes every input object in ``inputs_dir`` with bounded parallelism, serving repeats
+    from the local content-addressed cache. Files keep upload order via an index prefix."""
+    inputs_dir.mkdir(parents=True, exist_ok=True)
+    stats = IngestStats(paths=[inputs_dir / f"{i:04d}_{PurePath(key).name}" for i, key in enumerate(keys)])
+    with ThreadPoolExecutor(max_workers=settings.scan_ingest_concurrency, thread_name_prefix="ingest") as pool:
+        # Iterating the results re-raises the first failure.
+        for fetched in pool.map(lambda kd: _ingest_one(bucket, *kd), zip(keys, stats.paths)):
+            stats.cache_hits += fetched.cache_hit
+            stats.resumed += fetched.resumed
+            stats.bytes_downloaded += fetched.bytes_downloaded
+    log.info("scan inputs ingested", extra=stats.as_metrics())
+    prune_cache()
+    return stats
+
+def prune_cache() -> None:
+    """Drops least recently used entries once the cache grows past scan_input_cache_max_bytes."""
+    entries = []
+    total = 0
+    for path in _cache_dir().iterdir():
+        if path.suffix == ".part" or not path.is_file():
+            continue
+        st = path.stat()
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    for _, size, path in sorted(entries):
+        if total <= settings.scan_input_cache_max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+class S3RangeFile(io.RawIOBase):
+    """Read-only, seekable view of an S3 object where every read is a ranged GET pinned to the
+    object's ETag. Wrapped in a BufferedReader it lets zipfile walk an archive in S3 directly:
+    the central directory and each member's bytes are fetched once, nothing else is."""
+
+    def __init__(self, client, bucket: str, key: str, head: dict) -> None:
+        self.client, self.bucket, self.key = client, bucket, key
+        self.size = head["ContentLength"]
+        self.etag = head["ETag"]
+        self.pos = 0
+        self.fetched = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def readinto(self, buffer) -> int:
+        if self.pos >= self.size or not len(buffer):
+            return 0
+        end = min(self.pos + len(buffer), self.size) - 1
+        body = self.client.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={self.pos}-{end}",
+                                      IfMatch=self.etag)["Body"]
+        n = 0
+        with memoryview(buffer) as view:
+            for chunk in body.iter_chunks(CHUNK_BYTES):
+                view[n:n + len(chunk)] = chunk
+                n += len(chunk)
+        self.pos += n
+        self.fetched += n
+        return n
+
+def _directory_entries(fh) -> tuple[int, int]:
+    """(entry count, central directory size) from the end-of-central-directory record (zip64
+    aware), read before zipfile materializes the directory, so a hostile archive is turned away
+    without allocating for it."""
+    size = fh.seek(0, io.SEEK_END)
+    tail_len = min(size, 22 + 0xFFFF)
+    fh.seek(size - tail_len)
+    tail = fh.read(tail_len)
+    at = tail.rfind(b"PK\x05\x06")
+    if at < 0:
+        raise ArchiveRejected("not a zip archive")
+    entries, cd_size = struct.unpack_from("<HI", tail, at + 10)
+    if entries == 0xFFFF or cd_size == 0xFFFFFFFF:
+        locator = tail[at - 20:at] if at >= 20 else b""
+        if not locator.startswith(b"PK\x06\x07"):
+            raise ArchiveRejected("corrupt zip64 archive")
+        (eocd64,) = struct.unpack_from("<Q", locator, 8)
+        fh.seek(eocd64)
+        record = fh.read(56)
+        if not record.startswith(b"PK\x06\x06"):
+            raise ArchiveRejected("corrupt zip64 archive")
+        entries, cd_size = struct.unpack_from("<QQ", record, 32)
+    return entries, cd_size
+
+def _image_members(zf: zipfile.ZipFile, stats: IngestStats) -> list[zipfile.ZipInfo]:
+    members, total = [], 0
+    for info in zf.infolist():
+        name = PurePath(info.filename)
+        if info.is_dir() or name.suffix.lower() not in IMAGE_SUFFIXES or any(p.startswith((".", "__MACOSX")) for p in name.parts):
+            stats.skipped += not info.is_dir()
+            continue
+        if info.flag_bits & 0x1:
+            raise ArchiveRejected(f"encrypted member: {info.filename}")
+        if info.file_size > settings.max_upload_bytes:
+            raise ArchiveRejected(f"member exceeds {settings.max_upload_bytes} bytes: {info.filename}")
+        if info.file_size > max(info.compress_size, 1) * settings.scan_zip_max_ratio:
+            raise ArchiveRejected(f"member compression ratio too high: {info.filename}")
+        total += info.file_size
+        if total > settings.scan_zip_max_bytes:
+            raise ArchiveRejected(f"archive expands past {settings.scan_zip_max_bytes} bytes")
+        members.append(info)
+    # Archive order turns the reads into one forward pass over the object.
+    return sorted(members, key=lambda i: i.header_offset)
+
+def _extract_archive(bucket: str, key: str, inputs_dir: Path, stats: IngestStats) -> None:
+    head = s3.client.head_object(Bucket=bucket, Key=key)
+    if head["ContentLength"] > settings.scan_zip_max_bytes:
+        raise ArchiveRejected(f"archive exceeds {settings.scan_zip_max_bytes} bytes")
+    raw = S3RangeFile(s3.client, bucket, key, head)
+    try:
+        with io.BufferedReader(raw, buffer_size=settings.scan_zip_read_bytes) as fh:
+            entries, cd_size = _directory_entries(fh)
+            if entries > settings.scan_zip_max_members or cd_size > settings.scan_zip_max_members * 1024:
+                raise ArchiveRejected(f"archive has more than {settings.scan_zip_max_members} members")
+            with zipfile.ZipFile(fh) as zf:
+                for info in _image_members(zf, stats):
+                    dest = inputs_dir / f"{len(stats.paths):04d}_{PurePath(info.filename).name}"
+                    # ZipExtFile stops at the declared size and checks the CRC, so a lying header
+                    # cannot write more than was vetted above.
+                    with zf.open(info) as src, dest.open("wb") as dst:
+                        shutil.copyfileobj(src, dst, settings.scan_zip_read_bytes)
+                    stats.paths.append(dest)
+    except zipfile.BadZipFile as exc:
+        raise ArchiveRejected(f"corrupt archive: {exc}") from exc
+    finally:
+        stats.bytes_downloaded += raw.fetched
+
+def ingest_archives(bucket: str, keys: list[str], inputs_dir: Path) -> IngestStats:
+    """Streams the image members of each uploaded zip into ``inputs_dir`` straight from S3: no
+    local copy of the archive, a single pass per member, memory bounded by scan_zip_read_bytes."""
+    inputs_dir.mkdir(parents=True, exist_ok=True)
+    stats = IngestStats()
+    started = time.perf_counter()
+    for key in keys:
+        _extract_archive(bucket, key, inputs_dir, stats)
+    observe_transfer("download", stats.bytes_downloaded, time.perf_counter() - started)
+    if not stats.paths:
+        raise ArchiveRejected("archive contains no images")
+    log.info("scan archive ingested", extra=stats.as_metrics())
+    return stats
@@ -1,118 +1,174 @@
 from __future__ import annotations
-import base64
-import datetime as dt
-import mimetypes
 import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
+import orjson
 from sqlalchemy.orm import Session
 from app.workers.celery_app import celery_app
 from app.db.session import SessionLocal
 from app.db.models.jobs import AIJob, ScanJob
-from app.services.s3 import s3
+from app.services.counters import flush_view_counters, reconcile_counters
+from app.services.job_progress import ProgressReporter
+from app.services.recently_viewed import flush_recently_viewed
+from app.services.s3 import Upload, s3
+from app.services.user_stats import rebuild_user_stats
 from app.core.config import settings
 from app.workers.adapters.model_gen import image_to_3d, prompt_to_3d
 from app.workers.adapters.repair import repair_mesh
 from app.workers.adapters.photogrammetry import reconstruct_from_images
+from app.workers.adapters.preprocess import preprocess_images
+from app.workers.ingest import ingest_archives, ingest_inputs
 
 def _db() -> Session:
     return SessionLocal()
 
-def _mark_failed(job, err: str, db: Session):
-    job.status = "failed"
-    job.error = err
-    job.updated_at = dt.datetime.now(dt.timezone.utc)
-    db.commit()
+@contextmanager
+def _stage(timings: dict, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[f"{name}_ms"] = round((time.perf_counter() - started) * 1000)
 
 @celery_app.task(name="app.workers.tasks.ai_generate_task")
 def ai_generate_task(job_id: str):
-    db = _db()
-    job = db.get(AIJob, job_id)
+    """Modal stage, on the threads worker: generate, park the raw mesh in S3, hand off to ai_finalize_task."""
+    reporter = ProgressReporter("ai", AIJob, job_id)
+    job = reporter.transition("running", 5, load=[AIJob.settings_json])
     if not job:
         return
     try:
-        job.status = "running"; job.progress = 5; db.commit()
-
         with tempfile.TemporaryDirectory() as td:
             td = Path(td)
-            img_path = td / "out.png"
             glb_raw = td / "raw.glb"
-            glb_fixed = td / "fixed.glb"
 
             settings_json = job.settings_json or {}
-            image_base64 = settings_json.get("image_base64")
-            image_filename = settings_json.get("image_filename") or "upload.png"
-            image_mime = settings_json.get("image_mime")
+            image_key = settings_json.get("image_key")
+            image_filename = Path(settings_json.get("image_filename") or "upload.png").name
 
-            if image_base64:
+            if image_key:
                 img_path = td / image_filename
-                img_path.write_bytes(base64.b64decode(image_base64))
-                job.progress = 20; db.commit()
+                s3.download_file(settings.s3_bucket_job_outputs, image_key, str(img_path))
+                reporter.progress(20)
                 image_to_3d(img_path, glb_raw)
-                job.progress = 60; db.commit()
             else:
                 prompt_to_3d(job.prompt, glb_raw)
-                job.progress = 60; db.commit()
 
-            if image_base64:
-                if not image_mime:
-                    image_mime, _ = mimetypes.guess_type(img_path.name)
-                image_mime = image_mime or "image/png"
+            raw_key = f"{job.user_id}/{job.id}/outputs/raw.glb"
+            s3.upload_files(settings.s3_bucket_job_outputs, [Upload(str(glb_raw), raw_key, "model/gltf-binary")])
+        reporter.progress(60)
+        ai_finalize_task.delay(job_id, raw_key, image_key)
+    except Exception as e:
+        reporter.transition("failed", error=str(e))
 
-                out_key_img = f"{job.user_id}/{job.id}/outputs/{img_path.name}"
-                s3.upload_file(str(img_path), settings.s3_bucket_job_outputs, out_key_img, content_type=image_mime)
-                job.output_image_key = out_key_img
-                job.preview_keys = [out_key_img]
-            else:
-                job.preview_keys = []
+@celery_app.task(name="app.workers.tasks.ai_finalize_task")
+def ai_finalize_task(job_id: str, raw_key: str, image_key: str | None = None):
+    """CPU stage, on the prefork worker: repair the generated mesh and publish it."""
+    reporter = ProgressReporter("ai", AIJob, job_id)
+    job = reporter.transition("running", 65)
+    if not job:
+        return
+    try:
+        with tempfile.TemporaryDirectory() as td:
+            td = Path(td)
+            glb_raw = td / "raw.glb"
+            glb_fixed = td / "fixed.glb"
+            s3.download_file(settings.s3_bucket_job_outputs, raw_key, str(glb_raw))
 
             repair_mesh(glb_raw, glb_fixed)
-            job.progress = 80; db.commit()
+            reporter.progress(80)
 
-            # Upload outputs
             out_key_glb = f"{job.user_id}/{job.id}/outputs/model.glb"
-            s3.upload_file(str(glb_fixed), settings.s3_bucket_job_outputs, out_key_glb, content_type="model/gltf-binary")
-
-            job.output_glb_key = out_key_glb
-            if not job.preview_keys:
-                job.preview_keys = [out_key_glb]
-            job.status = "succeeded"; job.progress = 100
-            job.updated_at = dt.datetime.now(dt.timezone.utc)
-            db.commit()
+            s3.upload_files(settings.s3_bucket_job_outputs, [Upload(str(glb_fixed), out_key_glb, "model/gltf-binary")])
+
+            # The input image already lives in the outputs bucket; reference it instead of re-uploading.
+            reporter.transition(
+                "succeeded", 100, output_glb_key=out_key_glb, output_image_key=image_key,
+                preview_keys=[image_key] if image_key else [out_key_glb],
+            )
     except Exception as e:
-        _mark_failed(job, str(e), db)
-    finally:
-        db.close()
+        reporter.transition("failed", error=str(e))
 
 @celery_app.task(name="app.workers.tasks.scan_reconstruct_task")
 def scan_reconstruct_task(job_id: str):
-    db = _db()
-    job = db.get(ScanJob, job_id)
+    reporter = ProgressReporter("scan", ScanJob, job_id)
+    job = reporter.transition("running", 5, load=[ScanJob.input_keys])
     if not job:
         return
+    # Stage timings land in the job's metadata with the terminal transition, failed runs included.
+    timings: dict = {}
+    metadata = dict(job.job_metadata or {})
     try:
-        job.status = "running"; job.progress = 5; db.commit()
         with tempfile.TemporaryDirectory() as td:
             td = Path(td)
-            inputs = td / "inputs"; inputs.mkdir(parents=True, exist_ok=True)
+            inputs = td / "inputs"
+            frames = td / "frames"
+            manifest_path = td / "manifest.json"
             out_glb = td / "scan.glb"
             out_fixed = td / "scan_fixed.glb"
 
-            # NOTE: placeholder doesn't download from S3 to save time/bandwidth.
-            # In a real pipeline, download the input images (keys) to inputs/ then run reconstruction.
-            reconstruct_from_images(inputs, out_glb)
-            job.progress = 70; db.commit()
+            ingest = ingest_archives if metadata.get("kind") == "zip" else ingest_inputs
+            with _stage(timings, "ingest"):
+                stats = ingest(settings.s3_bucket_scans_raw, list(job.input_keys or []), inputs)
+            metadata["ingest"] = stats.as_metrics()
+            reporter.progress(30)
+
+            with _stage(timings, "preprocess"):
+                manifest = preprocess_images(inputs, frames)
+            manifest_path.write_bytes(orjson.dumps(manifest))
+            out_key_manifest = f"{job.user_id}/{job.id}/outputs/manifest.json"
+            metadata["preprocess"] = {"kept": len(manifest["kept"]), "rejected": len(manifest["rejected"]),
+                                      "manifest_key": out_key_manifest}
+            reporter.progress(45)
 
-            repair_mesh(out_glb, out_fixed)
-            job.progress = 85; db.commit()
+            with _stage(timings, "reconstruct"):
+                reconstruct_from_images(frames, out_glb)
+            reporter.progress(70)
+
+            with _stage(timings, "repair"):
+                metadata["repair"] = repair_mesh(out_glb, out_fixed)
+            reporter.progress(85)
 
             out_key_glb = f"{job.user_id}/{job.id}/outputs/scan.glb"
-            s3.upload_file(str(out_fixed), settings.s3_bucket_job_outputs, out_key_glb, content_type="model/gltf-binary")
-            job.output_glb_key = out_key_glb
-            job.preview_keys = [out_key_glb]
-            job.status = "succeeded"; job.progress = 100
-            job.updated_at = dt.datetime.now(dt.timezone.utc)
-            db.commit()
+            with _stage(timings, "upload"):
+                s3.upload_files(settings.s3_bucket_job_outputs, [
+                    Upload(str(out_fixed), out_key_glb, "model/gltf-binary"),
+                    Upload(str(manifest_path), out_key_manifest, "application/json"),
+                ])
+            reporter.transition("succeeded", 100, output_glb_key=out_key_glb, preview_keys=[out_key_glb],
+                                job_metadata={**metadata, "timings": timings})
     except Exception as e:
-        _mark_failed(job, str(e), db)
+        reporter.transition("failed", error=str(e), job_metadata={**metadata, "timings": timings})
+
+@celery_app.task(name="app.workers.tasks.flush_view_counters_task")
+def flush_view_counters_task():
+    db = _db()
+    try:
+        return flush_view_counters(db)
+    finally:
+        db.close()
+
+@celery_app.task(name="app.workers.tasks.flush_recently_viewed_task")
+def flush_recently_viewed_task():
+    db = _db()
+    try:
+        return flush_recently_viewed(db)
+    finally:
+        db.close()
+
+@celery_app.task(name="app.workers.tasks.reconcile_counters_task")
+def reconcile_counters_task():
+    db = _db()
+    try:
+        reconcile_counters(db)
+    finally:
+        db.close()
+
+@celery_app.task(name="app.workers.tasks.rebuild_user_stats_task")
+def rebuild_user_stats_task():
+    db = _db()
+    try:
+        rebuild_user_stats(db, settings.user_stats_rebuild_days)
     finally:
         db.close()
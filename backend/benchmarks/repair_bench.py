@@ -0,0 +1,66 @@
+"""Benchmark: repair_mesh on synthetic scan-like meshes of increasing size.
+
+Each mesh is a torus delivered as triangle soup (every face owning its three vertices, like STL
+or per-face scan exports), with 1% duplicate faces, 1% degenerate faces and small holes punched
+by deleting faces. Reports wall time, peak traced memory (NumPy allocations included) and what
+the repair changed:
+
+    python benchmarks/repair_bench.py --faces 100000,1000000,4000000
+"""
+from __future__ import annotations
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.workers.adapters.repair import repair_mesh, write_triangle_mesh
+
+MIB = 1024 * 1024
+
+def torus(faces: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    n = max(3, int(np.sqrt(faces / 2)))
+    u, v = np.meshgrid(np.linspace(0, 2 * np.pi, n, endpoint=False), np.linspace(0, 2 * np.pi, n, endpoint=False), indexing="ij")
+    grid = np.stack([(2 + np.cos(v)) * np.cos(u), (2 + np.cos(v)) * np.sin(u), np.sin(v)], axis=-1).reshape(-1, 3)
+    i, j = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    a, b = i * n + j, ((i + 1) % n) * n + j
+    c, d = ((i + 1) % n) * n + (j + 1) % n, i * n + (j + 1) % n
+    tris = np.concatenate([np.stack([a, b, c], -1).reshape(-1, 3), np.stack([a, c, d], -1).reshape(-1, 3)])
+    holes = rng.choice(len(tris), size=max(1, len(tris) // 5000), replace=False)
+    tris = np.delete(tris, holes, axis=0)
+    dupes = tris[rng.choice(len(tris), size=len(tris) // 100)]
+    degenerate = tris[rng.choice(len(tris), size=len(tris) // 100)].copy()
+    degenerate[:, 2] = degenerate[:, 1]
+    tris = np.concatenate([tris, dupes, degenerate])
+    positions = grid.astype(np.float32)[tris].reshape(-1, 3)
+    return positions, np.arange(len(positions), dtype=np.uint32).reshape(-1, 3)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", default="100000,1000000,4000000", help="comma-separated target face counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as td:
+        src, dst = Path(td) / "in.glb", Path(td) / "out.glb"
+        for target in (int(f) for f in args.faces.split(",")):
+            positions, faces = torus(target, rng)
+            write_triangle_mesh(src, positions, faces)
+            size = src.stat().st_size
+            del positions, faces
+            tracemalloc.start()
+            started = time.perf_counter()
+            stats = repair_mesh(src, dst)
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{stats['faces_in']:>10,} faces  {size / MIB:7.1f} MiB in  {seconds:6.2f} s  peak {peak / MIB:7.1f} MiB  "
+                  f"verts {stats['vertices_in']:,} -> {stats['vertices_out']:,}  dup {stats['duplicates_removed']:,}  "
+                  f"degenerate {stats['degenerate_removed']:,}  holes {stats['holes_filled']:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: per-file boto3 upload_file (default TransferConfig, one after another) vs. the shared
+transfer manager in app.services.s3 uploading a job's outputs concurrently.
+
+For each size, writes --files random files of that size and uploads them both ways to a scratch
+bucket, reporting wall time and aggregate throughput. Point it at the compose MinIO or a moto
+stand-in:
+
+    S3_ENDPOINT_URL=http://localhost:9000 python benchmarks/s3_transfer_bench.py --sizes 1,16,128,1024
+    moto_server -p 5000 &  S3_ENDPOINT_URL=http://localhost:5000 python benchmarks/s3_transfer_bench.py
+
+Sizes are MiB. The bucket is emptied and removed afterwards unless --keep is given.
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+import boto3
+from botocore.client import Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.s3 import S3Client, Upload
+
+BUCKET = "bench-transfer"
+MIB = 1024 * 1024
+
+def write_random(path: Path, size: int) -> None:
+    with path.open("wb") as fh:
+        remaining = size
+        while remaining:
+            chunk = min(remaining, 8 * MIB)
+            fh.write(os.urandom(chunk))
+            remaining -= chunk
+
+def baseline_client():
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.s3_endpoint_url,
+        aws_access_key_id=settings.s3_access_key,
+        aws_secret_access_key=settings.s3_secret_key,
+        region_name=settings.s3_region,
+        config=Config(signature_version="s3v4"),
+    )
+
+def run_baseline(paths: list[Path], prefix: str) -> float:
+    started = time.perf_counter()
+    for path in paths:
+        baseline_client().upload_file(str(path), BUCKET, f"{prefix}/baseline/{path.name}")
+    return time.perf_counter() - started
+
+def run_shared(client: S3Client, paths: list[Path], prefix: str) -> float:
+    started = time.perf_counter()
+    client.upload_files(BUCKET, [Upload(str(p), f"{prefix}/shared/{p.name}", "model/gltf-binary") for p in paths])
+    return time.perf_counter() - started
+
+def report(label: str, seconds: float, total: int) -> None:
+    print(f"  {label:<9} {seconds:8.2f} s   {total / MIB / seconds:9.1f} MiB/s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,16,128,1024", help="comma-separated file sizes in MiB")
+    parser.add_argument("--files", type=int, default=3, help="files per job (glb, stl, image, ...)")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+    client = S3Client()
+    raw = client.client
+    try:
+        raw.create_bucket(Bucket=BUCKET)
+    except raw.exceptions.BucketAlreadyOwnedByYou:
+        pass
+    cfg = client.transfer_config
+    print(f"threshold={cfg.multipart_threshold // MIB} MiB chunk={cfg.multipart_chunksize // MIB} MiB "
+          f"max_concurrency={cfg.max_concurrency} files/job={args.files}")
+    try:
+        with tempfile.TemporaryDirectory() as td:
+            for size_mib in (int(s) for s in args.sizes.split(",")):
+                paths = [Path(td) / f"{size_mib}m-{i}.bin" for i in range(args.files)]
+                for path in paths:
+                    write_random(path, size_mib * MIB)
+                total = size_mib * MIB * args.files
+                print(f"{size_mib} MiB x {args.files}")
+                report("baseline", run_baseline(paths, f"{size_mib}m"), total)
+                report("shared", run_shared(client, paths, f"{size_mib}m"), total)
+                for path in paths:
+                    path.unlink()
+    finally:
+        if not args.keep:
+            for page in raw.get_paginator("list_objects_v2").paginate(Bucket=BUCKET):
+                keys = [{"Key": o["Key"]} for o in page.get("Contents", [])]
+                if keys:
+                    raw.delete_objects(Bucket=BUCKET, Delete={"Objects": keys})
+            raw.delete_bucket(Bucket=BUCKET)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,10 @@
 #!/usr/bin/env bash
 set -euo pipefail
 alembic upgrade head
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+# Shared by all uvicorn workers (WEB_CONCURRENCY) so /metrics aggregates across processes;
+# wiped on start so samples from previous containers' pids don't linger.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/r2v-metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+# RequestIDMiddleware logs every request without its query string; uvicorn's access log would
+# repeat it with ?stream_token= included.
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --no-access-log
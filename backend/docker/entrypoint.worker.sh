@@ -0,0 +1,7 @@
+#!/usr/bin/env bash
+set -euo pipefail
+# Wiped on start so samples from a previous run's pids don't linger; the child processes that
+# Celery forks inherit the variable and write their own files here.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/r2v-metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+exec "$@"
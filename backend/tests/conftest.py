@@ -0,0 +1,54 @@
+import sys
+
+import fakeredis
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import redis_client
+
+class Result:
+    """The parts of a SQLAlchemy Result the services read, over a fixed list of rows (or scalars)."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+    def scalar_one(self):
+        [value] = self.rows
+        return value
+
+class FakeSession:
+    """Stands in for a Session (or a flush's Connection): keeps every statement as compiled for
+    PostgreSQL with its parameters, counts commits, and answers queries through ``answer``."""
+
+    def __init__(self, answer=None, fail_on_execute=False):
+        self.answer, self.fail_on_execute = answer, fail_on_execute
+        self.executed, self.commits = [], 0
+
+    def execute(self, stmt, params=None):
+        if self.fail_on_execute:
+            raise RuntimeError("db down")
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        self.executed.append((compiled.string, compiled.params if params is None else params))
+        return self.answer(stmt) if self.answer else None
+
+    def commit(self):
+        self.commits += 1
+
+@pytest.fixture
+def r(monkeypatch):
+    """A fakeredis client behind get_redis_sync in every app module that imported it."""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    real = redis_client.get_redis_sync
+    for module in list(sys.modules.values()):
+        if getattr(module, "get_redis_sync", None) is real:
+            monkeypatch.setattr(module, "get_redis_sync", lambda: client)
+    return client
@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from fastapi import Depends, FastAPI
 from app.main import app
 
 client = TestClient(app)
@@ -7,3 +8,41 @@ def test_health():
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json()["ok"] is True
+
+def test_principal_routes_skip_db_on_cache_hit():
+    import uuid
+    from app.core.security import create_access_token
+    from app.services import principals
+
+    user_id = uuid.uuid4()
+    principals._local.put(user_id, {"role": "user", "is_active": True})
+    headers = {"Authorization": f"Bearer {create_access_token(str(user_id), 'user')}"}
+    r = client.post("/marketplace/assets/presign", json={"filename": "a.glb"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["key"].startswith(f"{user_id}/marketplace/model/")
+
+def test_missing_token_is_rejected():
+    assert client.post("/marketplace/assets/presign", json={"filename": "a.glb"}).status_code == 401
+
+def test_stream_token_only_opens_its_own_job():
+    import uuid
+    from app.api.deps import get_stream_principal
+    from app.core.security import create_access_token, create_stream_token
+    from app.services import principals
+
+    user_id, job_id = uuid.uuid4(), str(uuid.uuid4())
+    principals._local.put(user_id, {"role": "user", "is_active": True})
+    probe = FastAPI()
+
+    @probe.get("/jobs/{job_id}/events")
+    async def events(job_id: str, user = Depends(get_stream_principal)):
+        return {"user": str(user.id)}
+
+    stream = TestClient(probe)
+    token = create_stream_token(str(user_id), "user", job_id)
+    r = stream.get(f"/jobs/{job_id}/events", params={"stream_token": token})
+    assert r.status_code == 200 and r.json() == {"user": str(user_id)}
+    assert stream.get(f"/jobs/{uuid.uuid4()}/events", params={"stream_token": token}).status_code == 401
+    # A full access token is not accepted in the URL.
+    assert stream.get(f"/jobs/{job_id}/events", params={"stream_token": create_access_token(str(user_id), "user")}).status_code == 401
+    assert stream.get(f"/jobs/{job_id}/events").status_code == 401
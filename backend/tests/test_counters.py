@@ -0,0 +1,64 @@
+import uuid
+
+import pytest
+
+from app.db.models.marketplace import Asset
+from app.services import counters
+from app.services.redis_client import drain_hash
+from conftest import FakeSession
+
+def test_bump_clamps_at_zero_without_loading_the_row():
+    db = FakeSession()
+    counters.bump(db, Asset, uuid.uuid4(), like_count=-1, save_count=2)
+    [(sql, _)] = db.executed
+    assert sql.startswith("UPDATE assets SET")
+    assert "like_count=greatest(assets.like_count + %(like_count_1)s" in sql.replace(" = ", "=")
+    assert "save_count=greatest(assets.save_count" in sql.replace(" = ", "=")
+
+def test_views_are_buffered_then_flushed_in_one_batch(r):
+    a, b = uuid.uuid4(), uuid.uuid4()
+    db = FakeSession()
+    for asset_id in (a, a, b):
+        counters.record_asset_view(db, asset_id)
+    assert db.executed == [] and r.hgetall(counters.ASSET_VIEWS_KEY) == {str(a): "2", str(b): "1"}
+
+    assert counters.flush_view_counters(db) == 2
+    [(sql, params)] = db.executed
+    assert "view_count=(assets.view_count + %(b_delta)s" in sql.replace(" = ", "=")
+    assert sorted((p["b_id"], p["b_delta"]) for p in params) == sorted([(a, 2), (b, 1)])
+    assert db.commits == 1
+    assert not r.exists(counters.ASSET_VIEWS_KEY, counters.ASSET_VIEWS_FLUSHING_KEY)
+
+def test_failed_flush_is_retried_before_new_views(r):
+    a, b = uuid.uuid4(), uuid.uuid4()
+    counters.record_asset_view(FakeSession(), a)
+    with pytest.raises(RuntimeError):
+        counters.flush_view_counters(FakeSession(fail_on_execute=True))
+    assert r.hgetall(counters.ASSET_VIEWS_FLUSHING_KEY) == {str(a): "1"}
+
+    counters.record_asset_view(FakeSession(), b)
+    db = FakeSession()
+    assert counters.flush_view_counters(db) == 2
+    assert [[p["b_id"] for p in params] for _, params in db.executed] == [[a], [b]]
+
+def test_view_writes_through_when_redis_is_down(monkeypatch):
+    def down():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(counters, "get_redis_sync", down)
+    db = FakeSession()
+    counters.record_asset_view(db, uuid.uuid4())
+    [(sql, _)] = db.executed
+    assert "view_count=greatest(assets.view_count" in sql.replace(" = ", "=") and db.commits == 1
+
+def test_concurrent_drains_apply_a_batch_once(r):
+    a = uuid.uuid4()
+    counters.record_asset_view(FakeSession(), a)
+    inner = []
+
+    def apply(pending):
+        # A second flush (next beat tick, another worker) starts while this one is applying.
+        inner.append(drain_hash(r, counters.ASSET_VIEWS_KEY, counters.ASSET_VIEWS_FLUSHING_KEY, lambda p: pytest.fail("applied twice")))
+
+    assert drain_hash(r, counters.ASSET_VIEWS_KEY, counters.ASSET_VIEWS_FLUSHING_KEY, apply) == 1
+    assert inner == [0]
+    assert not r.keys("counters:*")  # batch and lock both gone
@@ -0,0 +1,25 @@
+import uuid
+
+from app.db.models.marketplace import Asset
+from app.services import entitlements
+
+def _asset(visibility="published", is_paid=True):
+    return Asset(id=uuid.uuid4(), visibility=visibility, is_paid=is_paid)
+
+def test_batch_resolves_page_from_one_state_lookup(monkeypatch):
+    owned, other, free, draft = _asset(), _asset(), _asset(is_paid=False), _asset(visibility="draft")
+    calls = []
+    def fake_state(db, user_id):
+        calls.append(user_id)
+        return {"subscribed": False, "purchased": {str(owned.id)}}
+    monkeypatch.setattr(entitlements, "entitlement_state", fake_state)
+    result = entitlements.is_entitled_many(None, "u1", [owned, other, free, draft])
+    assert result == {owned.id: True, other.id: False, free.id: True, draft.id: False}
+    assert calls == ["u1"]
+
+def test_free_pages_skip_state_lookup(monkeypatch):
+    def fail(db, user_id):
+        raise AssertionError("state lookup for a page without paid assets")
+    monkeypatch.setattr(entitlements, "entitlement_state", fail)
+    free = _asset(is_paid=False)
+    assert entitlements.is_entitled_many(None, "u1", [free]) == {free.id: True}
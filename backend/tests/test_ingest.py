@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.workers import ingest
+
+class _Body(io.BytesIO):
+    def iter_chunks(self, size):
+        while chunk := self.read(size):
+            yield chunk
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = []
+
+    def head_object(self, Bucket, Key):
+        data = self.objects[Key]
+        return {"ETag": f'"{hashlib.md5(data).hexdigest()}"', "ContentLength": len(data)}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        start, _, end = Range.removeprefix("bytes=").partition("-")
+        start, end = int(start), int(end) + 1 if end else None
+        self.gets.append((Key, start))
+        return {"Body": _Body(self.objects[Key][start:end])}
+
+@pytest.fixture
+def fake_s3(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "scan_input_cache_dir", str(tmp_path / "cache"))
+    client = FakeS3({"u/j/inputs/a.jpg": b"a" * 5000, "u/j/inputs/b.jpg": b"b" * 3000, "u/k/inputs/a.jpg": b"a" * 5000})
+    monkeypatch.setattr(ingest, "s3", SimpleNamespace(client=client))
+    return client
+
+def test_repeated_content_is_served_from_cache(fake_s3, tmp_path):
+    stats = ingest.ingest_inputs("raw", ["u/j/inputs/a.jpg", "u/j/inputs/b.jpg"], tmp_path / "run1")
+    assert [p.name for p in stats.paths] == ["0000_a.jpg", "0001_b.jpg"]
+    assert stats.paths[1].read_bytes() == b"b" * 3000
+    assert stats.as_metrics() == {"files": 2, "cache_hits": 0, "resumed": 0, "skipped": 0, "bytes_downloaded": 8000}
+
+    # Same photo under another job's key: no GET at all.
+    fake_s3.gets.clear()
+    stats = ingest.ingest_inputs("raw", ["u/k/inputs/a.jpg"], tmp_path / "run2")
+    assert fake_s3.gets == [] and stats.cache_hits == 1
+    assert stats.paths[0].read_bytes() == b"a" * 5000
+
+def test_partial_download_resumes_from_offset(fake_s3, tmp_path):
+    head = fake_s3.head_object("raw", "u/j/inputs/a.jpg")
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / (ingest._content_id(head) + ".part")).write_bytes(b"a" * 1200)
+    stats = ingest.ingest_inputs("raw", ["u/j/inputs/a.jpg"], tmp_path / "run")
+    assert fake_s3.gets == [("u/j/inputs/a.jpg", 1200)]
+    assert stats.resumed == 1 and stats.bytes_downloaded == 3800
+    assert stats.paths[0].read_bytes() == b"a" * 5000
+
+def test_cache_evicts_least_recently_used(fake_s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "scan_input_cache_max_bytes", 6000)
+    ingest.ingest_inputs("raw", ["u/j/inputs/a.jpg", "u/j/inputs/b.jpg"], tmp_path / "run")
+    assert sum(p.stat().st_size for p in (tmp_path / "cache").iterdir()) <= 6000
+
+def _zip(members, compression=zipfile.ZIP_STORED):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+def test_archive_streams_only_image_members(fake_s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "scan_zip_read_bytes", 64 * 1024)
+    photos = {"set/IMG_1.JPG": os.urandom(2_000_000), "notes.txt": b"hi", "__MACOSX/set/._IMG_1.JPG": b"x", "set/IMG_2.png": b"2" * 500}
+    fake_s3.objects["u/j/inputs/photos.zip"] = archive = _zip(photos)
+    stats = ingest.ingest_archives("raw", ["u/j/inputs/photos.zip"], tmp_path / "in")
+    assert [p.name for p in stats.paths] == ["0000_IMG_1.JPG", "0001_IMG_2.png"]
+    assert stats.paths[0].read_bytes() == photos["set/IMG_1.JPG"]
+    assert stats.skipped == 2
+    # One pass over the object plus the end-of-archive probe.
+    assert stats.bytes_downloaded < len(archive) * 1.05
+
+@pytest.mark.parametrize("setting,value,message", [
+    ("scan_zip_max_ratio", 50, "compression ratio"),
+    ("max_upload_bytes", 1000, "exceeds 1000 bytes"),
+    ("scan_zip_max_members", 1, "more than 1 members"),
+])
+def test_bomb_like_archives_are_rejected_before_extraction(fake_s3, tmp_path, monkeypatch, setting, value, message):
+    monkeypatch.setattr(settings, setting, value)
+    fake_s3.objects["u/j/inputs/bomb.zip"] = _zip({"a.jpg": b"\0" * 200_000, "b.jpg": b"\0" * 10}, zipfile.ZIP_DEFLATED)
+    with pytest.raises(ingest.ArchiveRejected, match=message):
+        ingest.ingest_archives("raw", ["u/j/inputs/bomb.zip"], tmp_path / "in")
+    assert not any((tmp_path / "in").iterdir())
+
+def test_entry_evicted_while_placing_is_fetched_again(fake_s3, tmp_path, monkeypatch):
+    ingest.ingest_inputs("raw", ["u/j/inputs/a.jpg"], tmp_path / "run1")
+    place, evicted = ingest._place, []
+
+    def evict_then_place(cached, dest):
+        if not evicted:  # another job's prune_cache wins the race once
+            evicted.append(cached)
+            cached.unlink()
+        place(cached, dest)
+
+    monkeypatch.setattr(ingest, "_place", evict_then_place)
+    fake_s3.gets.clear()
+    stats = ingest.ingest_inputs("raw", ["u/k/inputs/a.jpg"], tmp_path / "run2")
+    assert evicted and fake_s3.gets == [("u/k/inputs/a.jpg", 0)]
+    assert stats.paths[0].read_bytes() == b"a" * 5000
+
+def test_waiter_on_finished_entry_leaves_no_part_file(fake_s3, tmp_path):
+    ingest.ingest_inputs("raw", ["u/j/inputs/a.jpg"], tmp_path / "run1")
+    head = fake_s3.head_object("raw", "u/k/inputs/a.jpg")
+    cached = tmp_path / "cache" / ingest._content_id(head)
+    # As if this job had queued on the lock while another finished the download.
+    fetched = ingest._fetch_into_cache("raw", "u/k/inputs/a.jpg", head, cached, tmp_path / "a.jpg")
+    assert fetched.cache_hit and (tmp_path / "a.jpg").read_bytes() == b"a" * 5000
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == [cached.name]
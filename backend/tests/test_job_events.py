@@ -0,0 +1,88 @@
+import asyncio
+import types
+import uuid
+
+import fakeredis
+import orjson
+
+from app.services import job_events, job_progress
+from app.services.job_events import JobEventHub, channel, job_event
+from app.services.job_progress import ProgressReporter, live_progress, progress_key
+from conftest import FakeSession
+
+def _job(status, progress):
+    return types.SimpleNamespace(id=uuid.UUID(int=7), status=status, progress=progress, error=None,
+                                 output_glb_key=None, preview_keys=[])
+
+def test_hub_fans_out_one_subscription_to_every_listener(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(job_events, "get_redis_pubsub", lambda: fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    hub = JobEventHub()
+    name = channel("ai", uuid.UUID(int=7))
+
+    async def run():
+        async with hub.subscribe(name) as first, hub.subscribe(name) as second:
+            assert hub.ready.is_set()
+            await fakeredis.FakeAsyncRedis(server=server).publish(name, orjson.dumps(job_event(_job("running", 40))))
+            got = [await asyncio.wait_for(q.get(), 2) for q in (first, second)]
+        assert name not in hub._subscribers
+        return got
+
+    got = asyncio.run(run())
+    assert [orjson.loads(data)["progress"] for data in got] == [40, 40]
+
+def test_live_progress_overlays_only_unfinished_jobs(monkeypatch):
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(job_progress, "get_redis_sync", lambda: r)
+    running, done = _job("running", 5), _job("succeeded", 100)
+    done.id = uuid.UUID(int=8)
+    r.set(progress_key("ai", running.id), 60)
+    r.set(progress_key("ai", done.id), 80)
+    assert live_progress("ai", [running, done]) == {running.id: 60}
+
+def test_live_progress_tolerates_redis_outage(monkeypatch):
+    def broken():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(job_progress, "get_redis_sync", broken)
+    assert live_progress("scan", [_job("running", 10)]) == {}
+
+class _JobSession(FakeSession):
+    """SessionLocal() for ProgressReporter.transition: hands out one job and counts commits."""
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get(self, model, job_id, options=()):
+        return self.job
+
+def test_progress_reporter_persists_only_transitions(monkeypatch, r):
+    job = _job("queued", 0)
+    db = _JobSession(job)
+    monkeypatch.setattr(job_progress, "SessionLocal", lambda **kw: db)
+    events = r.pubsub(ignore_subscribe_messages=True)
+    events.subscribe(channel("ai", job.id))
+    reporter = ProgressReporter("ai", object, job.id)
+
+    reporter.transition("running", 5)
+    for pct in (20, 40, 60):
+        reporter.progress(pct)
+    assert db.commits == 1 and job.progress == 5
+    assert r.get(progress_key("ai", job.id)) == "60"
+
+    reporter.transition("succeeded", 100)
+    assert db.commits == 2 and job.status == "succeeded"
+    assert not r.exists(progress_key("ai", job.id))
+    messages = [events.get_message(timeout=0) for _ in range(10)]
+    published = [orjson.loads(m["data"])["progress"] for m in messages if m]
+    assert published == [5, 20, 40, 60, 100]
+
+def test_progress_before_the_first_transition_is_dropped(r):
+    ProgressReporter("scan", object, uuid.UUID(int=7)).progress(50)
+    assert r.keys() == []
@@ -0,0 +1,24 @@
+from __future__ import annotations
+import uuid
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import load_only
+from app.api.routers import ai_jobs, scan_jobs
+from app.db.models.jobs import AIJob, ScanJob
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+def test_list_queries_skip_heavy_columns():
+    for model, columns, heavy in (
+        (AIJob, ai_jobs.SUMMARY_COLUMNS, ("settings_json", "logs", "timings", "metadata")),
+        (ScanJob, scan_jobs.SUMMARY_COLUMNS, ("input_keys", "logs", "metadata")),
+    ):
+        sql = _sql(select(model).options(load_only(*columns)).where(model.user_id == uuid.uuid4()))
+        for name in heavy:
+            assert f".{name}" not in sql
+
+def test_detail_load_defers_payload_columns_by_default():
+    sql = _sql(select(AIJob))
+    assert "settings_json" not in sql and "logs" not in sql
+    assert "output_glb_key" in sql
@@ -0,0 +1,68 @@
+import logging
+import os
+import subprocess
+import sys
+
+import orjson
+
+from app.core.logging import ContextFilter, JsonFormatter, RequestSampler, request_id_var
+from app.workers import celery_app
+
+def _record(msg="request", level=logging.INFO, **extra):
+    record = logging.LogRecord("app.main", level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_lines_keep_extra_fields_and_context_request_id():
+    token = request_id_var.set("req-1")
+    try:
+        record = _record(status_code=200, duration_ms=1.5)
+        ContextFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+    entry = orjson.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "request"
+    assert entry["request_id"] == "req-1"
+    assert entry["status_code"] == 200 and entry["duration_ms"] == 1.5
+
+def test_sampler_drops_routine_requests_but_keeps_errors_and_slow_ones():
+    sampler = RequestSampler(rate=0.0, slow_ms=500)
+    assert not sampler.filter(_record(status_code=200, duration_ms=3))
+    assert sampler.filter(_record(status_code=500, duration_ms=3))
+    assert sampler.filter(_record(status_code=200, duration_ms=800))
+    assert sampler.filter(_record(msg="something else"))
+
+def test_request_id_travels_with_celery_tasks():
+    headers = {}
+    token = request_id_var.set("req-2")
+    try:
+        celery_app._propagate_request_id(headers=headers)
+    finally:
+        request_id_var.reset(token)
+    assert headers == {"request_id": "req-2"}
+
+    class Task:
+        class request:
+            request_id = "req-2"
+            headers = None
+    celery_app._bind_request_id(task=Task)
+    assert request_id_var.get() == "req-2"
+    celery_app._unbind_request_id(task=Task)
+    assert request_id_var.get() is None
+
+FORKED_CHILD_LOGS = """
+import logging, os, sys
+from app.core.logging import configure_logging
+configure_logging()
+logging.getLogger("app.parent").warning("from parent")
+pid = os.fork()
+if pid == 0:  # a prefork worker child
+    logging.getLogger("app.child").warning("from child")
+    sys.exit(0)  # atexit drains the child's listener
+os.waitpid(pid, 0)
+"""
+
+def test_forked_children_get_their_own_listener():
+    env = {**os.environ, "LOG_FORMAT": "text"}
+    out = subprocess.run([sys.executable, "-c", FORKED_CHILD_LOGS], env=env, capture_output=True, text=True, timeout=30).stdout
+    assert out.count("from parent") == 1 and "from child" in out
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.main import app
+
+def test_request_id_echoed_and_latency_recorded_by_route():
+    client = TestClient(app)
+    resp = client.get("/health", headers={"x-request-id": "req-123"})
+    assert resp.status_code == 200
+    assert resp.headers["x-request-id"] == "req-123"
+    assert client.get("/health").headers["x-request-id"]
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'http_response_size_bytes_bucket{le="128.0",method="GET",route="/health"}' in body
+
+def test_exited_process_live_gauges_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    for name in ("gauge_livesum_41.db", "gauge_livesum_42.db", "histogram_41.db"):
+        (tmp_path / name).write_bytes(b"")
+    metrics.mark_process_dead(41)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gauge_livesum_42.db", "histogram_41.db"]
+
+CHILD_TRANSFER = """
+import os
+from app.core.metrics import collector_registry, observe_transfer
+from prometheus_client import generate_latest
+pid = os.fork()
+if pid == 0:  # a prefork child running a task
+    observe_transfer("download", 4096, 0.5)
+    os._exit(0)
+os.waitpid(pid, 0)
+print(generate_latest(collector_registry()).decode())
+"""
+
+def test_transfers_recorded_in_worker_children_reach_the_main_process(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    out = subprocess.run([sys.executable, "-c", CHILD_TRANSFER], env=env, capture_output=True, text=True, check=True).stdout
+    assert 's3_transfer_bytes_total{direction="download"} 4096.0' in out
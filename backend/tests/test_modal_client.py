@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.workers.adapters.modal_client import ArtifactError, ModalClient, TruncatedArtifact, backoff_delays
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(settings, "modal_download_retry_s", 0.0)
+
+def _client(handler) -> ModalClient:
+    client = ModalClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def test_backoff_is_jittered_and_capped():
+    delays = list(backoff_delays(8, base_s=1.0, cap_s=10.0))
+    assert len(delays) == 8
+    assert all(0 <= d <= min(10.0, 2 ** n) for n, d in enumerate(delays))
+
+def test_submit_retries_only_unaccepted_requests(monkeypatch):
+    monkeypatch.setattr(settings, "modal_submit_attempts", 3)
+    statuses = iter([503, 429, 200])
+    seen = []
+
+    def handler(request):
+        seen.append(request.method)
+        return httpx.Response(next(statuses), content=b"glb")
+
+    response = asyncio.run(_client(handler).submit("https://modal.test/generate", json={"prompt": "x"}))
+    assert response.status_code == 200 and seen == ["POST"] * 3
+
+    # 500 and gateway errors may come after Modal started generating: handed back, not retried.
+    for status in (500, 502, 504):
+        failures = iter([status, 200])
+        response = asyncio.run(_client(lambda r, failures=failures: httpx.Response(next(failures))).submit("https://modal.test/generate"))
+        assert response.status_code == status
+
+def test_fetch_to_streams_and_verifies_artifact(tmp_path):
+    body = b"glTF" + bytes(range(256)) * 64
+    polls = iter([404, 200])
+    client = _client(lambda r: httpx.Response(next(polls), content=body))
+    out = tmp_path / "model.glb"
+    digest = asyncio.run(client.fetch_to("https://modal.test/a.glb", out, sha256=hashlib.sha256(body).hexdigest()))
+    assert out.read_bytes() == body and digest == hashlib.sha256(body).hexdigest()
+
+    with pytest.raises(ArtifactError):
+        asyncio.run(_client(lambda r: httpx.Response(200, content=body)).fetch_to(
+            "https://modal.test/a.glb", tmp_path / "bad.glb", sha256="0" * 64))
+    assert not (tmp_path / "bad.glb").exists() and not (tmp_path / "bad.glb.part").exists()
+
+def test_fetch_to_gives_up_when_artifact_never_appears(tmp_path):
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_client(lambda r: httpx.Response(404)).fetch_to(
+            "https://modal.test/a.glb", tmp_path / "a.glb", max_attempts=3))
+
+def test_stream_to_rejects_short_body(tmp_path):
+    async def run():
+        client = _client(lambda r: httpx.Response(200, headers={"content-length": "100"}, content=b"x" * 10))
+        response = await client.client.send(client.client.build_request("GET", "https://modal.test/a"), stream=True)
+        await client.stream_to(response, tmp_path / "a.glb")
+
+    with pytest.raises(TruncatedArtifact):
+        asyncio.run(run())
@@ -0,0 +1,77 @@
+import asyncio
+from urllib.parse import urlparse
+
+import fakeredis
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.workers.adapters import model_gen
+from app.workers.adapters.modal_client import ModalClient
+
+@pytest.fixture
+def modal(monkeypatch):
+    monkeypatch.setattr(settings, "modal_api_url", "https://gpu.test")
+    monkeypatch.setattr(settings, "modal_prompt_to_3d_path", "/text-to-3d")
+    monkeypatch.setattr(settings, "modal_image_to_3d_path", "/image-to-3d")
+    monkeypatch.setattr(model_gen, "get_redis_sync", lambda r=fakeredis.FakeRedis(decode_responses=True): r)
+    monkeypatch.setattr(model_gen, "_known_endpoint", {})
+    client = ModalClient()
+    monkeypatch.setattr(model_gen, "modal", client)
+    return client
+
+def _serve(client, calls, live_path):
+    def handler(request):
+        calls.append(urlparse(str(request.url)).path)
+        if request.url.path != live_path:
+            return httpx.Response(404)
+        return httpx.Response(200, headers={"content-type": "model/gltf-binary"}, content=b"glTF")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_working_prompt_endpoint_is_remembered(modal, tmp_path):
+    calls = []
+    _serve(modal, calls, "/generate")
+    asyncio.run(model_gen.prompt_to_3d_async("a chair", tmp_path / "a.glb"))
+    assert calls == ["/text-to-3d", "/image-to-3d", "/generate-from-text", "/generate"]
+
+    calls.clear()
+    model_gen._known_endpoint.clear()  # a fresh process still finds it through Redis
+    asyncio.run(model_gen.prompt_to_3d_async("a chair", tmp_path / "b.glb"))
+    assert calls == ["/generate"]
+
+def test_stale_endpoint_is_forgotten(modal, tmp_path):
+    model_gen._remember_prompt_endpoint("https://gpu.test/generate")
+    calls = []
+    _serve(modal, calls, "/text-to-3d")
+    asyncio.run(model_gen.prompt_to_3d_async("a chair", tmp_path / "a.glb"))
+    assert calls == ["/generate", "/text-to-3d"]
+    assert model_gen._cached_prompt_endpoint() == "https://gpu.test/text-to-3d"
+
+def test_probe_reads_openapi_paths(modal):
+    schema = {"paths": {"/health": {"get": {}}, "/generate": {"post": {}}}}
+    modal._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(200, json=schema)))
+    assert asyncio.run(model_gen.probe_prompt_endpoint_async()) == "https://gpu.test/generate"
+    assert model_gen._cached_prompt_endpoint() == "https://gpu.test/generate"
+
+def test_ai_generate_hands_repair_to_the_prefork_queue(monkeypatch, tmp_path):
+    import types
+    from app.workers import tasks
+    from app.workers.celery_app import celery_app
+
+    job = types.SimpleNamespace(id="j1", user_id="u1", prompt="a chair", settings_json={})
+    reporter = types.SimpleNamespace(transition=lambda status, *a, **kw: job if status == "running" else None,
+                                     progress=lambda pct: None)
+    uploads, handoffs = [], []
+    monkeypatch.setattr(tasks, "ProgressReporter", lambda *a: reporter)
+    monkeypatch.setattr(tasks, "prompt_to_3d", lambda prompt, out: out.write_bytes(b"glTF"))
+    monkeypatch.setattr(tasks, "repair_mesh", lambda *a: pytest.fail("repair ran on the Modal worker"))
+    monkeypatch.setattr(tasks, "s3", types.SimpleNamespace(upload_files=lambda bucket, items: uploads.extend(u.key for u in items)))
+    monkeypatch.setattr(tasks.ai_finalize_task, "delay", lambda *args: handoffs.append(args))
+
+    tasks.ai_generate_task("j1")
+
+    assert uploads == ["u1/j1/outputs/raw.glb"]
+    assert handoffs == [("j1", "u1/j1/outputs/raw.glb", None)]
+    route = celery_app.amqp.router.route
+    assert route({}, tasks.ai_generate_task.name)["queue"].name == settings.celery_modal_queue
+    assert route({}, tasks.ai_finalize_task.name)["queue"].name == "r2v"
@@ -0,0 +1,28 @@
+import datetime as dt
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.api.pagination import decode_cursor, encode_cursor, paginate
+from app.db.models.social import Post
+from sqlalchemy import select
+
+def test_cursor_round_trip_restores_column_types():
+    created = dt.datetime(2026, 5, 1, 12, 30, 15, 123456, tzinfo=dt.timezone.utc)
+    post_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created, post_id), Post.created_at, Post.id) == (created, post_id)
+
+def test_invalid_cursor_is_a_bad_request():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor", Post.created_at, Post.id)
+    assert exc.value.status_code == 400
+
+def test_cursor_replaces_offset_with_keyset_predicate():
+    cursor = encode_cursor(dt.datetime.now(dt.timezone.utc), uuid.uuid4())
+    sql = str(paginate(select(Post), Post.created_at, Post.id, cursor=cursor, limit=20, offset=40)
+              .compile(dialect=postgresql.dialect()))
+    assert "(posts.created_at, posts.id) < (" in sql
+    assert "OFFSET" not in sql
+    assert "ORDER BY posts.created_at DESC, posts.id DESC" in sql
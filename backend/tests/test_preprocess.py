@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import billiard
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from app.workers.adapters import preprocess
+from app.workers.adapters.preprocess import PreprocessOptions, preprocess_images
+
+OPTS = PreprocessOptions(max_px=200, format="JPEG", quality=90, blur_threshold=60.0, analysis_px=1024)
+
+def _checkerboard(w, h, cell=8):
+    y, x = np.indices((h, w))
+    return Image.fromarray((((x // cell + y // cell) % 2) * 255).astype(np.uint8)).convert("RGB")
+
+def test_frames_are_normalized_and_blurry_ones_rejected(tmp_path):
+    src = tmp_path / "inputs"
+    src.mkdir()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90° CW on display
+    _checkerboard(800, 400).save(src / "0000_sharp.jpg", exif=exif)
+    _checkerboard(800, 400).filter(ImageFilter.GaussianBlur(12)).save(src / "0001_blurry.png")
+    (src / "0002_broken.jpg").write_bytes(b"not an image")
+
+    manifest = preprocess_images(src, tmp_path / "frames", OPTS)
+
+    [kept] = manifest["kept"]
+    assert kept["output"] == "0000_sharp.jpg" and (kept["width"], kept["height"]) == (100, 200)
+    with Image.open(tmp_path / "frames" / "0000_sharp.jpg") as out:
+        assert out.size == (100, 200) and out.getexif().get(0x0112) is None
+    assert {r["source"]: r["reason"] for r in manifest["rejected"]} == {"0001_blurry.png": "blurry", "0002_broken.jpg": "unreadable"}
+
+def test_nothing_usable_fails(tmp_path):
+    src = tmp_path / "inputs"
+    src.mkdir()
+    Image.new("RGB", (300, 300), (90, 90, 90)).save(src / "flat.jpg")
+    with pytest.raises(ValueError, match="no usable frames"):
+        preprocess_images(src, tmp_path / "frames", OPTS)
+
+class BrokenExecutor:
+    """A pool whose child died: every map fails, as ProcessPoolExecutor does once broken."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def map(self, *args):
+        raise BrokenProcessPool("a child process terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+def _pools(monkeypatch, *executors):
+    made = iter(executors)
+    monkeypatch.setattr(preprocess, "ProcessPoolExecutor", lambda **kwargs: next(made))
+    monkeypatch.setattr(preprocess.pool, "_executor", None)
+
+def test_broken_pool_is_replaced_and_the_batch_retried(tmp_path, monkeypatch):
+    src = tmp_path / "inputs"
+    src.mkdir()
+    _checkerboard(400, 400).save(src / "0000_sharp.jpg")
+    broken, fresh = BrokenExecutor(), ThreadPoolExecutor(2)
+    _pools(monkeypatch, broken, fresh)
+
+    manifest = preprocess_images(src, tmp_path / "frames", OPTS)
+
+    assert [k["output"] for k in manifest["kept"]] == ["0000_sharp.jpg"]
+    assert broken.shut_down and preprocess.pool._executor is fresh
+    fresh.shutdown()
+
+def test_pool_breaking_twice_fails_the_job(tmp_path, monkeypatch):
+    src = tmp_path / "inputs"
+    src.mkdir()
+    _checkerboard(400, 400).save(src / "0000_sharp.jpg")
+    _pools(monkeypatch, BrokenExecutor(), BrokenExecutor())
+    with pytest.raises(BrokenProcessPool):
+        preprocess_images(src, tmp_path / "frames", OPTS)
+    assert preprocess.pool._executor is None
+
+def _preprocess_in_worker(src, out):
+    try:
+        return [k["output"] for k in preprocess_images(src, out, OPTS)["kept"]]
+    finally:
+        preprocess.pool.shutdown()
+
+def test_runs_inside_a_prefork_worker(tmp_path, monkeypatch):
+    # Celery's prefork children are daemonic billiard processes.
+    src = tmp_path / "inputs"
+    src.mkdir()
+    _checkerboard(400, 400).save(src / "0000_sharp.jpg")
+    monkeypatch.setattr(preprocess.settings, "scan_preprocess_workers", 1)
+    with billiard.Pool(1) as workers:
+        assert workers.apply(_preprocess_in_worker, (src, tmp_path / "frames")) == ["0000_sharp.jpg"]
@@ -0,0 +1,77 @@
+import uuid
+
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+
+from app.api.routers import me
+from app.core.config import settings
+from app.services import profile_stats
+from conftest import FakeSession, Result
+
+STATS = {"username": "ada", "bio": None, "avatar_url": None, "assets": 3, "published": 2, "followers": 5, "following": 1}
+
+def _follows(following):
+    """Answers the cache-hit EXISTS(follow) query."""
+    return FakeSession(answer=lambda stmt: Result([following]))
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    def load(db, user_id, viewer_id):
+        calls.append(user_id)
+        return dict(STATS), False
+    monkeypatch.setattr(profile_stats, "_load", load)
+    return calls
+
+def test_stats_are_cached_and_only_the_follow_edge_is_queried_on_hits(r, loads):
+    user, viewer = uuid.uuid4(), uuid.uuid4()
+    assert profile_stats.get_profile_stats(_follows(False), user, user) == (STATS, False)
+    assert 0 < r.ttl(f"profile_stats:{user}") <= settings.profile_stats_ttl_s
+
+    own = _follows(False)
+    assert profile_stats.get_profile_stats(own, user, user) == (STATS, False)
+    other = _follows(True)
+    assert profile_stats.get_profile_stats(other, user, viewer) == (STATS, True)
+    assert loads == [user] and own.executed == [] and len(other.executed) == 1
+
+def test_invalidation_forces_a_reload(r, loads):
+    user, other = uuid.uuid4(), uuid.uuid4()
+    for uid in (user, other):
+        profile_stats.get_profile_stats(_follows(False), uid, uid)
+    profile_stats.invalidate_profile_stats(user, other)
+    assert not r.exists(f"profile_stats:{user}", f"profile_stats:{other}")
+    profile_stats.get_profile_stats(_follows(False), user, user)
+    assert loads == [user, other, user]
+
+def test_cache_outage_falls_back_to_the_database(monkeypatch, loads):
+    def down():
+        raise ConnectionError("redis down")
+    broken = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(broken, "get", lambda key: down())
+    monkeypatch.setattr(broken, "set", lambda *a, **k: down())
+    monkeypatch.setattr(broken, "delete", lambda *keys: down())
+    monkeypatch.setattr(profile_stats, "get_redis_sync", lambda: broken)
+    user = uuid.uuid4()
+    assert profile_stats.get_profile_stats(_follows(False), user, user) == (STATS, False)
+    profile_stats.invalidate_profile_stats(user)  # must not raise either
+    assert loads == [user]
+
+class DeletingSession(FakeSession):
+    def delete(self, obj):
+        self.deleted = obj
+
+def test_deleting_an_account_invalidates_everyone_it_followed_or_was_followed_by(r, loads):
+    user, followed, follower, bystander = (uuid.uuid4() for _ in range(4))
+    for uid in (user, followed, follower, bystander):
+        profile_stats.get_profile_stats(_follows(False), uid, uid)
+    db = DeletingSession(answer=lambda stmt: Result([followed, follower]))
+
+    me.delete_me(db=db, user=SimpleNamespace(id=user))
+
+    [(sql, _)] = db.executed
+    assert "UNION" in sql and db.commits == 1
+    assert not r.exists(*(f"profile_stats:{u}" for u in (user, followed, follower)))
+    assert r.exists(f"profile_stats:{bystander}")
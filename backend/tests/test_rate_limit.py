@@ -0,0 +1,38 @@
+import asyncio
+
+import fakeredis
+
+from app.core import rate_limit
+from app.core.rate_limit import LocalTokenBuckets, RateLimiter
+
+def test_gcra_script_allows_burst_then_rejects(monkeypatch):
+    monkeypatch.setattr(rate_limit, "get_redis_async", lambda: fakeredis.FakeAsyncRedis())
+    limiter = RateLimiter()
+
+    async def run():
+        return [await limiter.check("rl:GET /assets/{asset_id}:u:1", 3, 60) for _ in range(4)]
+
+    results = asyncio.run(run())
+    assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+    assert [remaining for _, _, remaining in results[:3]] == [2, 1, 0]
+    assert 0 < results[3][1] <= 20
+
+def test_redis_failure_falls_back_to_local_buckets(monkeypatch):
+    def broken():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(rate_limit, "get_redis_async", broken)
+    limiter = RateLimiter()
+
+    async def run():
+        return [(await limiter.check("rl:POST /auth/login:ip:1.2.3.4", 2, 60))[0] for _ in range(3)]
+
+    assert asyncio.run(run()) == [True, True, False]
+
+def test_local_bucket_refills_over_time(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    buckets = LocalTokenBuckets(max_keys=10)
+    assert buckets.take("k", 1, 10)[0]
+    assert not buckets.take("k", 1, 10)[0]
+    clock[0] += 10
+    assert buckets.take("k", 1, 10)[0]
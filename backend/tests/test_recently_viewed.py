@@ -0,0 +1,49 @@
+import datetime as dt
+import uuid
+
+from app.core.config import settings
+from app.services import recently_viewed
+from conftest import FakeSession, Result
+
+def _lookups(assets, users):
+    """Answers the flusher's Asset.id / User.id existence lookups from fixed sets."""
+    existing = {"assets": set(assets), "users": set(users)}
+    return FakeSession(answer=lambda stmt: Result(existing[stmt.get_final_froms()[0].name]) if stmt.is_select else None)
+
+def _writes(db):
+    return [(sql, params) for sql, params in db.executed if not sql.startswith("SELECT")]
+
+def test_views_are_trimmed_per_user_and_queued_once_per_pair(r, monkeypatch):
+    monkeypatch.setattr(settings, "recently_viewed_max", 2)
+    user = uuid.uuid4()
+    assets = [uuid.uuid4() for _ in range(3)]
+    for asset_id in assets + [assets[0]]:
+        recently_viewed.record_view(None, user, asset_id)
+    key = f"recent:{user}"
+    assert r.zrevrange(key, 0, -1) == [str(assets[0]), str(assets[2])]
+    assert 0 < r.ttl(key) <= settings.recently_viewed_ttl_s
+    assert len(r.hgetall(recently_viewed.PENDING_KEY)) == 3
+
+def test_flush_upserts_keeping_the_latest_view_and_drops_deleted_rows(r):
+    user, gone_user = uuid.uuid4(), uuid.uuid4()
+    kept, deleted = uuid.uuid4(), uuid.uuid4()
+    for u, a in ((user, kept), (user, deleted), (gone_user, kept)):
+        recently_viewed.record_view(None, u, a)
+    db = _lookups(assets=[kept], users=[user])
+
+    assert recently_viewed.flush_recently_viewed(db) == 3
+    [(sql, params)] = _writes(db)
+    assert "ON CONFLICT ON CONSTRAINT uq_recent_user_asset DO UPDATE" in sql
+    assert "greatest(recently_viewed.last_viewed_at, excluded.last_viewed_at)" in sql
+    assert params["user_id_m0"] == user and params["asset_id_m0"] == kept and "user_id_m1" not in params
+    assert isinstance(params["last_viewed_at_m0"], dt.datetime) and db.commits == 1
+    assert not r.exists(recently_viewed.PENDING_KEY, recently_viewed.FLUSHING_KEY)
+
+def test_view_writes_through_when_redis_is_down(monkeypatch):
+    def down():
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(recently_viewed, "get_redis_sync", down)
+    db = FakeSession()
+    recently_viewed.record_view(db, uuid.uuid4(), uuid.uuid4())
+    [(sql, _)] = db.executed
+    assert sql.startswith("INSERT INTO recently_viewed") and "ON CONFLICT" in sql and db.commits == 1
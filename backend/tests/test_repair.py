@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from app.workers.adapters import repair
+from app.workers.adapters.repair import Glb, read_glb, repair_mesh, write_glb, write_triangle_mesh
+
+CORNERS = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], np.float32)
+# Outward-wound cube; faces 0 and 1 make up the x=0 side.
+CUBE = np.array([
+    [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+    [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],
+])
+
+def _soup(faces):
+    # Every triangle with its own three vertices, as STL-derived and many scan meshes arrive.
+    return CORNERS[faces].reshape(-1, 3), np.arange(len(faces) * 3).reshape(-1, 3)
+
+def _load(path):
+    glb = read_glb(path.read_bytes())
+    prim = glb.gltf["meshes"][0]["primitives"][0]
+    positions, _ = repair._read_accessor(glb, prim["attributes"]["POSITION"])
+    normals, _ = repair._read_accessor(glb, prim["attributes"]["NORMAL"])
+    indices, _ = repair._read_accessor(glb, prim["indices"])
+    return glb, prim, positions, normals, indices.reshape(-1, 3)
+
+def test_soup_is_welded_cleaned_and_closed(tmp_path):
+    positions, faces = _soup(CUBE[2:])  # x=0 side missing: a 4-edge hole
+    positions = np.vstack([positions, CORNERS[[4, 6, 7, 4, 4, 5]] + np.float32(1e-8)])  # duplicate + degenerate
+    faces = np.vstack([faces, [[30, 31, 32], [33, 34, 35]]])
+    write_triangle_mesh(tmp_path / "in.glb", positions, faces)
+
+    stats = repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb")
+
+    assert stats["vertices_in"] == 36 and stats["faces_in"] == 12
+    assert (stats["duplicates_removed"], stats["degenerate_removed"], stats["holes_filled"]) == (1, 1, 1)
+    _, _, out_pos, normals, out_faces = _load(tmp_path / "out.glb")
+    assert len(out_pos) == 9 and len(out_faces) == 14  # 8 corners + the patch centre
+    edges = np.sort(out_faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    assert (np.unique(edges, axis=0, return_counts=True)[1] == 2).all()
+    np.testing.assert_allclose(np.linalg.norm(normals, axis=1), 1, rtol=1e-5)
+    assert (np.einsum("ij,ij->i", normals, out_pos - 0.5) > 0).all()
+
+def test_uv_seams_and_textures_survive(tmp_path):
+    positions, faces = _soup(CUBE)
+    uvs = np.zeros((len(positions), 2), np.float32)
+    uvs[18:] = 0.5  # second half of the cube sits on another UV island
+    image = b"\x89PNG fake texture bytes"
+    glb = Glb({"asset": {"version": "2.0"}, "meshes": [{"primitives": [{"attributes": {}}]}],
+               "images": [{"bufferView": 0, "mimeType": "image/png"}], "bufferViews": [{"byteLength": len(image)}],
+               "accessors": []}, [memoryview(image)])
+    prim = glb.gltf["meshes"][0]["primitives"][0]
+    prim["attributes"]["POSITION"] = repair._add_accessor(glb, positions, bounds=True)
+    prim["attributes"]["TEXCOORD_0"] = repair._add_accessor(glb, uvs)
+    prim["indices"] = repair._add_accessor(glb, faces.reshape(-1).astype(np.uint16))
+    write_glb(glb, tmp_path / "in.glb")
+
+    repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb")
+
+    out, prim, out_pos, _, _ = _load(tmp_path / "out.glb")
+    assert 8 < len(out_pos) < 36  # welded within each island, not across the seam
+    view = out.views[out.gltf["images"][0]["bufferView"]]
+    assert bytes(view) == image
+    assert len(out.gltf["bufferViews"]) == 5  # image + position, normal, uv, indices
+
+def test_non_glb_is_copied(tmp_path):
+    (tmp_path / "in.glb").write_bytes(b"GLB_PLACEHOLDER_FROM_SCAN")
+    assert repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb") == {"skipped": "not a GLB"}
+    assert (tmp_path / "out.glb").read_bytes() == b"GLB_PLACEHOLDER_FROM_SCAN"
+    (tmp_path / "empty.glb").touch()
+    assert repair_mesh(tmp_path / "empty.glb", tmp_path / "out.glb") == {"skipped": "not a GLB"}
+
+def test_input_is_mapped_not_read(tmp_path, monkeypatch):
+    write_triangle_mesh(tmp_path / "in.glb", *_soup(CUBE))
+    monkeypatch.setattr(type(tmp_path), "read_bytes", lambda self: pytest.fail("whole GLB read into memory"))
+    assert repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb")["faces_out"] == 12
+
+def _with_extension(path, name):
+    positions, faces = _soup(CUBE[2:])
+    write_triangle_mesh(path, positions, faces)
+    glb = read_glb(path.read_bytes())
+    glb.gltf["extensionsUsed"] = [name]
+    if name == "EXT_meshopt_compression":
+        # Offsets into the original BIN that a rewrite would leave pointing at the wrong bytes.
+        glb.gltf["extensionsRequired"] = [name]
+        glb.gltf["bufferViews"][0]["extensions"] = {name: {"buffer": 0, "byteOffset": 0, "byteLength": 12, "byteStride": 12, "count": 1, "mode": "ATTRIBUTES"}}
+    write_glb(glb, path)
+
+@pytest.mark.parametrize("name", ["EXT_meshopt_compression", "KHR_draco_mesh_compression", "VENDOR_unknown"])
+def test_files_with_unsupported_extensions_are_copied(tmp_path, name):
+    _with_extension(tmp_path / "in.glb", name)
+    stats = repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb")
+    assert stats == {"skipped": f"unsupported extensions: {name}"}
+    assert (tmp_path / "out.glb").read_bytes() == (tmp_path / "in.glb").read_bytes()
+
+def test_material_extensions_are_still_repaired(tmp_path):
+    _with_extension(tmp_path / "in.glb", "KHR_materials_unlit")
+    assert repair_mesh(tmp_path / "in.glb", tmp_path / "out.glb")["holes_filled"] == 1
+    assert read_glb((tmp_path / "out.glb").read_bytes()).gltf["extensionsUsed"] == ["KHR_materials_unlit"]
+
+def test_hole_centre_copies_skin_attributes_from_one_ring_vertex():
+    positions = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], np.float32)
+    joints = np.array([[1, 0, 0, 0], [4, 0, 0, 0], [7, 0, 0, 0], [9, 0, 0, 0]], np.uint8)
+    weights = np.array([[1, 0, 0, 0], [0.5, 0.5, 0, 0], [1, 0, 0, 0], [0.25, 0.75, 0, 0]], np.float32)
+    colors = np.array([[0, 0, 0, 1], [1, 0, 0, 1], [1, 1, 0, 1], [0, 1, 0, 1]], np.float32)
+    faces = np.zeros((0, 3), np.int64)
+
+    _, (j, w, c), _ = repair._fill_holes(positions, [joints, weights, colors], faces, [[2, 1, 0, 3]], [True, True, False])
+
+    assert j[-1].tolist() == [7, 0, 0, 0] and w[-1].tolist() == [1, 0, 0, 0]  # both from vertex 2
+    np.testing.assert_allclose(c[-1], [0.5, 0.5, 0, 1])  # colours still blend
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.routes import route_template
+
+def test_template_includes_every_router_prefix():
+    leaf = APIRouter()
+
+    @leaf.get("/assets/{asset_id}")
+    def asset(asset_id: str, request: Request):
+        return {"template": route_template(request.scope)}
+
+    @leaf.get("/")
+    def index(request: Request):
+        return {"template": route_template(request.scope)}
+
+    api = APIRouter()
+    api.include_router(leaf, prefix="/marketplace")
+    app = FastAPI()
+    app.include_router(api, prefix="/v1")
+    client = TestClient(app)
+
+    assert client.get("/v1/marketplace/assets/7").json() == {"template": "/v1/marketplace/assets/{asset_id}"}
+    assert client.get("/v1/marketplace/").json() == {"template": "/v1/marketplace/"}
+
+def test_no_template_before_routing():
+    assert route_template({"type": "http", "path": "/v1/x"}) is None
@@ -0,0 +1,34 @@
+import datetime as dt
+from unittest import mock
+
+import boto3
+from botocore.client import Config
+
+from app.services.s3 import SigV4Presigner
+
+ENDPOINT = "http://localhost:9000"
+
+def _boto_url(bucket: str, key: str, expires: int, at: dt.datetime) -> str:
+    client = boto3.client(
+        "s3",
+        endpoint_url=ENDPOINT,
+        aws_access_key_id="minioadmin",
+        aws_secret_access_key="minioadmin",
+        region_name="us-east-1",
+        config=Config(signature_version="s3v4"),
+    )
+    with mock.patch("botocore.auth.get_current_datetime", return_value=at.replace(tzinfo=None)):
+        return client.generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires)
+
+def test_sign_get_matches_botocore():
+    signer = SigV4Presigner(ENDPOINT, "minioadmin", "minioadmin", "us-east-1")
+    at = dt.datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc)
+    for key in ["thumbs/a.png", "u/d e+f~(1).png", "ünï/cødé.glb"]:
+        assert signer.sign_get("bucket", key, 900, at.timestamp()) == _boto_url("bucket", key, 900, at)
+
+def test_presign_get_reuses_url_within_window():
+    signer = SigV4Presigner(ENDPOINT, "minioadmin", "minioadmin", "us-east-1")
+    first = signer.presign_get("bucket", "k.png", 900, now=1_000_000.0)
+    assert signer.presign_get("bucket", "k.png", 900, now=1_000_100.0) == first
+    assert signer.presign_get("bucket", "k.png", 900, now=1_000_000.0 + 900) != first
+    assert "X-Amz-Expires=1125" in first
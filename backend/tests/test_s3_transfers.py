@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from app.services import s3 as s3_module
+from app.services.s3 import Upload, _TransferTimer, s3
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error, self.waited = error, False
+
+    def result(self):
+        self.waited = True
+        if self.error:
+            raise self.error
+
+class FakeTransfers:
+    """Stands in for the shared TransferManager: hands out prepared futures in call order."""
+
+    def __init__(self, futures):
+        self.futures, self.calls = list(futures), []
+
+    def upload(self, local_path, bucket, key, extra_args=None, subscribers=None):
+        self.calls.append((key, extra_args))
+        return self.futures[len(self.calls) - 1]
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name in ("a.glb", "b.png", "c.json"):
+        (tmp_path / name).write_bytes(b"x" * 10)
+        paths.append(str(tmp_path / name))
+    return paths
+
+def _use(monkeypatch, transfers):
+    monkeypatch.setattr(s3, "_manager", transfers)
+    monkeypatch.setattr(s3, "_manager_pid", os.getpid())
+
+def test_upload_files_waits_for_all_and_raises_the_first_error(monkeypatch, files):
+    first, second = RuntimeError("first"), RuntimeError("second")
+    futures = [FakeFuture(), FakeFuture(first), FakeFuture(second)]
+    transfers = FakeTransfers(futures)
+    _use(monkeypatch, transfers)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        s3.upload_files("bucket", [Upload(files[0], "k/a.glb", "model/gltf-binary"), Upload(files[1], "k/b.png"), Upload(files[2], "k/c.json")])
+
+    assert excinfo.value is first
+    assert all(f.waited for f in futures)
+    assert transfers.calls == [("k/a.glb", {"ContentType": "model/gltf-binary"}), ("k/b.png", {}), ("k/c.json", {})]
+
+def test_upload_files_succeeds_when_every_transfer_does(monkeypatch, files):
+    futures = [FakeFuture(), FakeFuture()]
+    _use(monkeypatch, FakeTransfers(futures))
+    s3.upload_files("bucket", [Upload(files[0], "k/a"), Upload(files[1], "k/b")])
+    assert all(f.waited for f in futures)
+
+def test_transfer_clock_starts_at_first_progress(monkeypatch):
+    clock = iter([100.0, 104.0])  # first progress, done; later progress does not read the clock
+    monkeypatch.setattr(s3_module.time, "perf_counter", lambda: next(clock))
+    observed = []
+    monkeypatch.setattr(s3_module, "observe_transfer", lambda *args: observed.append(args))
+
+    timer = _TransferTimer("upload", "k/a", size=4096)
+    timer.on_progress(future=None, bytes_transferred=1024)
+    timer.on_progress(future=None, bytes_transferred=3072)
+    timer.on_done(FakeFuture())
+
+    assert observed == [("upload", 4096, 4.0)]
@@ -0,0 +1,89 @@
+import datetime as dt
+import uuid
+from types import SimpleNamespace
+
+from app.db.models.jobs import ScanJob
+from app.db.models.marketplace import Asset, Download
+from app.db.models.user import User
+from app.services import user_stats
+from conftest import FakeSession, Result
+
+NOW = dt.datetime(2026, 3, 1, 23, 30, tzinfo=dt.timezone(dt.timedelta(hours=-2)))  # 2026-03-02 in UTC
+
+def _connection(rows=()):
+    """Stands in for session.connection(): SELECTs answer with ``rows``."""
+    return FakeSession(answer=lambda stmt: Result(rows) if stmt.is_select else None)
+
+def _session(conn, new=(), deleted=()):
+    return SimpleNamespace(new=list(new), deleted=list(deleted), connection=lambda: conn)
+
+def _upserted(params):
+    # Multi-row VALUES binds as <column>_m<row>; a single row binds plain column names.
+    rows = {}
+    for key, value in params.items():
+        column, _, index = key.rpartition("_m")
+        if not index.isdigit():
+            column, index = key, "0"
+        rows.setdefault(int(index), {})[column] = value
+    return sorted(({k: v for k, v in r.items() if k in ("user_id", "day", *user_stats.STAT_COLUMNS)}
+                   for r in rows.values()), key=lambda r: str(r["user_id"]))
+
+def test_flush_adds_inserts_and_subtracts_deletes_per_utc_day():
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    conn = _connection()
+    user_stats._roll_up_flush(_session(conn, new=[
+        Asset(creator_id=alice, created_at=NOW), ScanJob(user_id=alice, created_at=NOW),
+        Download(user_id=bob, created_at=NOW),
+    ], deleted=[Download(user_id=bob, created_at=NOW - dt.timedelta(days=3))]), None)
+
+    [(sql, params)] = conn.executed
+    assert "ON CONFLICT (user_id, day) DO UPDATE SET assets = greatest(" in sql
+    day, earlier = dt.date(2026, 3, 2), dt.date(2026, 2, 27)
+    assert _upserted(params) == sorted([
+        {"user_id": alice, "day": day, "assets": 1, "downloads": 0, "ai_jobs": 0, "scan_jobs": 1},
+        {"user_id": bob, "day": day, "assets": 0, "downloads": 1, "ai_jobs": 0, "scan_jobs": 0},
+        {"user_id": bob, "day": earlier, "assets": 0, "downloads": -1, "ai_jobs": 0, "scan_jobs": 0},
+    ], key=lambda r: str(r["user_id"]))
+
+def test_flush_skips_rows_of_a_user_deleted_alongside():
+    user = User(id=uuid.uuid4())
+    conn = _connection()
+    user_stats._roll_up_flush(_session(conn, deleted=[user, Asset(creator_id=user.id, created_at=NOW)]), None)
+    assert conn.executed == []
+
+def test_asset_delete_takes_cascaded_downloads_off_the_downloaders():
+    asset, bob = Asset(id=uuid.uuid4(), creator_id=uuid.uuid4()), uuid.uuid4()
+    conn = _connection(rows=[SimpleNamespace(user_id=bob, day=dt.date(2026, 2, 1), n=3)])
+    user_stats._roll_up_cascades(_session(conn, deleted=[asset]), None, None)
+
+    (select_sql, select_params), (_, upsert_params) = conn.executed
+    assert "JOIN assets ON assets.id = downloads.asset_id" in select_sql
+    assert select_params["asset_id_1"] == [asset.id]
+    assert _upserted(upsert_params) == [{"user_id": bob, "day": dt.date(2026, 2, 1), "assets": 0, "downloads": -3, "ai_jobs": 0, "scan_jobs": 0}]
+
+def test_user_delete_excludes_their_own_and_explicitly_deleted_downloads():
+    user, download = User(id=uuid.uuid4()), Download(id=uuid.uuid4(), user_id=uuid.uuid4())
+    conn = _connection()
+    user_stats._roll_up_cascades(_session(conn, deleted=[user, download]), None, None)
+
+    [(select_sql, params)] = conn.executed  # nothing matched, so no upsert
+    assert "downloads.user_id NOT IN" in select_sql and "downloads.id NOT IN" in select_sql
+    assert {user.id, download.id} <= {v for p in params.values() for v in (p if isinstance(p, list) else [p])}
+
+def test_flush_without_parent_deletes_does_not_query():
+    conn = _connection()
+    user_stats._roll_up_cascades(_session(conn, new=[Asset(creator_id=uuid.uuid4())], deleted=[Download(id=uuid.uuid4())]), None, None)
+    assert conn.executed == []
+
+def test_dashboard_stats_zero_fills_the_window_and_totals_all_time(monkeypatch):
+    monkeypatch.setattr(user_stats, "_utc_day", lambda ts: dt.date(2026, 3, 10))
+    row = lambda bucket, **counts: SimpleNamespace(bucket=bucket, **{c: counts.get(c) for c in user_stats.STAT_COLUMNS})
+    db = FakeSession(answer=lambda stmt: Result([row(None, assets=5, downloads=7), row(dt.date(2026, 3, 9), downloads=2, ai_jobs=1)]))
+
+    stats = user_stats.dashboard_stats(db, uuid.uuid4(), days=3)
+
+    assert len(db.executed) == 1
+    assert {c: stats[c] for c in user_stats.STAT_COLUMNS} == {"assets": 5, "downloads": 9, "ai_jobs": 1, "scan_jobs": 0}
+    assert [d["day"] for d in stats["series"]] == ["2026-03-08", "2026-03-09", "2026-03-10"]
+    assert stats["series"][0] == {"day": "2026-03-08", "assets": 0, "downloads": 0, "ai_jobs": 0, "scan_jobs": 0}
+    assert stats["series"][1]["downloads"] == 2 and stats["series"][1]["ai_jobs"] == 1